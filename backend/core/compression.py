@@ -0,0 +1,160 @@
+"""
+Compressed responses for the API, negotiated per request.
+
+CompressionMiddleware encodes text responses (JSON, CSV, HTML, ...) with
+brotli or gzip, whichever the client's Accept-Encoding prefers; brotli is
+only offered when the `brotli` package is installed. Bodies smaller than
+COMPRESSION_MIN_SIZE are sent as they are, since the headers and framing
+would cost about what compression saves. Streaming responses (the order
+export) are compressed chunk by chunk and flushed as they go.
+
+Only responses to GET and HEAD are compressed: the ones that return
+tokens are POSTs, which keeps secrets out of compressed bodies (BREACH).
+Static files never get here; WhiteNoise serves its own pre-compressed
+copies. As with Django's GZipMiddleware, a strong ETag becomes weak on a
+compressed response; core.conditional compares If-None-Match weakly, so
+revalidation still gets its 304.
+"""
+import re
+import zlib
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5  # Higher qualities cost far more CPU for a few percent on JSON
+
+COMPRESSIBLE_TYPES = (
+    'text/',
+    'application/json',
+    'application/javascript',
+    'application/xml',
+    'image/svg+xml',
+)
+
+_CODING = re.compile(r'^\s*([\w*-]+)\s*(?:;\s*q\s*=\s*([\d.]+))?\s*$')
+
+
+def available_encodings():
+    # Preferred first when a client rates them the same
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def negotiate_encoding(accept_encoding):
+    """The best encoding the Accept-Encoding header allows, or None."""
+    ratings = {}
+    for item in (accept_encoding or '').lower().split(','):
+        match = _CODING.match(item)
+        if match is None:
+            continue
+        try:
+            ratings[match.group(1)] = float(match.group(2) or 1)
+        except ValueError:
+            continue
+
+    best, best_rating = None, 0
+    for encoding in available_encodings():
+        rating = ratings.get(encoding, ratings.get('*', 0))
+        if rating > best_rating:
+            best, best_rating = encoding, rating
+    return best
+
+
+class _Compressor:
+    def __init__(self, encoding):
+        self.encoding = encoding
+        if encoding == 'br':
+            self._brotli = brotli.Compressor(quality=BROTLI_QUALITY)
+        else:
+            # wbits=31 writes the gzip header and trailer
+            self._zlib = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def compress(self, data, flush=False):
+        if self.encoding == 'br':
+            return self._brotli.process(data) + (self._brotli.flush() if flush else b'')
+        return self._zlib.compress(data) + (self._zlib.flush(zlib.Z_SYNC_FLUSH) if flush else b'')
+
+    def finish(self):
+        if self.encoding == 'br':
+            return self._brotli.finish()
+        return self._zlib.flush()
+
+
+def compress(data, encoding):
+    compressor = _Compressor(encoding)
+    return compressor.compress(data) + compressor.finish()
+
+
+def compress_stream(chunks, encoding):
+    compressor = _Compressor(encoding)
+    for chunk in chunks:
+        # Flush so each chunk reaches the client as soon as it is produced
+        data = compressor.compress(chunk, flush=True)
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+async def compress_stream_async(chunks, encoding):
+    compressor = _Compressor(encoding)
+    async for chunk in chunks:
+        data = compressor.compress(chunk, flush=True)
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+def _compressible(response):
+    content_type = response.get('Content-Type', '').split(';')[0].strip().lower()
+    return content_type.startswith(COMPRESSIBLE_TYPES)
+
+
+def _weaken_etag(response):
+    etag = response.get('ETag')
+    if etag and etag.startswith('"'):
+        response['ETag'] = f'W/{etag}'
+
+
+class CompressionMiddleware:
+    """Brotli/gzip for text responses, by Accept-Encoding. See the module docstring."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if request.method not in ('GET', 'HEAD') or response.has_header('Content-Encoding'):
+            return response
+        if not _compressible(response):
+            return response
+
+        # The same URL is sent differently depending on Accept-Encoding
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = negotiate_encoding(request.META.get('HTTP_ACCEPT_ENCODING'))
+        if encoding is None or response.status_code in (204, 304):
+            return response
+
+        if response.streaming:
+            if response.is_async:
+                response.streaming_content = compress_stream_async(response.streaming_content, encoding)
+            else:
+                response.streaming_content = compress_stream(response.streaming_content, encoding)
+            # The compressed length isn't known up front
+            response.headers.pop('Content-Length', None)
+        else:
+            if len(response.content) < settings.COMPRESSION_MIN_SIZE:
+                return response
+            compressed = compress(response.content, encoding)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response['Content-Length'] = str(len(compressed))
+
+        _weaken_etag(response)
+        response['Content-Encoding'] = encoding
+        return response
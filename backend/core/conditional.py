@@ -0,0 +1,90 @@
+"""
+Conditional GET support (ETag / If-None-Match) for API views.
+
+ETags are strong validators built from cheap fingerprints rather than the
+response body: max(updated_at) and row count for lists, the row's own
+updated_at for details, plus the full URL (page, filters and host, since
+image URLs are absolute). A matching If-None-Match gets a 304 before
+the serializer runs.
+"""
+import hashlib
+from urllib.parse import urlencode
+
+from django.db.models import Count, Max
+from rest_framework import status
+from rest_framework.response import Response
+
+PUBLIC_CACHE_CONTROL = 'public, max-age=60, stale-while-revalidate=300'
+PRIVATE_CACHE_CONTROL = 'private, no-cache'
+# Content-addressed media (core.storage) never changes under its URL
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+
+def make_etag(request, *parts):
+    params = urlencode(sorted(request.query_params.lists()), doseq=True)
+    url = f"{request.scheme}://{request.get_host()}{request.path}?{params}"
+    source = '|'.join([url, *(str(part) for part in parts)])
+    return f'"{hashlib.sha256(source.encode()).hexdigest()[:32]}"'
+
+
+def etag_matches(request, etag):
+    header = request.headers.get('If-None-Match')
+    if not header:
+        return False
+    if header.strip() == '*':
+        return True
+    # If-None-Match uses weak comparison, so W/"x" matches "x"
+    tags = [tag.strip().removeprefix('W/') for tag in header.split(',')]
+    return etag in tags
+
+
+def with_validators(response, etag, cache_control):
+    """Attach the ETag and Cache-Control to a 200 (or 304) response."""
+    if response.status_code in (status.HTTP_200_OK, status.HTTP_304_NOT_MODIFIED):
+        response['ETag'] = etag
+        response['Cache-Control'] = cache_control
+    return response
+
+
+def not_modified(etag, cache_control):
+    return with_validators(Response(status=status.HTTP_304_NOT_MODIFIED), etag, cache_control)
+
+
+class ConditionalGetMixin:
+    """
+    ETags and Cache-Control for a ModelViewSet's list and retrieve.
+    The model needs an `updated_at` column, and so do the relations in
+    `etag_related` (forward relations whose fields the serializer shows,
+    e.g. a product's farm_name). Override `list_response` to change how a
+    list is built after the ETag check.
+    """
+    cache_control = PUBLIC_CACHE_CONTROL
+    etag_related = ()
+
+    def etag_queryset(self):
+        return self.filter_queryset(self.get_queryset())
+
+    def list_etag(self, request):
+        columns = {'last_updated': Max('updated_at'), 'count': Count('pk')}
+        for relation in self.etag_related:
+            columns[f'{relation}_updated'] = Max(f'{relation}__updated_at')
+        fingerprint = self.etag_queryset().aggregate(**columns)
+        return make_etag(request, *(fingerprint[column] for column in columns))
+
+    def list(self, request, *args, **kwargs):
+        etag = self.list_etag(request)
+        if etag_matches(request, etag):
+            return not_modified(etag, self.cache_control)
+        return with_validators(self.list_response(request, etag, *args, **kwargs), etag, self.cache_control)
+
+    def list_response(self, request, etag, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        related = [getattr(instance, relation).updated_at for relation in self.etag_related]
+        etag = make_etag(request, instance.pk, instance.updated_at, *related)
+        if etag_matches(request, etag):
+            return not_modified(etag, self.cache_control)
+        serializer = self.get_serializer(instance)
+        return with_validators(Response(serializer.data), etag, self.cache_control)
@@ -0,0 +1,197 @@
+"""
+Faceted filtering for list endpoints.
+
+A view lists its facets; each one reads its own query params, filters the
+list and reports counts, e.g. `?type=تمور&min_price=10&in_stock=true`.
+List responses get a `facets` entry with, for every facet, the counts the
+list would have if that facet's value were changed while all other
+filters stayed as they are.
+
+All counts come from one GROUP BY query over the list's queryset before
+facet filters: each facet contributes a grouping column for its value
+and, while it is filtered on, one for whether the row passes that
+filter. The grouped rows are few (a handful of types, regions and price
+buckets), so the per-facet sums are done in Python.
+"""
+from decimal import Decimal, InvalidOperation
+
+from django.db.models import BooleanField, Case, Count, F, IntegerField, Q, Value, When
+from rest_framework import serializers
+
+
+def _true(value):
+    return value.lower() in ('1', 'true', 'yes')
+
+
+class Facet:
+    """One filterable attribute; `param` is the query param it reads."""
+    def __init__(self, param, field=None):
+        self.param = param
+        self.field = field or param
+
+    def selection(self, request):
+        """The filter requested for this facet, or None."""
+        raise NotImplementedError
+
+    def condition(self, selection):
+        raise NotImplementedError
+
+    def value_expression(self):
+        raise NotImplementedError
+
+    def counts(self, values):
+        raise NotImplementedError
+
+
+class ChoiceFacet(Facet):
+    """Exact values; `?type=a&type=b` matches either."""
+    def selection(self, request):
+        values = [value for value in request.query_params.getlist(self.param) if value]
+        return values or None
+
+    def condition(self, selection):
+        return Q(**{f'{self.field}__in': selection})
+
+    def value_expression(self):
+        return F(self.field)
+
+    def counts(self, values):
+        counts = [{'value': value, 'count': count} for value, count in values.items() if value not in (None, '')]
+        return sorted(counts, key=lambda item: (-item['count'], item['value']))
+
+
+class RangeFacet(Facet):
+    """
+    A numeric range from `?min_<param>=` and `?max_<param>=` (inclusive),
+    counted in buckets split at `bounds`.
+    """
+    def __init__(self, param, field=None, bounds=()):
+        super().__init__(param, field)
+        self.bounds = [Decimal(bound) for bound in bounds]
+
+    def _bound(self, request, name):
+        value = request.query_params.get(name)
+        if value in (None, ''):
+            return None
+        try:
+            return Decimal(value)
+        except InvalidOperation:
+            raise serializers.ValidationError({name: 'A number is required.'})
+
+    def selection(self, request):
+        low = self._bound(request, f'min_{self.param}')
+        high = self._bound(request, f'max_{self.param}')
+        if low is None and high is None:
+            return None
+        return low, high
+
+    def condition(self, selection):
+        low, high = selection
+        condition = Q()
+        if low is not None:
+            condition &= Q(**{f'{self.field}__gte': low})
+        if high is not None:
+            condition &= Q(**{f'{self.field}__lte': high})
+        return condition
+
+    def value_expression(self):
+        return Case(
+            When(**{f'{self.field}__isnull': True}, then=Value(None)),
+            *[When(**{f'{self.field}__lt': bound}, then=Value(index)) for index, bound in enumerate(self.bounds)],
+            default=Value(len(self.bounds)),
+            output_field=IntegerField()
+        )
+
+    def counts(self, values):
+        edges = [None, *self.bounds, None]
+        return [
+            {
+                'min': str(edges[index]) if edges[index] is not None else None,
+                'max': str(edges[index + 1]) if edges[index + 1] is not None else None,
+                'count': values.get(index, 0),
+            }
+            for index in range(len(self.bounds) + 1)
+        ]
+
+
+class BooleanFacet(Facet):
+    """A yes/no condition, e.g. `?in_stock=true`."""
+    def __init__(self, param, condition):
+        super().__init__(param)
+        self.true_condition = condition
+
+    def selection(self, request):
+        value = request.query_params.get(self.param)
+        if value in (None, ''):
+            return None
+        return _true(value)
+
+    def condition(self, selection):
+        return self.true_condition if selection else ~self.true_condition
+
+    def value_expression(self):
+        return Case(When(self.true_condition, then=Value(True)), default=Value(False), output_field=BooleanField())
+
+    def counts(self, values):
+        return [{'value': value, 'count': values.get(value, 0)} for value in (True, False)]
+
+
+def facet_counts(queryset, facets, selections):
+    """
+    Counts for every facet over `queryset` (not yet filtered by facets),
+    in one query. `selections` maps facet params to their selection.
+    """
+    columns = {}
+    for index, facet in enumerate(facets):
+        columns[f'facet_{index}'] = facet.value_expression()
+        if selections.get(facet.param) is not None:
+            condition = facet.condition(selections[facet.param])
+            columns[f'facet_{index}_match'] = Case(
+                When(condition, then=Value(True)), default=Value(False), output_field=BooleanField()
+            )
+
+    rows = queryset.order_by().annotate(**columns).values(*columns).annotate(facet_rows=Count('pk'))
+
+    values = [{} for _ in facets]
+    for row in rows:
+        passes = [row.get(f'facet_{index}_match', True) for index in range(len(facets))]
+        for index in range(len(facets)):
+            # A facet's own filter doesn't narrow its counts
+            if all(passed for other, passed in enumerate(passes) if other != index):
+                value = row[f'facet_{index}']
+                values[index][value] = values[index].get(value, 0) + row['facet_rows']
+
+    return {facet.param: facet.counts(counted) for facet, counted in zip(facets, values)}
+
+
+class FacetedListMixin:
+    """
+    ViewSet mixin filtering by `facets` and adding their counts to list
+    responses. Goes before ConditionalGetMixin, so ETags cover the counts.
+    """
+    facets = ()
+
+    def facet_selections(self):
+        return {facet.param: facet.selection(self.request) for facet in self.facets}
+
+    def facet_base_queryset(self):
+        # Everything but the facet filters
+        return super().filter_queryset(self.get_queryset())
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        for facet in self.facets:
+            selection = facet.selection(self.request)
+            if selection is not None:
+                queryset = queryset.filter(facet.condition(selection))
+        return queryset
+
+    def etag_queryset(self):
+        # Counts change with rows outside the current filters too
+        return self.facet_base_queryset()
+
+    def list_response(self, request, etag, *args, **kwargs):
+        response = super().list_response(request, etag, *args, **kwargs)
+        if response.status_code == 200 and isinstance(response.data, dict):
+            response.data['facets'] = facet_counts(self.facet_base_queryset(), self.facets, self.facet_selections())
+        return response
@@ -0,0 +1,138 @@
+"""
+Sparse fieldsets: `?fields=id,name` keeps only the listed fields of a
+response and `?omit=description` drops some.
+
+SparseFieldsMixin trims a serializer's fields for the request it was
+given in its context (read requests only, top-level serializers only).
+SparseQuerysetMixin then prunes the view's list and retrieve querysets
+to the serializer's fields, with or without ?fields=: columns nothing
+reads are deferred with only(), relations a field traverses are joined,
+and joins and prefetches for dropped fields are left out.
+"""
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+
+
+def _names(request, param):
+    value = request.query_params.get(param)
+    if value is None:
+        return None
+    return {name.strip() for name in value.split(',') if name.strip()}
+
+
+def requested_fieldset(request):
+    """Return (fields, omit) from the query string; either may be None."""
+    if request is None or request.method not in SAFE_METHODS:
+        return None, None
+    return _names(request, 'fields'), _names(request, 'omit')
+
+
+class SparseFieldsMixin:
+    """
+    Serializer mixin honouring ?fields= and ?omit= for the request in its
+    context. Unknown field names are a 400.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        wanted, omitted = requested_fieldset(self._context.get('request'))
+        if wanted is None and omitted is None:
+            return
+
+        available = set(self.fields)
+        unknown = ((wanted or set()) | (omitted or set())) - available
+        if unknown:
+            raise serializers.ValidationError({'fields': f"Unknown field(s): {', '.join(sorted(unknown))}"})
+
+        keep = (wanted if wanted is not None else available) - (omitted or set())
+        for name in available - keep:
+            self.fields.pop(name)
+
+
+def _lookup_root(lookup):
+    return getattr(lookup, 'prefetch_to', lookup).split('__')[0]
+
+
+def _is_column(opts, name):
+    try:
+        return opts.get_field(name).concrete
+    except FieldDoesNotExist:
+        return False
+
+
+def prune_queryset(queryset, fields, required=()):
+    """
+    Restrict `queryset` to what the serializer `fields` read: only() the
+    columns, select_related() the forward and one-to-one relations they
+    traverse and keep only the prefetches they use. `required` names
+    columns the view reads itself (ordering, validators).
+
+    Fields whose source is a method or property of the model (or '*')
+    can't be traced, so the queryset is returned unchanged for them.
+    """
+    opts = queryset.model._meta
+    columns = {opts.pk.name, *(name for name in required if _is_column(opts, name))}
+    joins = set()
+    roots = set()
+
+    for field in fields.values():
+        if field.write_only:
+            continue
+        if field.source == '*':
+            return queryset
+        root, *rest = field.source_attrs
+        try:
+            model_field = opts.get_field(root)
+        except FieldDoesNotExist:
+            if hasattr(queryset.model, root):
+                return queryset
+            # Not on the model at all: an annotation, or absent and skipped
+            continue
+        roots.add(root)
+        if not model_field.is_relation:
+            columns.add(root)
+            continue
+        if model_field.one_to_many or model_field.many_to_many:
+            # Loaded by a prefetch, which only needs our primary key
+            continue
+        if model_field.concrete:
+            columns.add(root)
+        if rest or isinstance(field, serializers.BaseSerializer):
+            joins.add(root)
+            related = model_field.related_model._meta
+            try:
+                nested = related.get_field(rest[0]) if len(rest) == 1 else None
+            except FieldDoesNotExist:
+                nested = None
+            if nested is not None and nested.concrete:
+                columns.add(f'{root}__{nested.name}')
+            else:
+                columns.update(f'{root}__{column.name}' for column in related.concrete_fields)
+
+    lookups = [lookup for lookup in queryset._prefetch_related_lookups if _lookup_root(lookup) in roots]
+    queryset = queryset.select_related(None)
+    if joins:
+        # select_related() without arguments would follow every foreign key
+        queryset = queryset.select_related(*joins)
+    return queryset.prefetch_related(None).prefetch_related(*lookups).only(*columns)
+
+
+class SparseQuerysetMixin:
+    """
+    ViewSet mixin pruning list and retrieve querysets to the fields being
+    serialized. `sparse_required_fields` lists columns the view itself reads.
+    """
+    sparse_required_fields = ()
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.action not in ('list', 'retrieve'):
+            return queryset
+
+        # Ordering fields are read back from the rows by keyset pagination
+        keyset_ordering = getattr(self, 'keyset_ordering', getattr(self.pagination_class, 'keyset_ordering', ()))
+        ordering = [name.lstrip('-') for name in keyset_ordering]
+        ordering += [name.lstrip('-') for name in queryset.query.order_by if isinstance(name, str)]
+        required = {*self.sparse_required_fields, *ordering}
+        serializer = self.get_serializer_class()(context=self.get_serializer_context())
+        return prune_queryset(queryset, serializer.fields, required)
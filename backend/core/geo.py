@@ -0,0 +1,125 @@
+"""
+Farm coordinates and nearest-farm search.
+
+Farm.location is a map link. parse_location() pulls the coordinates out of
+the usual Google Maps forms (`?q=lat,lng`, `?ll=`, `/@lat,lng,15z`,
+`!3dlat!4dlng`, or a bare "lat,lng"), and core.signals stores them in the
+indexed latitude/longitude columns on save.
+
+nearby() narrows farms to the radius' bounding box first, a range scan on
+the (latitude, longitude) index, and only then computes the exact
+haversine distance for the rows left, ranking by it.
+"""
+import math
+import re
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from django.db.models import F, FloatField, Value
+from django.db.models.functions import ASin, Cos, Power, Radians, Sin, Sqrt
+from rest_framework import serializers
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = EARTH_RADIUS_KM * math.pi / 180
+MAX_RADIUS_KM = 1000
+
+_PAIR = re.compile(r'(-?\d{1,3}(?:\.\d+)?)\s*,\s*(-?\d{1,3}(?:\.\d+)?)')
+_AT = re.compile(r'@(-?\d{1,3}(?:\.\d+)?),(-?\d{1,3}(?:\.\d+)?)')
+_DATA = re.compile(r'!3d(-?\d{1,3}(?:\.\d+)?)!4d(-?\d{1,3}(?:\.\d+)?)')
+
+
+def _coordinates(match):
+    if match is None:
+        return None
+    latitude, longitude = float(match.group(1)), float(match.group(2))
+    if -90 <= latitude <= 90 and -180 <= longitude <= 180:
+        return latitude, longitude
+    return None
+
+
+def parse_location(location):
+    """Return (latitude, longitude) from a map link, or None."""
+    if not location:
+        return None
+    location = unquote(location.strip())
+    parts = urlsplit(location)
+    query = parse_qs(parts.query)
+    for param in ('q', 'query', 'll', 'destination', 'center'):
+        for value in query.get(param, []):
+            found = _coordinates(_PAIR.fullmatch(value.strip()))
+            if found:
+                return found
+    # The pin of a place link beats the map's viewport centre
+    found = _coordinates(_DATA.search(location)) or _coordinates(_AT.search(location))
+    if found:
+        return found
+    if not parts.scheme:
+        return _coordinates(_PAIR.fullmatch(location))
+    return None
+
+
+def bounding_box(latitude, longitude, radius_km):
+    """
+    ((min_lat, max_lat), (min_lng, max_lng)) around a point; the longitude
+    range is None where the box would wrap past a pole or the antimeridian.
+    """
+    delta_lat = radius_km / KM_PER_DEGREE
+    lat_range = (max(latitude - delta_lat, -90), min(latitude + delta_lat, 90))
+    if lat_range[0] <= -90 or lat_range[1] >= 90:
+        return lat_range, None
+    # The circle is widest in longitude a little poleward of its centre
+    ratio = math.sin(radius_km / EARTH_RADIUS_KM) / math.cos(math.radians(latitude))
+    if ratio >= 1:
+        return lat_range, None
+    delta_lng = math.degrees(math.asin(ratio))
+    if longitude - delta_lng < -180 or longitude + delta_lng > 180:
+        return lat_range, None
+    return lat_range, (longitude - delta_lng, longitude + delta_lng)
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    a = (
+        math.sin(math.radians(lat2 - lat1) / 2) ** 2
+        + math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * math.sin(math.radians(lng2 - lng1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def distance_expression(latitude, longitude):
+    """Haversine distance in km from a point to each row, in SQL."""
+    half_dlat = Radians(F('latitude') - Value(latitude)) / 2
+    half_dlng = Radians(F('longitude') - Value(longitude)) / 2
+    a = (
+        Power(Sin(half_dlat), 2)
+        + Value(math.cos(math.radians(latitude))) * Cos(Radians(F('latitude'))) * Power(Sin(half_dlng), 2)
+    )
+    return Value(2 * EARTH_RADIUS_KM) * ASin(Sqrt(a), output_field=FloatField())
+
+
+def nearby(queryset, latitude, longitude, radius_km):
+    """Rows within `radius_km` of a point, closest first, with a `distance` (km)."""
+    lat_range, lng_range = bounding_box(latitude, longitude, radius_km)
+    queryset = queryset.filter(latitude__range=lat_range)
+    if lng_range:
+        queryset = queryset.filter(longitude__range=lng_range)
+    return (
+        queryset.annotate(distance=distance_expression(latitude, longitude))
+        .filter(distance__lte=radius_km)
+        .order_by('distance', 'id')
+    )
+
+
+def near_params(request, default_radius_km=50):
+    """Parse `?near=lat,lng&radius=km`; None when there is no `near`."""
+    near = request.query_params.get('near')
+    if not near:
+        return None
+    point = _coordinates(_PAIR.fullmatch(near.strip()))
+    if point is None:
+        raise serializers.ValidationError({'near': 'Expected "latitude,longitude".'})
+    try:
+        radius_km = float(request.query_params.get('radius') or default_radius_km)
+    except ValueError:
+        raise serializers.ValidationError({'radius': 'A number of kilometres is required.'})
+    if not 0 < radius_km <= MAX_RADIUS_KM:
+        raise serializers.ValidationError({'radius': f'Must be more than 0 and at most {MAX_RADIUS_KM} km.'})
+    return (*point, radius_km)
@@ -0,0 +1,189 @@
+"""
+Idempotency-Key support for POST endpoints.
+
+A client sends the same `Idempotency-Key` header on every retry of one
+logical request. The first request claims the key by inserting an
+in-progress IdempotencyKey row; when it finishes, its response is stored
+on that row and later retries get the stored response back without the
+handler running again. A retry that arrives while the first request is
+still running polls the row until it completes instead of racing it.
+
+5xx responses and unhandled exceptions release the key so the client can
+retry for real. Keys expire after IDEMPOTENCY_KEY_TTL seconds.
+
+A request that never finishes (its worker was killed) can't release its
+key, so an in-progress key is only a lease: once it is older than
+IDEMPOTENCY_LEASE_TIMEOUT, a retry with the same payload takes it over
+and runs the handler. The original request's outcome is then discarded,
+since it only writes to a key that still carries its own lease.
+
+Rate limits run before the handler, so a throttle should let through a
+retry that has a stored response to replay (`has_stored_response`);
+otherwise a safe retry could be answered with a 429.
+"""
+import functools
+import hashlib
+import json
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+
+HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+POLL_INTERVAL = 0.1
+
+
+def _request_hash(request):
+    payload = json.dumps(request.data, sort_keys=True, cls=DjangoJSONEncoder)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _endpoint(request):
+    return f'{request.method} {request.path}'[:100]
+
+
+def has_stored_response(request):
+    """Whether this request is a retry whose completed response will be replayed."""
+    key = request.headers.get(HEADER)
+    if not key or len(key) > MAX_KEY_LENGTH or not request.user.is_authenticated:
+        return False
+    return IdempotencyKey.objects.filter(
+        user=request.user,
+        endpoint=_endpoint(request),
+        key=key,
+        request_hash=_request_hash(request),
+        status='completed',
+        expires_at__gt=timezone.now()
+    ).exists()
+
+
+def _claim(user, endpoint, key, request_hash):
+    """
+    Try to take ownership of a key.
+    Returns (record, True) if this request should run the handler,
+    or (existing record, False) if another request already holds it.
+    """
+    now = timezone.now()
+    ttl = getattr(settings, 'IDEMPOTENCY_KEY_TTL', 24 * 60 * 60)
+    lease = timedelta(seconds=getattr(settings, 'IDEMPOTENCY_LEASE_TIMEOUT', 60))
+    while True:
+        try:
+            with transaction.atomic():
+                return IdempotencyKey.objects.create(
+                    user=user,
+                    endpoint=endpoint,
+                    key=key,
+                    request_hash=request_hash,
+                    locked_at=now,
+                    expires_at=now + timedelta(seconds=ttl)
+                ), True
+        except IntegrityError:
+            record = IdempotencyKey.objects.filter(user=user, endpoint=endpoint, key=key).first()
+            if record is None:
+                # Released between our insert and lookup
+                continue
+            if record.expires_at <= now:
+                record.delete()
+                continue
+            if (
+                record.status == 'in_progress'
+                and record.request_hash == request_hash
+                and record.locked_at <= now - lease
+            ):
+                # Abandoned by a request that never finished; only one retry gets it
+                taken = _own(record).update(locked_at=now)
+                if taken:
+                    record.locked_at = now
+                    return record, True
+                continue
+            return record, False
+
+
+def _own(record):
+    """The key's row, as long as it is still held under `record`'s lease."""
+    return IdempotencyKey.objects.filter(pk=record.pk, status='in_progress', locked_at=record.locked_at)
+
+
+def _wait_for_completion(record):
+    """
+    Poll an in-progress key until it completes or the wait times out.
+    Returns None if the other request released the key.
+    """
+    deadline = time.monotonic() + getattr(settings, 'IDEMPOTENCY_WAIT_TIMEOUT', 10)
+    while record.status == 'in_progress' and time.monotonic() < deadline:
+        time.sleep(POLL_INTERVAL)
+        record = IdempotencyKey.objects.filter(pk=record.pk).first()
+        if record is None:
+            return None
+    return record
+
+
+def idempotent(handler):
+    """
+    Decorator for DRF view handlers that honours the Idempotency-Key header.
+    Requests without the header are handled as usual.
+    """
+    @functools.wraps(handler)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if not key or not request.user.is_authenticated:
+            return handler(self, request, *args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return Response(
+                {'error': f'{HEADER} must be at most {MAX_KEY_LENGTH} characters'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        endpoint = _endpoint(request)
+        request_hash = _request_hash(request)
+
+        while True:
+            record, claimed = _claim(request.user, endpoint, key, request_hash)
+            if claimed:
+                break
+            if record.request_hash != request_hash:
+                return Response(
+                    {'error': f'{HEADER} was already used with a different request'},
+                    status=status.HTTP_422_UNPROCESSABLE_ENTITY
+                )
+            record = _wait_for_completion(record)
+            if record is None:
+                # The first attempt failed and released the key - run it ourselves
+                continue
+            if record.status == 'in_progress':
+                return Response(
+                    {'error': 'A request with this Idempotency-Key is still being processed'},
+                    status=status.HTTP_409_CONFLICT,
+                    headers={'Retry-After': '1'}
+                )
+            return Response(
+                record.response_body,
+                status=record.response_status,
+                headers={'Idempotent-Replayed': 'true'}
+            )
+
+        try:
+            response = handler(self, request, *args, **kwargs)
+        except Exception:
+            _own(record).delete()
+            raise
+
+        if response.status_code >= 500:
+            _own(record).delete()
+        else:
+            _own(record).update(
+                status='completed',
+                response_status=response.status_code,
+                response_body=response.data
+            )
+        return response
+
+    return wrapper
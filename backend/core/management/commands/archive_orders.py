@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.services.order_archive import archivable_orders, archive_batch, archive_cutoff
+
+
+class Command(BaseCommand):
+    help = "Move completed and cancelled orders into the archive table in batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--older-than',
+            type=int,
+            help="Archive orders closed more than this many days ago. Defaults to ORDER_ARCHIVE_AFTER_DAYS."
+        )
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--dry-run', action='store_true', help="Only count the orders that would move")
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size must be at least 1")
+        cutoff = archive_cutoff(options['older_than'])
+
+        if options['dry_run']:
+            count = archivable_orders(cutoff).count()
+            self.stdout.write(f"{count} orders closed before {cutoff:%Y-%m-%d} would be archived")
+            return
+
+        moved = 0
+        # One transaction per batch keeps locks short on a live database
+        while True:
+            count = archive_batch(cutoff, options['batch_size'])
+            if not count:
+                break
+            moved += count
+            self.stdout.write(f"Archived {moved} orders...")
+        self.stdout.write(self.style.SUCCESS(f"Archived {moved} orders closed before {cutoff:%Y-%m-%d}"))
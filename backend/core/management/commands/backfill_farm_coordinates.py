@@ -0,0 +1,54 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from core.geo import parse_location
+from core.models import Farm
+
+
+class Command(BaseCommand):
+    help = "Fill Farm.latitude/longitude from the farms' map links"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--dry-run', action='store_true', help="Only report what would change")
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        if batch_size < 1:
+            raise CommandError("--batch-size must be at least 1")
+
+        checked = updated = unparsed = 0
+        last_id = 0
+        while True:
+            farms = list(
+                Farm.objects.filter(id__gt=last_id).order_by('id')
+                .only('id', 'location', 'latitude', 'longitude')[:batch_size]
+            )
+            if not farms:
+                break
+            last_id = farms[-1].id
+
+            changed = []
+            now = timezone.now()
+            for farm in farms:
+                coordinates = parse_location(farm.location) or (None, None)
+                if coordinates[0] is None:
+                    unparsed += 1
+                    if options['verbosity'] > 1:
+                        self.stdout.write(f"Farm #{farm.id}: no coordinates in {farm.location!r}")
+                if coordinates != (farm.latitude, farm.longitude):
+                    farm.latitude, farm.longitude = coordinates
+                    farm.updated_at = now
+                    changed.append(farm)
+            checked += len(farms)
+            updated += len(changed)
+            if changed and not options['dry_run']:
+                # bulk_update skips pre_save, so the coordinates are set above
+                with transaction.atomic():
+                    Farm.objects.bulk_update(changed, ['latitude', 'longitude', 'updated_at'], batch_size=500)
+
+        verb = "would be updated" if options['dry_run'] else "updated"
+        self.stdout.write(self.style.SUCCESS(
+            f"Checked {checked} farms, {updated} {verb}, {unparsed} without coordinates"
+        ))
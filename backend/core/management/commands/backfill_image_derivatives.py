@@ -0,0 +1,81 @@
+import multiprocessing
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from PIL import Image
+
+from core.services.image_derivatives import MODELS, build_derivatives, image_storage, store_derivatives
+
+
+def _build(task):
+    model_name, pk, source = task
+    try:
+        return model_name, pk, source, build_derivatives(image_storage(MODELS[model_name]), source), None
+    except (OSError, Image.DecompressionBombError) as exc:
+        return model_name, pk, source, None, str(exc)
+
+
+class Command(BaseCommand):
+    help = "Make the resized copies of existing farm and product images, in parallel"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=200)
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count() or 1,
+            help="Number of processes resizing images (1 runs them in this process)"
+        )
+        parser.add_argument('--model', choices=sorted(MODELS), help="Only farms or only products")
+        parser.add_argument('--force', action='store_true', help="Also redo images that already have copies")
+        parser.add_argument('--dry-run', action='store_true', help="Only report what would be processed")
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        if batch_size < 1:
+            raise CommandError("--batch-size must be at least 1")
+        if options['workers'] < 1:
+            raise CommandError("--workers must be at least 1")
+
+        pool = None
+        if options['workers'] > 1 and not options['dry_run']:
+            # Workers only read and write files; the database stays with this process
+            connections.close_all()
+            pool = multiprocessing.Pool(options['workers'])
+        try:
+            for model_name in [options['model']] if options['model'] else sorted(MODELS):
+                self._backfill(model_name, batch_size, pool, options)
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+
+    def _backfill(self, model_name, batch_size, pool, options):
+        model = MODELS[model_name]
+        rows = model.objects.exclude(image='').exclude(image__isnull=True)
+        if not options['force']:
+            rows = rows.filter(image_derivatives={})
+
+        checked = built = failed = 0
+        last_id = 0
+        while True:
+            batch = list(rows.filter(id__gt=last_id).order_by('id').values_list('id', 'image')[:batch_size])
+            if not batch:
+                break
+            last_id = batch[-1][0]
+            checked += len(batch)
+            if options['dry_run']:
+                continue
+
+            tasks = [(model_name, pk, source) for pk, source in batch]
+            results = pool.imap_unordered(_build, tasks) if pool is not None else map(_build, tasks)
+            for _, pk, source, derivatives, error in results:
+                if error is not None:
+                    failed += 1
+                    self.stderr.write(f"{model_name.capitalize()} #{pk}: can't read {source}: {error}")
+                elif store_derivatives(model, pk, source, derivatives):
+                    built += 1
+
+        verb = "would be processed" if options['dry_run'] else "processed"
+        self.stdout.write(self.style.SUCCESS(
+            f"{checked} {model_name} images {verb}, {built} with new copies, {failed} unreadable"
+        ))
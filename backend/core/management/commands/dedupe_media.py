@@ -0,0 +1,77 @@
+import posixpath
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from core.services.image_derivatives import MODELS, image_storage
+from core.storage import is_content_addressed
+
+
+class Command(BaseCommand):
+    help = (
+        "Move farm and product images to content-addressed names, keeping one copy "
+        "of identical files, and point the image fields at the new names"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--keep-originals', action='store_true', help="Don't delete the files that were moved")
+        parser.add_argument('--dry-run', action='store_true', help="Only report what would change")
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        if batch_size < 1:
+            raise CommandError("--batch-size must be at least 1")
+        for model_name in sorted(MODELS):
+            self._dedupe(MODELS[model_name], batch_size, options)
+
+    def _dedupe(self, model, batch_size, options):
+        storage = image_storage(model)
+        directory = model._meta.get_field('image').upload_to.rstrip('/')
+        label = model._meta.verbose_name_plural.lower()
+
+        # Every file in the upload directory, referenced or not, gets its hashed name
+        renamed = {}
+        files = storage.listdir(directory)[1] if storage.exists(directory) else []
+        for filename in files:
+            name = posixpath.join(directory, filename)
+            if is_content_addressed(name):
+                continue
+            with storage.open(name, 'rb') as content:
+                renamed[name] = storage.hashed_name(name, content) if options['dry_run'] else storage.save(name, content)
+        stored = len(set(renamed.values()))
+
+        rewritten = 0
+        if renamed:
+            last_id = 0
+            rows = model.objects.filter(image__in=list(renamed))
+            while True:
+                batch = list(
+                    rows.filter(id__gt=last_id).order_by('id').only('id', 'image', 'image_derivatives', 'updated_at')[:batch_size]
+                )
+                if not batch:
+                    break
+                last_id = batch[-1].id
+                now = timezone.now()
+                for row in batch:
+                    row.image.name = renamed[row.image.name]
+                    row.updated_at = now  # Image URLs are in the ETags' responses
+                    if row.image_derivatives:
+                        # The copies stay valid; they just belong to the new name now
+                        row.image_derivatives = {**row.image_derivatives, 'source': row.image.name}
+                rewritten += len(batch)
+                if not options['dry_run']:
+                    # bulk_update skips the save signals, so no derivative jobs are queued
+                    with transaction.atomic():
+                        model.objects.bulk_update(batch, ['image', 'image_derivatives', 'updated_at'], batch_size=500)
+
+        if not options['dry_run'] and not options['keep_originals']:
+            for name in renamed:
+                storage.delete(name)
+
+        verb = "would be" if options['dry_run'] else "were"
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(renamed)} {label} images {verb} stored as {stored} files; "
+            f"{rewritten} {label} {verb} pointed at the new names"
+        ))
@@ -0,0 +1,63 @@
+from datetime import datetime, time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from core.models import Order, FarmDailyLoad, UserDailyLoad
+
+
+class Command(BaseCommand):
+    help = "Recompute the farm and user daily load counters from order history"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--since',
+            help="Only rebuild days from this date on (YYYY-MM-DD). Defaults to all history."
+        )
+
+    def handle(self, *args, **options):
+        since = None
+        if options['since']:
+            since = parse_date(options['since'])
+            if since is None:
+                raise CommandError(f"Invalid date: {options['since']}")
+
+        orders = Order.objects.exclude(status='cancelled')
+        if since:
+            # A range on created_at itself (not created_at::date) can use the order indexes
+            start = timezone.make_aware(datetime.combine(since, time.min))
+            orders = orders.filter(created_at__gte=start)
+        days = orders.annotate(day=TruncDate('created_at', tzinfo=timezone.get_current_timezone()))
+
+        farm_loads = [
+            FarmDailyLoad(farm_id=row['farm_id'], day=row['day'], orders=row['orders'], quantity=row['quantity'] or 0)
+            for row in days.values('farm_id', 'day').annotate(
+                orders=Count('id', distinct=True), quantity=Sum('items__quantity')
+            ).order_by()
+        ]
+        user_loads = [
+            UserDailyLoad(user_id=row['consumer_id'], day=row['day'], orders=row['orders'], quantity=row['quantity'] or 0)
+            for row in days.values('consumer_id', 'day').annotate(
+                orders=Count('id', distinct=True), quantity=Sum('items__quantity')
+            ).order_by()
+        ]
+
+        with transaction.atomic():
+            stale_farm_loads = FarmDailyLoad.objects.all()
+            stale_user_loads = UserDailyLoad.objects.all()
+            if since:
+                stale_farm_loads = stale_farm_loads.filter(day__gte=since)
+                stale_user_loads = stale_user_loads.filter(day__gte=since)
+            stale_farm_loads.delete()
+            stale_user_loads.delete()
+
+            FarmDailyLoad.objects.bulk_create(farm_loads, batch_size=1000)
+            UserDailyLoad.objects.bulk_create(user_loads, batch_size=1000)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt {len(farm_loads)} farm and {len(user_loads)} user daily loads"
+        ))
@@ -0,0 +1,56 @@
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from core.models import Order, OrderItem
+from core.services.order_totals import calculate_totals
+
+
+class Command(BaseCommand):
+    help = "Recompute Order.total_amount from order items and fix the ones that drifted"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=2000)
+        parser.add_argument('--dry-run', action='store_true', help="Only report the orders that drifted")
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        if chunk_size < 1:
+            raise CommandError("--chunk-size must be at least 1")
+
+        checked = fixed = 0
+        last_id = 0
+        while True:
+            # Walk orders by id so each chunk is an index range, not an OFFSET
+            orders = list(
+                Order.objects.filter(id__gt=last_id).order_by('id').values_list('id', 'total_amount')[:chunk_size]
+            )
+            if not orders:
+                break
+            last_id = orders[-1][0]
+
+            items = OrderItem.objects.filter(
+                order_id__gte=orders[0][0], order_id__lte=last_id
+            ).values_list('order_id', 'quantity', 'price')
+            try:
+                totals = calculate_totals(items.iterator(chunk_size=chunk_size))
+            except ValueError as exc:
+                raise CommandError(f"Orders {orders[0][0]}-{last_id}: {exc}")
+
+            drifted = [
+                Order(id=order_id, total_amount=totals.get(order_id, Decimal('0.00')))
+                for order_id, total_amount in orders
+                if totals.get(order_id, Decimal('0.00')) != total_amount
+            ]
+            checked += len(orders)
+            fixed += len(drifted)
+            if options['verbosity'] > 1:
+                for order in drifted:
+                    self.stdout.write(f"Order #{order.id}: total should be {order.total_amount}")
+            if drifted and not options['dry_run']:
+                with transaction.atomic():
+                    Order.objects.bulk_update(drifted, ['total_amount'], batch_size=500)
+
+        verb = "would be fixed" if options['dry_run'] else "fixed"
+        self.stdout.write(self.style.SUCCESS(f"Checked {checked} orders, {fixed} {verb}"))
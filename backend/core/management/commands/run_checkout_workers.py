@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from core.management.worker_pool import run_worker_pool
+from core.services.checkout_queue import drain, process_next
+
+
+class Command(BaseCommand):
+    help = "Run a pool of worker processes that turn queued checkout requests into orders"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=2, help="Number of worker processes")
+        parser.add_argument(
+            '--poll-interval', type=float, default=1.0,
+            help="Seconds a worker sleeps when the queue is empty"
+        )
+        parser.add_argument('--once', action='store_true', help="Drain the queue in this process and exit")
+
+    def handle(self, *args, **options):
+        if options['once']:
+            processed = drain()
+            self.stdout.write(self.style.SUCCESS(f"Processed {processed} checkout requests"))
+            return
+
+        run_worker_pool(self, 'checkout', process_next, options['workers'], options['poll_interval'])
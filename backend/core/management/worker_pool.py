@@ -0,0 +1,60 @@
+"""
+A supervised pool of queue-worker processes for the run_*_workers commands.
+"""
+import logging
+import multiprocessing
+import signal
+import sys
+import time
+
+from django.db import close_old_connections, connections
+
+logger = logging.getLogger(__name__)
+
+
+def _worker(process_next, poll_interval):
+    # Ctrl+C is handled by the parent, which terminates the pool
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    while True:
+        close_old_connections()
+        try:
+            processed = process_next()
+        except Exception:
+            # e.g. the database went away; jobs record their own failures
+            logger.exception("Worker failed to process the queue")
+            processed = None
+        if processed is None:
+            time.sleep(poll_interval)
+
+
+def run_worker_pool(command, name, process_next, workers, poll_interval):
+    """
+    Run `workers` processes calling `process_next()` until the command is
+    stopped, restarting any that die. `name` is used in log lines.
+    """
+    def start():
+        process = multiprocessing.Process(target=_worker, args=(process_next, poll_interval), daemon=True)
+        process.start()
+        return process
+
+    # Children must open their own database connections
+    connections.close_all()
+    pool = [start() for _ in range(workers)]
+    command.stdout.write(f"Started {len(pool)} {name} workers")
+    # Stop cleanly when the process manager sends SIGTERM
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
+    try:
+        while True:
+            for index, process in enumerate(pool):
+                if not process.is_alive():
+                    command.stderr.write(f"{name.capitalize()} worker {process.pid} exited ({process.exitcode}), restarting")
+                    pool[index] = start()
+            time.sleep(1)
+    except (KeyboardInterrupt, SystemExit):
+        command.stdout.write(f"Stopping {name} workers")
+    finally:
+        for process in pool:
+            process.terminate()
+        for process in pool:
+            process.join()
@@ -0,0 +1,59 @@
+# Generated by Django 4.2 on 2026-10-18 18:21
+
+from django.conf import settings
+import django.core.validators
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_order_tracking_number'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='farm',
+            name='daily_capacity',
+            field=models.IntegerField(blank=True, default=50, help_text='Maximum number of orders per day', null=True, validators=[django.core.validators.MinValueValidator(0)]),
+        ),
+        migrations.CreateModel(
+            name='UserDailyLoad',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('orders', models.IntegerField(default=0)),
+                ('quantity', models.IntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_loads', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'User Daily Load',
+                'verbose_name_plural': 'User Daily Loads',
+                'db_table': 'user_daily_loads',
+            },
+        ),
+        migrations.CreateModel(
+            name='FarmDailyLoad',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('orders', models.IntegerField(default=0)),
+                ('quantity', models.IntegerField(default=0)),
+                ('farm', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_loads', to='core.farm')),
+            ],
+            options={
+                'verbose_name': 'Farm Daily Load',
+                'verbose_name_plural': 'Farm Daily Loads',
+                'db_table': 'farm_daily_loads',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='userdailyload',
+            constraint=models.UniqueConstraint(fields=('user', 'day'), name='unique_user_daily_load'),
+        ),
+        migrations.AddConstraint(
+            model_name='farmdailyload',
+            constraint=models.UniqueConstraint(fields=('farm', 'day'), name='unique_farm_daily_load'),
+        ),
+    ]
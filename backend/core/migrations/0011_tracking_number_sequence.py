@@ -0,0 +1,41 @@
+# Generated by Django 4.2 on 2026-10-18 18:24
+
+from django.db import migrations, models
+
+
+def create_tracking_sequence(apps, schema_editor):
+    # Postgres hands out tracking numbers from a real sequence; CACHE lets each
+    # connection reserve a block of values at a time
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('CREATE SEQUENCE IF NOT EXISTS order_tracking_number_seq CACHE 50')
+    else:
+        SequenceCounter = apps.get_model('core', 'SequenceCounter')
+        SequenceCounter.objects.get_or_create(name='order_tracking_number_seq')
+
+
+def drop_tracking_sequence(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('DROP SEQUENCE IF EXISTS order_tracking_number_seq')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_daily_loads'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SequenceCounter',
+            fields=[
+                ('name', models.CharField(max_length=100, primary_key=True, serialize=False)),
+                ('value', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Sequence Counter',
+                'verbose_name_plural': 'Sequence Counters',
+                'db_table': 'sequence_counters',
+            },
+        ),
+        migrations.RunPython(create_tracking_sequence, drop_tracking_sequence),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 4.2 on 2026-10-18 18:27
+
+from django.conf import settings
+import django.core.serializers.json
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_idempotency_keys'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CheckoutRequest',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tracking_number', models.CharField(max_length=50, unique=True)),
+                ('payload', models.JSONField(encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('done', 'Done'), ('rejected', 'Rejected')], default='queued', max_length=20)),
+                ('errors', models.JSONField(blank=True, default=list)),
+                ('order_tracking_numbers', models.JSONField(blank=True, default=list)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('processed_at', models.DateTimeField(blank=True, null=True)),
+                ('consumer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='checkout_requests', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Checkout Request',
+                'verbose_name_plural': 'Checkout Requests',
+                'db_table': 'checkout_requests',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='checkoutrequest',
+            index=models.Index(condition=models.Q(('status', 'queued')), fields=['id'], name='checkout_queue_idx'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 4.2 on 2026-10-18 18:37
+
+from django.conf import settings
+import django.core.serializers.json
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedOrder',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('confirmed', 'Confirmed'), ('preparing', 'Preparing'), ('ready', 'Ready'), ('completed', 'Completed'), ('cancelled', 'Cancelled')], max_length=20)),
+                ('tracking_number', models.CharField(blank=True, max_length=50, null=True, unique=True)),
+                ('data', models.JSONField(encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('created_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('consumer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_orders', to=settings.AUTH_USER_MODEL)),
+                ('farm', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_orders', to='core.farm')),
+            ],
+            options={
+                'verbose_name': 'Archived Order',
+                'verbose_name_plural': 'Archived Orders',
+                'db_table': 'archived_orders',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='archivedorder',
+            index=models.Index(fields=['consumer', '-created_at'], name='archived_consumer_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedorder',
+            index=models.Index(fields=['farm', '-created_at'], name='archived_farm_created_idx'),
+        ),
+    ]
@@ -0,0 +1,109 @@
+# Generated by Django 4.2 on 2026-10-18 18:42
+
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations, models, transaction
+
+from core.search import SEARCH_CONFIG, farm_search_document, fts_table, product_search_document
+
+
+def search_indexes(model):
+    table = model._meta.db_table
+    return [
+        # Must match the SearchVector expression core.search filters on
+        GinIndex(SearchVector('search_document', config=SEARCH_CONFIG), name=f'{table}_search_vector_idx'),
+        GinIndex(OpClass('search_document', name='gin_trgm_ops'), name=f'{table}_search_trgm_idx'),
+    ]
+
+
+BATCH_SIZE = 1000
+
+
+def _in_batches(queryset):
+    """Rows in id order, BATCH_SIZE at a time, so big tables aren't loaded whole."""
+    last_id = 0
+    while True:
+        batch = list(queryset.filter(id__gt=last_id).order_by('id')[:BATCH_SIZE])
+        if not batch:
+            return
+        yield batch
+        last_id = batch[-1].id
+
+
+def build_search_documents(apps, schema_editor):
+    Farm = apps.get_model('core', 'Farm')
+    Product = apps.get_model('core', 'Product')
+    sqlite = schema_editor.connection.vendor == 'sqlite'
+
+    for model, rows, build in (
+        (Farm, Farm.objects.all(), farm_search_document),
+        (Product, Product.objects.select_related('farm'), product_search_document),
+    ):
+        for batch in _in_batches(rows):
+            for row in batch:
+                row.search_document = build(row)
+            # The migration isn't atomic, so each batch commits on its own
+            with transaction.atomic():
+                model.objects.bulk_update(batch, ['search_document'], batch_size=500)
+                if sqlite:
+                    with schema_editor.connection.cursor() as cursor:
+                        cursor.executemany(
+                            f'INSERT INTO {fts_table(model)} (rowid, search_document) VALUES (%s, %s)',
+                            [(row.pk, row.search_document) for row in batch]
+                        )
+
+
+def create_fts_tables(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        for model in (apps.get_model('core', 'Farm'), apps.get_model('core', 'Product')):
+            schema_editor.execute(
+                f"CREATE VIRTUAL TABLE {fts_table(model)} USING fts5(search_document, tokenize='unicode61')"
+            )
+
+
+def drop_fts_tables(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        for model in (apps.get_model('core', 'Farm'), apps.get_model('core', 'Product')):
+            schema_editor.execute(f'DROP TABLE {fts_table(model)}')
+
+
+def create_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        for model in (apps.get_model('core', 'Farm'), apps.get_model('core', 'Product')):
+            for index in search_indexes(model):
+                # Built once the documents are filled in, without blocking writes
+                schema_editor.add_index(model, index, concurrently=True)
+
+
+def drop_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        for model in (apps.get_model('core', 'Farm'), apps.get_model('core', 'Product')):
+            for index in search_indexes(model):
+                schema_editor.remove_index(model, index, concurrently=True)
+
+
+class Migration(migrations.Migration):
+
+    # CREATE INDEX CONCURRENTLY can't run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('core', '0015_archived_orders'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='farm',
+            name='search_document',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='search_document',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.RunPython(create_fts_tables, drop_fts_tables),
+        migrations.RunPython(build_search_documents, migrations.RunPython.noop),
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 4.2 on 2026-10-18 19:30
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_search_documents'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='farm',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 4.2 on 2026-10-18 20:05
+
+from django.db import migrations, models
+
+from core.migration_operations import AddIndexConcurrently
+
+
+class Migration(migrations.Migration):
+
+    # CREATE INDEX CONCURRENTLY can't run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('core', '0017_farm_updated_at'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='farm',
+            index=models.Index(fields=['type', 'administrative_region', 'governorate'], name='farm_facets_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='farm',
+            index=models.Index(fields=['administrative_region', 'governorate'], name='farm_region_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='product',
+            index=models.Index(condition=models.Q(('is_available', True)), fields=['price'], name='product_available_price_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='product',
+            index=models.Index(condition=models.Q(('is_available', True)), fields=['farm', 'price', 'stock_quantity'], name='product_available_facets_idx'),
+        ),
+    ]
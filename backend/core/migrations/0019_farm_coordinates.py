@@ -0,0 +1,32 @@
+# Generated by Django 4.2 on 2026-10-18 20:40
+
+from django.db import migrations, models
+
+from core.migration_operations import AddIndexConcurrently
+
+
+class Migration(migrations.Migration):
+
+    # CREATE INDEX CONCURRENTLY can't run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('core', '0018_facet_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='farm',
+            name='latitude',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='farm',
+            name='longitude',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        AddIndexConcurrently(
+            model_name='farm',
+            index=models.Index(fields=['latitude', 'longitude'], name='farm_coordinates_idx'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 4.2 on 2026-10-18 21:10
+
+from django.db import migrations, models
+
+from core.migration_operations import AddIndexConcurrently
+
+
+class Migration(migrations.Migration):
+
+    # CREATE INDEX CONCURRENTLY can't run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('core', '0019_farm_coordinates'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='farm',
+            name='price',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, max_digits=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='farm',
+            name='price_unit',
+            field=models.CharField(blank=True, editable=False, max_length=20, null=True),
+        ),
+        AddIndexConcurrently(
+            model_name='farm',
+            index=models.Index(fields=['price'], name='farm_price_idx'),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 4.2 on 2026-10-18 22:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0020_farm_price'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='farm',
+            name='image_derivatives',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='image_derivatives',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.CreateModel(
+            name='ImageDerivativeJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model_name', models.CharField(choices=[('farm', 'Farm'), ('product', 'Product')], max_length=20)),
+                ('object_id', models.BigIntegerField()),
+                ('source', models.CharField(max_length=255)),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('done', 'Done'), ('failed', 'Failed')], default='queued', max_length=20)),
+                ('error', models.TextField(blank=True, default='')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('processed_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Image Derivative Job',
+                'verbose_name_plural': 'Image Derivative Jobs',
+                'db_table': 'image_derivative_jobs',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='imagederivativejob',
+            index=models.Index(condition=models.Q(('status', 'queued')), fields=['id'], name='image_job_queue_idx'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 4.2 on 2026-10-18 22:40
+
+import core.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0021_image_derivatives'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='farm',
+            name='image',
+            field=models.ImageField(blank=True, null=True, storage=core.storage.ContentAddressedStorage(), upload_to='farms/'),
+        ),
+        migrations.AlterField(
+            model_name='product',
+            name='image',
+            field=models.ImageField(blank=True, null=True, storage=core.storage.ContentAddressedStorage(), upload_to='products/'),
+        ),
+    ]
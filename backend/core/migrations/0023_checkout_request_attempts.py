@@ -0,0 +1,28 @@
+# Generated by Django 4.2 on 2026-10-18 23:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0022_content_addressed_images'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='checkoutrequest',
+            name='attempts',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='checkoutrequest',
+            name='claimed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='checkoutrequest',
+            name='status',
+            field=models.CharField(choices=[('queued', 'Queued'), ('done', 'Done'), ('rejected', 'Rejected'), ('failed', 'Failed')], default='queued', max_length=20),
+        ),
+    ]
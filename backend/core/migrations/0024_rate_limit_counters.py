@@ -0,0 +1,28 @@
+# Generated by Django 4.2 on 2026-10-18 23:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0023_checkout_request_attempts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RateLimitCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=150)),
+                ('window', models.BigIntegerField()),
+                ('count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Rate Limit Counter',
+                'verbose_name_plural': 'Rate Limit Counters',
+                'db_table': 'rate_limit_counters',
+                'constraints': [models.UniqueConstraint(fields=('key', 'window'), name='unique_rate_limit_window')],
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 4.2 on 2026-10-19 00:20
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0024_rate_limit_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='idempotencykey',
+            name='locked_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
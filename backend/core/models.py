@@ -1,6 +1,10 @@
 from django.db import models
 from django.contrib.auth.models import AbstractUser
+from django.core.serializers.json import DjangoJSONEncoder
 from django.core.validators import MinValueValidator
+from django.utils import timezone
+
+from .storage import content_addressed_storage
 
 # Default image placeholder URL
 DEFAULT_IMAGE_URL = 'https://www.alyaum.com/uploads/images/2021/07/05/thumbs/350x350/1097681.jpg'
@@ -89,9 +93,12 @@ class Farm(models.Model):
     governorate = models.CharField(max_length=200, blank=True, null=True)  # المحافظة/الموقع
     type = models.CharField(max_length=100, choices=TYPE_CHOICES, blank=True, null=True)  # النوع
     price_per_kg = models.CharField(max_length=50, blank=True, null=True, help_text="السعر/كجم (مثل: 78 ريال/كجم)")
+    price = models.DecimalField(max_digits=10, decimal_places=2, blank=True, null=True, editable=False)  # Parsed from price_per_kg (core.prices)
+    price_unit = models.CharField(max_length=20, blank=True, null=True, editable=False)  # kg, liter, piece, etc.
     phone_number = models.CharField(max_length=15, blank=True)  # رقم التواصل
-    image = models.ImageField(upload_to='farms/', blank=True, null=True)  # صورة المزرعة
+    image = models.ImageField(upload_to='farms/', storage=content_addressed_storage, blank=True, null=True)  # صورة المزرعة
     image_url = models.TextField(max_length=500, default=DEFAULT_IMAGE_URL, blank=True, null=True)
+    image_derivatives = models.JSONField(default=dict, blank=True, editable=False)  # Resized copies (core.services.image_derivatives)
     daily_capacity = models.IntegerField(
         default=50,
         validators=[MinValueValidator(0)],
@@ -99,11 +106,24 @@ class Farm(models.Model):
         null=True,
         help_text="Maximum number of orders per day"
     )
+    search_document = models.TextField(blank=True, default='', editable=False)  # Normalized text for search (core.search)
+    latitude = models.FloatField(blank=True, null=True, editable=False)  # Parsed from location (core.geo)
+    longitude = models.FloatField(blank=True, null=True, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)  # Used for ETags (core.conditional)
     
     class Meta:
         db_table = 'farms'
         verbose_name = 'Farm'
         verbose_name_plural = 'Farms'
+        indexes = [
+            # Facet filters and counts (core.facets); the first also covers the counts query
+            models.Index(fields=['type', 'administrative_region', 'governorate'], name='farm_facets_idx'),
+            models.Index(fields=['administrative_region', 'governorate'], name='farm_region_idx'),
+            # Bounding-box prefilter for nearest-farm search
+            models.Index(fields=['latitude', 'longitude'], name='farm_coordinates_idx'),
+            # ordering=price and the price range filter
+            models.Index(fields=['price'], name='farm_price_idx'),
+        ]
     
     def __str__(self):
         return f"{self.name} - {self.owner.email}"
@@ -122,9 +142,11 @@ class Product(models.Model):
         validators=[MinValueValidator(0)]
     )
     unit = models.CharField(max_length=50, default='kg')  # kg, liter, piece, etc.
-    image = models.ImageField(upload_to='products/', blank=True, null=True)
+    image = models.ImageField(upload_to='products/', storage=content_addressed_storage, blank=True, null=True)
     image_url = models.TextField(max_length=500, default=DEFAULT_IMAGE_URL, blank=True, null=True)
+    image_derivatives = models.JSONField(default=dict, blank=True, editable=False)  # Resized copies (core.services.image_derivatives)
     is_available = models.BooleanField(default=True)
+    search_document = models.TextField(blank=True, default='', editable=False)  # Normalized text for search (core.search)
     
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -134,6 +156,30 @@ class Product(models.Model):
         verbose_name = 'Product'
         verbose_name_plural = 'Products'
         ordering = ['-created_at']
+        indexes = [
+            # Catalog listing and keyset pagination only ever read available products
+            models.Index(
+                fields=['-created_at', '-id'],
+                condition=models.Q(is_available=True),
+                name='product_available_recent_idx'
+            ),
+            models.Index(
+                fields=['farm', '-created_at'],
+                condition=models.Q(is_available=True),
+                name='product_available_farm_idx'
+            ),
+            # Price range filter, and every column the facet counts read
+            models.Index(
+                fields=['price'],
+                condition=models.Q(is_available=True),
+                name='product_available_price_idx'
+            ),
+            models.Index(
+                fields=['farm', 'price', 'stock_quantity'],
+                condition=models.Q(is_available=True),
+                name='product_available_facets_idx'
+            ),
+        ]
     
     def __str__(self):
         return f"{self.name} - {self.farm.name}"
@@ -179,6 +225,11 @@ class Order(models.Model):
         verbose_name = 'Order'
         verbose_name_plural = 'Orders'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['farm', '-created_at'], name='order_farm_created_idx'),
+            models.Index(fields=['consumer', '-created_at'], name='order_consumer_created_idx'),
+            models.Index(fields=['status', '-created_at'], name='order_status_created_idx'),
+        ]
     
     def __str__(self):
         return f"Order #{self.id} - {self.consumer.email}"
@@ -202,6 +253,229 @@ class OrderItem(models.Model):
         return f"{self.product.name} x{self.quantity}"
 
 
+class FarmDailyLoad(models.Model):
+    """
+    FarmDailyLoad model - running count of a farm's orders for one day.
+    Maintained by checkout so capacity checks never have to count orders.
+    """
+    farm = models.ForeignKey(Farm, on_delete=models.CASCADE, related_name='daily_loads')
+    day = models.DateField()
+    orders = models.IntegerField(default=0)
+    quantity = models.IntegerField(default=0)  # Total item quantity across the day's orders
+    
+    class Meta:
+        db_table = 'farm_daily_loads'
+        verbose_name = 'Farm Daily Load'
+        verbose_name_plural = 'Farm Daily Loads'
+        constraints = [
+            models.UniqueConstraint(fields=['farm', 'day'], name='unique_farm_daily_load'),
+        ]
+    
+    def __str__(self):
+        return f"Farm #{self.farm_id} - {self.day}: {self.orders} orders"
+
+
+class UserDailyLoad(models.Model):
+    """
+    UserDailyLoad model - running count of a consumer's orders for one day.
+    Used to enforce User.daily_order_limit.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='daily_loads')
+    day = models.DateField()
+    orders = models.IntegerField(default=0)
+    quantity = models.IntegerField(default=0)
+    
+    class Meta:
+        db_table = 'user_daily_loads'
+        verbose_name = 'User Daily Load'
+        verbose_name_plural = 'User Daily Loads'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'day'], name='unique_user_daily_load'),
+        ]
+    
+    def __str__(self):
+        return f"User #{self.user_id} - {self.day}: {self.orders} orders"
+
+
+class SequenceCounter(models.Model):
+    """
+    SequenceCounter model - named counter standing in for a database
+    sequence on backends that don't have one (SQLite)
+    """
+    name = models.CharField(max_length=100, primary_key=True)
+    value = models.BigIntegerField(default=0)
+    
+    class Meta:
+        db_table = 'sequence_counters'
+        verbose_name = 'Sequence Counter'
+        verbose_name_plural = 'Sequence Counters'
+    
+    def __str__(self):
+        return f"{self.name}: {self.value}"
+
+
+class RateLimitCounter(models.Model):
+    """
+    RateLimitCounter model - requests one client made in one fixed rate
+    limit window (core.throttling)
+    """
+    key = models.CharField(max_length=150)
+    window = models.BigIntegerField()
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        db_table = 'rate_limit_counters'
+        verbose_name = 'Rate Limit Counter'
+        verbose_name_plural = 'Rate Limit Counters'
+        constraints = [
+            models.UniqueConstraint(fields=['key', 'window'], name='unique_rate_limit_window'),
+        ]
+
+    def __str__(self):
+        return f"{self.key} @ {self.window}: {self.count}"
+
+
+class IdempotencyKey(models.Model):
+    """
+    IdempotencyKey model - the stored outcome of a POST sent with an
+    Idempotency-Key header, replayed when the client retries the request
+    """
+    STATUS_CHOICES = [
+        ('in_progress', 'In Progress'),
+        ('completed', 'Completed'),
+    ]
+    
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='idempotency_keys')
+    endpoint = models.CharField(max_length=100)  # e.g. "POST /api/orders/"
+    key = models.CharField(max_length=255)
+    request_hash = models.CharField(max_length=64)  # sha256 of the request payload
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='in_progress')
+    response_status = models.IntegerField(null=True, blank=True)
+    response_body = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    locked_at = models.DateTimeField(default=timezone.now)  # when the running request took the key
+    expires_at = models.DateTimeField(db_index=True)
+    
+    class Meta:
+        db_table = 'idempotency_keys'
+        verbose_name = 'Idempotency Key'
+        verbose_name_plural = 'Idempotency Keys'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'endpoint', 'key'], name='unique_idempotency_key'),
+        ]
+    
+    def __str__(self):
+        return f"{self.endpoint} {self.key} - {self.status}"
+
+
+class CheckoutRequest(models.Model):
+    """
+    CheckoutRequest model - a cart waiting in the asynchronous checkout queue.
+    Checkout workers turn it into orders; the first order gets its tracking number.
+    """
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('done', 'Done'),
+        ('rejected', 'Rejected'),
+        ('failed', 'Failed'),  # Checkout raised an unexpected error, or kept dying
+    ]
+    
+    consumer = models.ForeignKey(User, on_delete=models.CASCADE, related_name='checkout_requests')
+    tracking_number = models.CharField(max_length=50, unique=True)
+    payload = models.JSONField(encoder=DjangoJSONEncoder)  # Validated cart and delivery details
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    errors = models.JSONField(default=list, blank=True)  # Why the cart was rejected
+    order_tracking_numbers = models.JSONField(default=list, blank=True)  # Orders created from the cart
+    attempts = models.PositiveIntegerField(default=0)  # Times a worker has claimed it
+    claimed_at = models.DateTimeField(null=True, blank=True)  # Last claim; others wait out CHECKOUT_CLAIM_TIMEOUT
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        db_table = 'checkout_requests'
+        verbose_name = 'Checkout Request'
+        verbose_name_plural = 'Checkout Requests'
+        indexes = [
+            # Workers only ever scan the queued rows, oldest first
+            models.Index(fields=['id'], condition=models.Q(status='queued'), name='checkout_queue_idx'),
+        ]
+    
+    def __str__(self):
+        return f"Checkout {self.tracking_number} - {self.status}"
+
+
+class ImageDerivativeJob(models.Model):
+    """
+    ImageDerivativeJob model - a farm or product image waiting for its
+    resized copies. Image workers write them and record the outcome here.
+    """
+    MODEL_CHOICES = [
+        ('farm', 'Farm'),
+        ('product', 'Product'),
+    ]
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+    
+    model_name = models.CharField(max_length=20, choices=MODEL_CHOICES)
+    object_id = models.BigIntegerField()
+    source = models.CharField(max_length=255)  # The image's name in storage when the job was queued
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    error = models.TextField(blank=True, default='')
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        db_table = 'image_derivative_jobs'
+        verbose_name = 'Image Derivative Job'
+        verbose_name_plural = 'Image Derivative Jobs'
+        indexes = [
+            # Workers only ever scan the queued rows, oldest first
+            models.Index(fields=['id'], condition=models.Q(status='queued'), name='image_job_queue_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.model_name} #{self.object_id} {self.source} - {self.status}"
+
+
+class ArchivedOrder(models.Model):
+    """
+    ArchivedOrder model - a closed order moved out of the live orders tables.
+    `data` is the order as OrderSerializer rendered it when it was archived
+    (items and payment included); the columns beside it are for lookups.
+    `payment_record` keeps the whole payments row, Moyasar's response
+    included, which the serializer leaves out and users never see.
+    """
+    id = models.BigIntegerField(primary_key=True)  # The original order id
+    consumer = models.ForeignKey(User, on_delete=models.CASCADE, related_name='archived_orders')
+    farm = models.ForeignKey(Farm, on_delete=models.CASCADE, related_name='archived_orders')
+    status = models.CharField(max_length=20, choices=Order.ORDER_STATUS_CHOICES)
+    tracking_number = models.CharField(max_length=50, unique=True, null=True, blank=True)
+    data = models.JSONField(encoder=DjangoJSONEncoder)
+    payment_record = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    
+    created_at = models.DateTimeField()  # When the order was placed
+    archived_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'archived_orders'
+        verbose_name = 'Archived Order'
+        verbose_name_plural = 'Archived Orders'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['consumer', '-created_at'], name='archived_consumer_created_idx'),
+            models.Index(fields=['farm', '-created_at'], name='archived_farm_created_idx'),
+        ]
+    
+    def __str__(self):
+        return f"Archived Order #{self.id}"
+
+
 class Payment(models.Model):
     """
     Payment model - tracks payments for orders via Moyasar
@@ -0,0 +1,195 @@
+"""
+Pagination classes for the core API.
+"""
+import base64
+import json
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import F, Q
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.filters import OrderingFilter
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(PageNumberPagination):
+    """
+    Page-number pagination by default, so existing clients keep working.
+
+    With `?pagination=cursor` (or a `cursor` taken from a previous response)
+    pages are selected by keyset instead: each cursor holds the sort key of
+    the last row served, and the next page is read with
+    `WHERE (created_at, id) < (last_created_at, last_id)`. There's no
+    COUNT(*) and no OFFSET, so page 500 costs the same as page 1.
+
+    Views can set `keyset_ordering` to sort on other fields; the last one
+    must be unique. All fields must sort in the same direction. An
+    `?ordering=` the view also accepts in cursor mode maps to its own
+    keyset in `keyset_orderings` (e.g. `{'price': ('price', 'id')}`); any
+    other ordering is refused with a 400. A nullable leading field sorts
+    its NULLs last, in both directions.
+
+    Cursor pages can only follow a keyset order, so query parameters that
+    rank rows some other way are refused with a 400 rather than silently
+    dropped: views list them in `keyset_conflicting_params` (`near`, whose
+    results are ranked by distance). `?search=` rank is the exception:
+    in cursor mode search results come in keyset order.
+    """
+    mode_query_param = 'pagination'
+    cursor_query_param = 'cursor'
+    keyset_ordering = ('-created_at', '-id')
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.use_keyset = (
+            request.query_params.get(self.mode_query_param) == 'cursor'
+            or self.cursor_query_param in request.query_params
+        )
+        if not self.use_keyset:
+            return super().paginate_queryset(queryset, request, view)
+
+        for param in getattr(view, 'keyset_conflicting_params', ()):
+            if param in request.query_params:
+                raise ValidationError({
+                    self.mode_query_param: f"Cursor pagination can't be combined with `{param}`; use page numbers."
+                })
+
+        self.request = request
+        self.ordering = self.get_keyset_ordering(queryset, request, view)
+        self.fields = [name.lstrip('-') for name in self.ordering]
+        self.descending = self.ordering[0].startswith('-')
+        self.model_fields = [queryset.model._meta.get_field(name) for name in self.fields]
+        page_size = self.get_page_size(request)
+
+        position, reverse = self.decode_cursor(request)
+        # Reading backwards means flipping the sort, then flipping the page back
+        descending = self.descending != reverse
+        queryset = queryset.order_by(*self.order_by(descending, reverse))
+        if position is not None:
+            queryset = queryset.filter(self.after(position, descending, reverse))
+
+        rows = list(queryset[:page_size + 1])
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        if reverse:
+            rows.reverse()
+
+        if reverse:
+            # We came back from a later page, so there's always a next one
+            has_next, has_previous = True, has_more
+        else:
+            has_next, has_previous = has_more, position is not None
+
+        self.next_position = self.position_of(rows[-1]) if rows and has_next else None
+        self.previous_position = self.position_of(rows[0]) if rows and has_previous else None
+        return rows
+
+    def get_keyset_ordering(self, queryset, request, view):
+        ordering = getattr(view, 'keyset_ordering', self.keyset_ordering)
+        backend = next(
+            (backend for backend in getattr(view, 'filter_backends', ()) if issubclass(backend, OrderingFilter)),
+            None
+        )
+        requested = backend().get_ordering(request, queryset, view) if backend else None
+        if not requested:
+            return ordering
+
+        orderings = getattr(view, 'keyset_orderings', {})
+        keyed = orderings.get(','.join(requested))
+        if keyed is None:
+            supported = ', '.join(orderings) or 'none'
+            raise ValidationError({
+                backend.ordering_param: f"Not available with cursor pagination (supported: {supported}); "
+                                        "use page numbers."
+            })
+        return keyed
+
+    def order_by(self, descending, reverse):
+        """Sort terms; NULLs go last, or first when a page is read backwards."""
+        terms = []
+        for name, field in zip(self.fields, self.model_fields):
+            if field.null:
+                term = F(name).desc if descending else F(name).asc
+                terms.append(term(nulls_first=True) if reverse else term(nulls_last=True))
+            else:
+                terms.append(f'-{name}' if descending else name)
+        return terms
+
+    def after(self, position, descending, reverse=False):
+        """
+        Rows strictly past `position` in sort order. NULLs in the leading
+        field come after every value, or before them when reading backwards.
+        """
+        first = self.fields[0]
+        if position[0] is None:
+            condition = Q(**{f'{first}__isnull': True}) & self._past(self.fields[1:], position[1:], descending)
+            if reverse:
+                condition |= Q(**{f'{first}__isnull': False})
+            return condition
+
+        condition = self._past(self.fields, position, descending)
+        if self.model_fields[0].null and not reverse:
+            condition |= Q(**{f'{first}__isnull': True})
+        return condition
+
+    def _past(self, fields, position, descending):
+        """
+        (a < x) OR (a = x AND b < y) ..., plus a leading bound on the first
+        field so the database can start its index scan at the cursor.
+        """
+        lookup = 'lt' if descending else 'gt'
+        bound = 'lte' if descending else 'gte'
+        condition = Q()
+        for index, name in enumerate(fields):
+            equal = {field: value for field, value in zip(fields[:index], position[:index])}
+            condition |= Q(**equal, **{f'{name}__{lookup}': position[index]})
+        return Q(**{f'{fields[0]}__{bound}': position[0]}) & condition
+
+    def position_of(self, obj):
+        return [getattr(obj, name) for name in self.fields]
+
+    def encode_value(self, value):
+        if hasattr(value, 'isoformat'):
+            return value.isoformat()
+        if isinstance(value, Decimal):
+            return str(value)
+        return value
+
+    def encode_cursor(self, position, reverse):
+        payload = {
+            'p': [self.encode_value(value) for value in position],
+            'r': reverse,
+        }
+        return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+    def decode_cursor(self, request):
+        cursor = request.query_params.get(self.cursor_query_param)
+        if not cursor:
+            return None, False
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            values = payload['p']
+            if len(values) != len(self.model_fields):
+                raise ValueError(cursor)
+            position = [field.to_python(value) for field, value in zip(self.model_fields, values)]
+            return position, bool(payload.get('r'))
+        except (TypeError, ValueError, KeyError, DjangoValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def cursor_link(self, position, reverse):
+        if position is None:
+            return None
+        url = self.request.build_absolute_uri()
+        url = remove_query_param(url, self.page_query_param)
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(position, reverse))
+
+    def get_paginated_response(self, data):
+        if not self.use_keyset:
+            return super().get_paginated_response(data)
+        return Response({
+            'next': self.cursor_link(self.next_position, False),
+            'previous': self.cursor_link(self.previous_position, True),
+            'results': data,
+        })
@@ -0,0 +1,61 @@
+"""
+Parsing of free-text farm prices.
+
+Farm.price_per_kg is whatever the farmer typed: '٧٨ ريال/كجم', '78 SAR',
+'١٢٫٥ ريال للتر', '1,200 ريال / كرتون'. parse_price() turns it into a
+Decimal amount and a unit (the same codes as Product.unit), which
+core.signals keeps in Farm.price and Farm.price_unit so farms can be
+sorted and range-filtered in SQL.
+"""
+import re
+from decimal import Decimal, InvalidOperation
+
+DEFAULT_UNIT = 'kg'  # The field is a price per kilogram unless it says otherwise
+
+_DIGITS = str.maketrans({
+    **{chr(0x0660 + digit): str(digit) for digit in range(10)},  # Arabic-Indic
+    **{chr(0x06f0 + digit): str(digit) for digit in range(10)},  # Eastern Arabic-Indic
+    '٫': '.',  # Arabic decimal separator
+    '٬': ',',  # Arabic thousands separator
+    '،': ',',  # Arabic comma
+})
+_DECIMAL_COMMA = re.compile(r'(?<=\d),(?=\d{1,2}(?!\d))')  # '12,5' is 12.5; '1,200' is 1200
+_NUMBER = re.compile(r'\d{1,3}(?:,\d{3})+(?:\.\d+)?|\d+(?:\.\d+)?')
+# Checked in order: kilogram words contain gram words ('كيلوجرام', 'جرام')
+_UNITS = (
+    ('kg', ('كيلوجرام', 'كيلوغرام', 'كيلو', 'كجم', 'كغ', 'kg', 'kilo')),
+    ('g', ('جرام', 'غرام', 'جم', 'gram')),
+    ('liter', ('لتر', 'liter', 'litre')),
+    ('piece', ('حبة', 'حبه', 'قطعة', 'قطعه', 'piece', 'pcs')),
+    ('carton', ('كرتون', 'كرتونة', 'كرتونه', 'carton')),
+    ('box', ('صندوق', 'علبة', 'علبه', 'box')),
+    ('tray', ('طبق', 'صحن', 'tray')),
+)
+
+
+def _unit(text):
+    text = text.lower()
+    for unit, words in _UNITS:
+        if any(word in text for word in words):
+            return unit
+    return None
+
+
+def parse_price(text):
+    """
+    Return (amount, unit) for a free-text price, or (None, None) if it has
+    no number. The first number is the price; a range like '70-80' gives 70.
+    """
+    if not text:
+        return None, None
+    text = _DECIMAL_COMMA.sub('.', text.translate(_DIGITS))
+    match = _NUMBER.search(text)
+    if match is None:
+        return None, None
+    try:
+        amount = Decimal(match.group().replace(',', '')).quantize(Decimal('0.01'))
+    except InvalidOperation:
+        return None, None
+    if amount.adjusted() >= 8:  # Doesn't fit Farm.price
+        return None, None
+    return amount, _unit(text[match.end():]) or _unit(text) or DEFAULT_UNIT
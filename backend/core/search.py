@@ -0,0 +1,168 @@
+"""
+Arabic-aware search for products and farms.
+
+Each searchable model keeps a `search_document` column: its searchable text
+(for products, the farm's name, governorate and region as well), normalized
+so spelling variants meet - alef forms, alef maqsura/ya, ta marbuta/ha,
+hamza seats, diacritics and tatweel - plus each word without its definite
+article. Queries are normalized the same way and every word matches as a
+prefix.
+
+- PostgreSQL: GIN indexes on to_tsvector('simple', search_document) for
+  word matches and on search_document (pg_trgm) for typos; ranked by
+  ts_rank plus trigram word similarity.
+- SQLite: an FTS5 table per model (`<table>_fts`, rowid = primary key),
+  kept in sync by core.signals; ranked by bm25.
+- Anything else: an unranked icontains per word.
+"""
+import re
+import unicodedata
+
+from django.contrib.postgres.lookups import TrigramWordSimilar
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector, TrigramWordSimilarity
+from django.db import connection
+from django.db.models import F, Q, Value
+from rest_framework.filters import SearchFilter
+
+SEARCH_CONFIG = 'simple'
+MAX_QUERY_TERMS = 8
+
+_MARKS = re.compile('[\u0610-\u061a\u064b-\u065f\u0670\u06d6-\u06ed\u0640]')  # Tashkeel, Quranic marks, tatweel
+_LETTERS = str.maketrans({
+    'أ': 'ا', 'إ': 'ا', 'آ': 'ا', 'ٱ': 'ا',
+    'ى': 'ي', 'ئ': 'ي',
+    'ؤ': 'و',
+    'ة': 'ه',
+    **{chr(0x0660 + digit): str(digit) for digit in range(10)},  # Arabic-Indic digits
+    **{chr(0x06f0 + digit): str(digit) for digit in range(10)},  # Eastern Arabic-Indic digits
+})
+_ARTICLES = ('وال', 'بال', 'فال', 'كال', 'لل', 'ال')
+_WORD = re.compile(r'\w+')
+
+
+def normalize_arabic(text):
+    """Fold Arabic spelling variants, strip diacritics and case, collapse whitespace."""
+    text = unicodedata.normalize('NFKC', text or '')
+    text = _MARKS.sub('', text).translate(_LETTERS).casefold()
+    return ' '.join(text.split())
+
+
+def strip_article(word):
+    for article in _ARTICLES:
+        if word.startswith(article) and len(word) - len(article) >= 2:
+            return word[len(article):]
+    return word
+
+
+def build_search_document(*parts):
+    """
+    Normalized words of all parts, each followed by its article-less form
+    when it has one, so "حليب" finds "الحليب".
+    """
+    words = []
+    for word in _WORD.findall(normalize_arabic(' '.join(part for part in parts if part))):
+        words.append(word)
+        stem = strip_article(word)
+        if stem != word:
+            words.append(stem)
+    return ' '.join(words)
+
+
+def product_search_document(product):
+    farm = product.farm
+    return build_search_document(
+        product.name, product.description, product.unit,
+        farm.name, farm.governorate, farm.administrative_region
+    )
+
+
+def farm_search_document(farm):
+    return build_search_document(
+        farm.name, farm.description, farm.governorate, farm.administrative_region, farm.get_type_display()
+    )
+
+
+def query_terms(query):
+    terms = [strip_article(word) for word in _WORD.findall(normalize_arabic(query))]
+    return list(dict.fromkeys(terms))[:MAX_QUERY_TERMS]
+
+
+def fts_table(model):
+    return f'{model._meta.db_table}_fts'
+
+
+def search(queryset, query):
+    """
+    Filter a queryset of a searchable model (one with `search_document`)
+    to the rows matching `query`, best match first (`search_rank`).
+    """
+    terms = query_terms(query)
+    if not terms:
+        return queryset.none()
+
+    vendor = connection.vendor
+    if vendor == 'postgresql':
+        text = ' '.join(terms)
+        tsquery = SearchQuery(' & '.join(f'{term}:*' for term in terms), config=SEARCH_CONFIG, search_type='raw')
+        return (
+            queryset
+            .alias(search_vector=SearchVector('search_document', config=SEARCH_CONFIG))
+            .filter(Q(search_vector=tsquery) | TrigramWordSimilar(F('search_document'), Value(text)))
+            .annotate(search_rank=SearchRank(F('search_vector'), tsquery)
+                      + TrigramWordSimilarity(Value(text), 'search_document'))
+            .order_by('-search_rank', '-pk')
+        )
+
+    if vendor == 'sqlite':
+        table = fts_table(queryset.model)
+        pk = f'{queryset.model._meta.db_table}.{queryset.model._meta.pk.column}'
+        # FTS5 syntax: quoted terms are literal, * makes them prefixes, spaces AND them
+        match = ' '.join(f'"{term}"*' for term in terms)
+        # A join, so the MATCH runs once rather than once per row
+        return (
+            queryset
+            .extra(
+                tables=[table],
+                where=[f'{table}.rowid = {pk}', f'{table} MATCH %s'],
+                params=[match],
+                select={'search_rank': f'-{table}.rank'},
+            )
+            .order_by('-search_rank', '-pk')
+        )
+
+    for term in terms:
+        queryset = queryset.filter(search_document__icontains=term)
+    return queryset.annotate(search_rank=Value(0.0))
+
+
+def sync_search_index(instance, deleted=False):
+    """Mirror an instance's search_document into its SQLite FTS5 table."""
+    if connection.vendor != 'sqlite':
+        return
+    table = connection.ops.quote_name(fts_table(type(instance)))
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {table} WHERE rowid = %s', [instance.pk])
+        if not deleted:
+            cursor.execute(
+                f'INSERT INTO {table} (rowid, search_document) VALUES (%s, %s)',
+                [instance.pk, instance.search_document]
+            )
+
+
+def has_search_document(model):
+    return any(field.name == 'search_document' for field in model._meta.concrete_fields)
+
+
+class SearchDocumentFilter(SearchFilter):
+    """
+    `?search=` for models with a search_document (products and farms),
+    ranked best match first; other views keep DRF's SearchFilter over
+    their `search_fields`.
+    """
+    def filter_queryset(self, request, queryset, view):
+        if not has_search_document(queryset.model):
+            return super().filter_queryset(request, queryset, view)
+        query = request.query_params.get(self.search_param, '')
+        if not query.strip():
+            return queryset
+        return search(queryset, query)
@@ -1,10 +1,14 @@
 from rest_framework import serializers
-from django.utils import timezone
 from django.contrib.auth.password_validation import validate_password
+from .fieldsets import SparseFieldsMixin
 from .models import User, Farm, Product, Order, OrderItem, Payment, ContactMessage
+from .services.checkout import DELIVERY_FIELDS, MAX_LINE_QUANTITY, UnknownProducts, place_orders, resolve_products
+from .services.daily_load import DailyLimitExceeded
+from .services.image_derivatives import image_storage, srcset_map
+from .services.stock import InsufficientStock
 
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """
     Serializer for User model - used for user data representation
     Includes role information (Admin, Farmer, Consumer)
@@ -107,7 +111,22 @@ class UserLoginSerializer(serializers.Serializer):
         return attrs
 
 
-class FarmSerializer(serializers.ModelSerializer):
+class ImageSrcsetField(serializers.Field):
+    """
+    The image's resized copies as srcset strings per format, e.g.
+    {"webp": "<url> 160w, <url> 320w", "jpeg": ...}; null until generated
+    """
+    def __init__(self, **kwargs):
+        kwargs.setdefault('source', 'image_derivatives')
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        storage = image_storage(self.parent.Meta.model)
+        return srcset_map(value, storage, self.context.get('request'))
+
+
+class FarmSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """
     Serializer for Farm model
     """
@@ -117,44 +136,66 @@ class FarmSerializer(serializers.ModelSerializer):
         read_only=True
     )
     owner = serializers.PrimaryKeyRelatedField(read_only=True)
+    # Only present on ?near= searches, in km
+    distance = serializers.FloatField(read_only=True)
+    image_srcset = ImageSrcsetField()
     
     class Meta:
         model = Farm
         fields = ['id', 'owner', 'owner_email', 'owner_name', 'name', 
                   'description', 'location', 'administrative_region', 
                   'governorate', 'type', 'price_per_kg', 
-                  'phone_number', 'image', 'image_url', 
-                  'daily_capacity']
-        read_only_fields = ['id', 'owner']
+                  'phone_number', 'image', 'image_url', 'image_srcset',
+                  'price', 'price_unit', 'daily_capacity', 'latitude',
+                  'longitude', 'distance']
+        read_only_fields = ['id', 'owner', 'price', 'price_unit', 'latitude', 'longitude']
 
 
-class ProductSerializer(serializers.ModelSerializer):
+class ProductSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """
     Serializer for Product model
     """
     farm_name = serializers.CharField(source='farm.name', read_only=True)
+    image_srcset = ImageSrcsetField()
     
     class Meta:
         model = Product
         fields = ['id', 'farm', 'farm_name', 'name', 'description', 
-                  'price', 'stock_quantity', 'unit', 'image', 'image_url',
+                  'price', 'stock_quantity', 'unit', 'image', 'image_url', 'image_srcset',
                   'is_available', 'created_at']
         read_only_fields = ['id', 'created_at', 'farm']
 
 
-class OrderItemSerializer(serializers.ModelSerializer):
+class ProductLineField(serializers.PrimaryKeyRelatedField):
+    """
+    Product reference on an order line.
+    Only the pk is parsed here; OrderSerializer resolves all lines in bulk.
+    """
+    def to_internal_value(self, data):
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            return int(data)
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+
+
+class OrderItemSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """
     Serializer for OrderItem model
     """
+    product = ProductLineField(queryset=Product.objects.all())
     product_name = serializers.CharField(source='product.name', read_only=True)
     
     class Meta:
         model = OrderItem
         fields = ['id', 'product', 'product_name', 'quantity', 'price']
-        read_only_fields = ['id']
+        # Checkout prices lines from the product (core.services.pricing)
+        read_only_fields = ['id', 'price']
+        extra_kwargs = {'quantity': {'max_value': MAX_LINE_QUANTITY}}
 
         
-class PaymentSerializer(serializers.ModelSerializer):
+class PaymentSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """
     Serializer for Payment model
     """
@@ -170,7 +211,7 @@ class PaymentSerializer(serializers.ModelSerializer):
 
 
 
-class OrderSerializer(serializers.ModelSerializer):
+class OrderSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """
     Serializer for Order model
     """
@@ -196,86 +237,67 @@ class OrderSerializer(serializers.ModelSerializer):
                   'tracking_number', 'created_at', 'updated_at']
         read_only_fields = ['id', 'created_at', 'updated_at', 'farm', 'participant', 'total_amount', 'consumer']
 
+    def validate_items(self, value):
+        """
+        Resolve every line's product (and its farm) in a single query.
+        """
+        if not value:
+            raise serializers.ValidationError("Order must contain at least one item.")
+        try:
+            return resolve_products(value)
+        except UnknownProducts as exc:
+            raise serializers.ValidationError(str(exc))
+
     def create(self, validated_data):
+        """
+        Create one order per farm in the cart.
+        Returns the first order; all of them are kept on `created_orders`.
+        """
         items_data = validated_data.pop('items')
-        # Logic to group items by farm and create multiple orders if needed?
-        # For simplicity MVP: Assume all items belong to same farm OR create one order per farm.
-        # But payload structure from frontend is simple list.
-        # Let's verify if items belong to different farms.
-        
-        # Group items by farm
-        items_by_farm = {}
-        for item in items_data:
-            product = item['product']
-            farm_id = product.farm.id
-            if farm_id not in items_by_farm:
-                items_by_farm[farm_id] = []
-            items_by_farm[farm_id].append(item)
-            
-            
-        orders = []
-        
-        # Check user's daily order limit
-        consumer = validated_data['consumer']
-        if consumer.daily_order_limit is not None:
-            today = timezone.now().date()
-            user_orders_today = Order.objects.filter(
-                consumer=consumer, 
-                created_at__date=today
-            ).exclude(status__in=['pending', 'cancelled']).count()
-            if user_orders_today >= consumer.daily_order_limit:
-                raise serializers.ValidationError(
-                    f"لقد وصلت للحد الأقصى من الطلبات اليومية ({consumer.daily_order_limit}). حاول مرة أخرى غداً."
-                )
-
-
-        for farm_id, items in items_by_farm.items():
-            # Enforce daily order limit per farm
-            farm = Farm.objects.get(id=farm_id)
-            if farm.daily_capacity is not None:
-                today = timezone.now().date()
-                orders_today = Order.objects.filter(
-                    farm=farm, 
-                    created_at__date=today
-                ).exclude(status__in=['pending', 'cancelled']).count()
-                if orders_today >= farm.daily_capacity:
-                    raise serializers.ValidationError(
-                        f"الحد اليومي للطلبات للمزرعة {farm.name} هو {farm.daily_capacity}. لا يمكن إنشاء طلب جديد اليوم."
-                    )
-            import random
-            import string
-            random_str = ''.join(random.choices(string.ascii_uppercase + string.digits, k=8))
-            tracking_number = f"MK-{random_str}"
-
-            total_amount = sum(item['price'] * item['quantity'] for item in items)
-            order = Order.objects.create(
-                consumer=validated_data['consumer'],
-                farm_id=farm_id,
-                total_amount=total_amount,
-                status='pending',
-                tracking_number=tracking_number,
-                delivery_name=validated_data.get('delivery_name', ''),
-                delivery_phone=validated_data.get('delivery_phone', ''),
-                delivery_address=validated_data.get('delivery_address', ''),
-                delivery_city=validated_data.get('delivery_city', ''),
-                delivery_region=validated_data.get('delivery_region', ''),
-                delivery_notes=validated_data.get('delivery_notes', '')
-            )
-            for item in items:
-                OrderItem.objects.create(
-                    order=order,
-                    product=item['product'],
-                    quantity=item['quantity'],
-                    price=item['price']
-                )
-            orders.append(order)
-            
-        return orders[0] if orders else None
+        delivery = {field: validated_data.get(field, '') for field in DELIVERY_FIELDS}
+
+        try:
+            self.created_orders = place_orders(validated_data['consumer'], items_data, delivery)
+        except InsufficientStock as exc:
+            raise serializers.ValidationError({'items': exc.messages})
+        except DailyLimitExceeded as exc:
+            raise serializers.ValidationError(str(exc))
 
+        return self.created_orders[0]
 
 
+class CartLineSerializer(serializers.Serializer):
+    """
+    Serializer for one cart line.
+    A client-side price is still accepted from older clients but ignored.
+    """
+    product = serializers.IntegerField(min_value=1)
+    quantity = serializers.IntegerField(min_value=1, max_value=MAX_LINE_QUANTITY)
+    price = serializers.DecimalField(max_digits=10, decimal_places=2, required=False, write_only=True)
+
+
+class CartQuoteSerializer(serializers.Serializer):
+    """
+    Serializer for a cart to be priced by the server
+    """
+    items = CartLineSerializer(many=True, allow_empty=False)
+
+
+class QueuedCheckoutSerializer(serializers.Serializer):
+    """
+    Serializer for asynchronous checkout - validates the shape of the cart only.
+    Products, stock and capacity are checked by the checkout worker.
+    """
+    items = CartLineSerializer(many=True, allow_empty=False)
+    delivery_name = serializers.CharField(required=False, allow_blank=True)
+    delivery_phone = serializers.CharField(required=False, allow_blank=True)
+    delivery_address = serializers.CharField(required=False, allow_blank=True)
+    delivery_city = serializers.CharField(required=False, allow_blank=True)
+    delivery_region = serializers.CharField(required=False, allow_blank=True)
+    delivery_notes = serializers.CharField(required=False, allow_blank=True)
+
 
-class ContactMessageSerializer(serializers.ModelSerializer):
+class ContactMessageSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """
     Serializer for ContactMessage model
     """
@@ -0,0 +1,96 @@
+"""
+Versioned response cache for the public product catalog.
+
+Catalog list responses are cached under a key made of the catalog version
+and the request URL (host included, since image URLs are absolute, and
+query params sorted). Saving or deleting a Product or Farm bumps the
+version (see core.signals), which orphans every cached page at once;
+orphans just expire.
+
+On a miss only one request per key rebuilds the page ("single flight"):
+it takes a short lock with cache.add() and the others poll for its
+result instead of all running the same query when a popular page expires.
+Stock levels written with UPDATE by checkout don't bump the version; the
+products view passes its ETag (max(updated_at) of the products and
+their farms, and the count, over the list's query) as `variant`, so
+those changes still lead to a fresh key. That aggregate runs on hits
+too, on purpose: the view needs it anyway to answer If-None-Match with
+a 304, so a hit saves the page query, the facet counts and serializing,
+but not the fingerprint.
+"""
+import hashlib
+import time
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+VERSION_KEY = 'catalog_version'
+
+
+def _cache():
+    return caches[settings.CATALOG_CACHE_ALIAS]
+
+
+def catalog_version():
+    cache = _cache()
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # Start from the clock, so a lost version key never brings back old pages
+        cache.add(VERSION_KEY, int(time.time() * 1000), timeout=None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def _bump():
+    cache = _cache()
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.add(VERSION_KEY, int(time.time() * 1000), timeout=None)
+
+
+def bump_catalog_version():
+    """Invalidate every cached catalog page once the current transaction commits."""
+    transaction.on_commit(_bump)
+
+
+def catalog_cache_key(request, variant=''):
+    params = sorted(request.query_params.lists())
+    url = f"{request.scheme}://{request.get_host()}{request.path}?{urlencode(params, doseq=True)}"
+    digest = hashlib.sha256(f'{url}|{variant}'.encode()).hexdigest()
+    return f'catalog:{catalog_version()}:{digest}'
+
+
+def cached_catalog_response(request, build, variant=''):
+    """
+    Return (data, hit) for the request, calling `build()` for the response
+    data on a miss. Concurrent misses for the same key wait for one build.
+    `variant` is mixed into the key (e.g. an ETag of the underlying rows).
+    """
+    cache = _cache()
+    key = catalog_cache_key(request, variant)
+    data = cache.get(key)
+    if data is not None:
+        return data, True
+
+    lock_key = f'{key}:lock'
+    wait = settings.CATALOG_CACHE_LOCK_TIMEOUT
+    if not cache.add(lock_key, 1, timeout=wait):
+        # Someone else is building this page; wait for it rather than piling on
+        deadline = time.monotonic() + wait
+        while time.monotonic() < deadline:
+            time.sleep(0.05)
+            data = cache.get(key)
+            if data is not None:
+                return data, True
+        # The builder died or is too slow; build it ourselves
+
+    try:
+        data = build()
+        if data is not None:
+            cache.set(key, data, settings.CATALOG_CACHE_TTL)
+    finally:
+        cache.delete(lock_key)
+    return data, False
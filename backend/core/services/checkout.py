@@ -0,0 +1,117 @@
+"""
+Checkout engine - turns a validated cart into one order per farm.
+
+The whole cart is written inside a single transaction and the number of
+queries doesn't grow with the number of lines: conditional updates of the
+daily load counters, one conditional stock update per farm, one
+tracking number allocation, one bulk insert for orders and one for
+their items.
+"""
+from django.db import transaction
+
+from core.models import Order, OrderItem, Product
+from core.services.daily_load import reserve_daily_load
+from core.services.farm_dashboard import invalidate_farm_dashboards
+from core.services.pricing import price_lines
+from core.services.stock import reserve_stock
+from core.services.tracking_numbers import allocate_tracking_numbers
+
+# Largest quantity accepted on one cart line; far beyond any real order,
+# but keeps totals and stock arithmetic inside the database's integers
+MAX_LINE_QUANTITY = 10000
+
+DELIVERY_FIELDS = (
+    'delivery_name',
+    'delivery_phone',
+    'delivery_address',
+    'delivery_city',
+    'delivery_region',
+    'delivery_notes',
+)
+
+
+class UnknownProducts(Exception):
+    """Raised when cart lines reference products that don't exist."""
+    def __init__(self, product_ids):
+        self.product_ids = product_ids
+        super().__init__(f"Invalid pk(s) {product_ids} - object does not exist.")
+
+
+def resolve_products(lines):
+    """
+    Replace each line's product id with the Product (and its farm),
+    loading all of them in a single query.
+    """
+    product_ids = {line['product'] for line in lines}
+    products = Product.objects.select_related('farm').in_bulk(product_ids)
+    missing = sorted(product_ids - products.keys())
+    if missing:
+        raise UnknownProducts(missing)
+
+    for line in lines:
+        line['product'] = products[line['product']]
+    return lines
+
+
+def group_lines_by_farm(lines):
+    """
+    Group cart lines by the farm of their product, keeping cart order.
+    Each line is a dict with 'product' (a Product with its farm loaded)
+    and 'quantity'.
+    """
+    lines_by_farm = {}
+    for line in lines:
+        lines_by_farm.setdefault(line['product'].farm_id, []).append(line)
+    return lines_by_farm
+
+
+def place_orders(consumer, lines, delivery=None, tracking_number=None):
+    """
+    Create one pending order per farm for the given cart lines.
+    Returns the created orders (with primary keys) in cart order.
+    A pre-allocated `tracking_number` is used for the first order.
+    Lines are priced from their products' current prices.
+    """
+    delivery = delivery or {}
+    price_lines(lines)
+    lines_by_farm = group_lines_by_farm(lines)
+    farms = [farm_lines[0]['product'].farm for farm_lines in lines_by_farm.values()]
+
+    with transaction.atomic():
+        reserve_daily_load(consumer, {
+            farm: sum(line['quantity'] for line in farm_lines)
+            for farm, farm_lines in zip(farms, lines_by_farm.values())
+        })
+        reserve_stock(lines)
+        if tracking_number:
+            tracking_numbers = [tracking_number] + allocate_tracking_numbers(len(farms) - 1)
+        else:
+            tracking_numbers = allocate_tracking_numbers(len(farms))
+
+        orders = [
+            Order(
+                consumer=consumer,
+                farm=farm,
+                total_amount=sum(line['price'] * line['quantity'] for line in farm_lines),
+                status='pending',
+                tracking_number=tracking_number,
+                **{field: delivery.get(field, '') for field in DELIVERY_FIELDS}
+            )
+            for farm, farm_lines, tracking_number in zip(farms, lines_by_farm.values(), tracking_numbers)
+        ]
+        Order.objects.bulk_create(orders)
+
+        OrderItem.objects.bulk_create([
+            OrderItem(
+                order=order,
+                product=line['product'],
+                quantity=line['quantity'],
+                price=line['price']
+            )
+            for order, farm_lines in zip(orders, lines_by_farm.values())
+            for line in farm_lines
+        ])
+        # bulk_create sends no post_save, so drop the farms' dashboards here
+        invalidate_farm_dashboards(farm.id for farm in farms)
+
+    return orders
@@ -0,0 +1,152 @@
+"""
+Asynchronous checkout queue.
+
+The API only checks the shape of the cart, stores it as a queued
+CheckoutRequest with a pre-allocated tracking number and answers 202.
+Checkout workers (`manage.py run_checkout_workers`) claim queued requests
+with SELECT ... FOR UPDATE SKIP LOCKED, so any number of workers can drain
+the queue without blocking on each other, and run the regular checkout
+engine for each one.
+
+Claiming is its own short transaction that counts the attempt and stamps
+`claimed_at`; other workers leave the request alone for
+CHECKOUT_CLAIM_TIMEOUT. The checkout then runs in a savepoint of a second
+transaction. A request ends up `done`, `rejected` (stock, capacity,
+unknown products) or `failed` (any other error, logged), and a worker
+that dies mid-checkout leaves it queued to be claimed again, until
+CHECKOUT_MAX_ATTEMPTS claims have been used up and it is marked failed.
+One bad cart can't take down workers over and over.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from core.models import CheckoutRequest
+from core.services.checkout import DELIVERY_FIELDS, UnknownProducts, place_orders, resolve_products
+from core.services.daily_load import DailyLimitExceeded
+from core.services.stock import InsufficientStock
+from core.services.tracking_numbers import allocate_tracking_numbers
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue_checkout(consumer, cart):
+    """
+    Queue a shape-validated cart ({'items': [...], delivery fields}) for checkout.
+    Returns the CheckoutRequest; its tracking number identifies the first order.
+    """
+    return CheckoutRequest.objects.create(
+        consumer=consumer,
+        tracking_number=allocate_tracking_numbers(1)[0],
+        payload=cart
+    )
+
+
+def _lines(payload):
+    # Any 'price' in the payload is ignored; place_orders prices the lines
+    return [{'product': item['product'], 'quantity': item['quantity']} for item in payload['items']]
+
+
+def process_checkout_request(checkout_request):
+    """
+    Run checkout for a claimed request and record the outcome on it.
+    Must be called inside a transaction holding the request's row lock.
+    """
+    payload = checkout_request.payload
+    delivery = {field: payload.get(field, '') for field in DELIVERY_FIELDS}
+
+    try:
+        with transaction.atomic():
+            lines = resolve_products(_lines(payload))
+            orders = place_orders(
+                checkout_request.consumer,
+                lines,
+                delivery,
+                tracking_number=checkout_request.tracking_number
+            )
+    except InsufficientStock as exc:
+        checkout_request.status = 'rejected'
+        checkout_request.errors = exc.messages
+    except (UnknownProducts, DailyLimitExceeded) as exc:
+        checkout_request.status = 'rejected'
+        checkout_request.errors = [str(exc)]
+    except Exception as exc:
+        # The savepoint is rolled back; record the failure instead of retrying forever
+        logger.exception("Checkout request %s failed", checkout_request.tracking_number)
+        checkout_request.status = 'failed'
+        checkout_request.errors = [f"Checkout failed: {exc.__class__.__name__}"]
+    else:
+        checkout_request.status = 'done'
+        checkout_request.order_tracking_numbers = [order.tracking_number for order in orders]
+
+    checkout_request.processed_at = timezone.now()
+    checkout_request.save(update_fields=['status', 'errors', 'order_tracking_numbers', 'processed_at'])
+    return checkout_request
+
+
+def _claim():
+    """
+    Claim the oldest queued request that no other worker holds or has
+    claimed within CHECKOUT_CLAIM_TIMEOUT. Returns its id, or None.
+    """
+    now = timezone.now()
+    stale = now - timedelta(seconds=settings.CHECKOUT_CLAIM_TIMEOUT)
+    with transaction.atomic():
+        claimed = (
+            CheckoutRequest.objects
+            .select_for_update(skip_locked=True)
+            .filter(status='queued')
+            .filter(Q(claimed_at__isnull=True) | Q(claimed_at__lt=stale))
+            .order_by('id')
+            .values_list('id', flat=True)
+            .first()
+        )
+        if claimed is not None:
+            CheckoutRequest.objects.filter(pk=claimed).update(attempts=F('attempts') + 1, claimed_at=now)
+    return claimed
+
+
+def process_next():
+    """
+    Claim and process the oldest available queued request.
+    Returns the processed request, or None if there was nothing to claim.
+    """
+    claimed = _claim()
+    if claimed is None:
+        return None
+
+    with transaction.atomic():
+        checkout_request = (
+            CheckoutRequest.objects
+            .select_for_update(of=('self',))
+            .select_related('consumer')
+            .get(pk=claimed)
+        )
+        if checkout_request.status != 'queued':
+            # An earlier claim outlived its timeout but did finish
+            return checkout_request
+        if checkout_request.attempts > settings.CHECKOUT_MAX_ATTEMPTS:
+            logger.error(
+                "Checkout request %s given up after %s attempts",
+                checkout_request.tracking_number, checkout_request.attempts - 1
+            )
+            checkout_request.status = 'failed'
+            checkout_request.errors = [f"Checkout failed after {checkout_request.attempts - 1} attempts"]
+            checkout_request.processed_at = timezone.now()
+            checkout_request.save(update_fields=['status', 'errors', 'processed_at'])
+            return checkout_request
+        return process_checkout_request(checkout_request)
+
+
+def drain(limit=None):
+    """Process queued requests until the queue is empty (or `limit` is reached)."""
+    processed = 0
+    while limit is None or processed < limit:
+        if process_next() is None:
+            break
+        processed += 1
+    return processed
@@ -0,0 +1,136 @@
+"""
+Daily load counters for Farm.daily_capacity and User.daily_order_limit.
+
+Checkout increments one FarmDailyLoad row per farm and one UserDailyLoad
+row per consumer in the same transaction that creates the orders. Each
+increment is a conditional UPDATE (`orders = orders + n WHERE orders <= limit - n`),
+so the limit check and the write are one atomic step and reading today's
+load is a single-row lookup.
+
+Farm capacity is measured in orders by default; set
+DAILY_CAPACITY_UNIT = 'quantity' to measure total item quantity instead.
+"""
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Q, Value, When
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from core.models import FarmDailyLoad, UserDailyLoad
+
+CAPACITY_UNITS = ('orders', 'quantity')
+
+
+class DailyLimitExceeded(Exception):
+    """Raised when an order would push a farm or consumer past today's limit."""
+
+
+def capacity_unit():
+    unit = getattr(settings, 'DAILY_CAPACITY_UNIT', 'orders')
+    if unit not in CAPACITY_UNITS:
+        raise ValueError(f"DAILY_CAPACITY_UNIT must be one of {CAPACITY_UNITS}, got {unit!r}")
+    return unit
+
+
+def farm_load(farm, day=None):
+    """Return (orders, quantity) recorded for a farm on a day (today by default)."""
+    day = day or timezone.localdate()
+    load = FarmDailyLoad.objects.filter(farm=farm, day=day).values_list('orders', 'quantity').first()
+    return load or (0, 0)
+
+
+def farm_loads(farms, day=None):
+    """Return {farm_id: (orders, quantity)} for several farms in one query."""
+    day = day or timezone.localdate()
+    loads = FarmDailyLoad.objects.filter(farm__in=farms, day=day).values_list('farm_id', 'orders', 'quantity')
+    return {farm_id: (orders, quantity) for farm_id, orders, quantity in loads}
+
+
+def user_load(user, day=None):
+    """Return (orders, quantity) recorded for a consumer on a day (today by default)."""
+    day = day or timezone.localdate()
+    load = UserDailyLoad.objects.filter(user=user, day=day).values_list('orders', 'quantity').first()
+    return load or (0, 0)
+
+
+def _reserve_user_load(consumer, order_count, quantity, day):
+    UserDailyLoad.objects.bulk_create([UserDailyLoad(user=consumer, day=day)], ignore_conflicts=True)
+
+    loads = UserDailyLoad.objects.filter(user=consumer, day=day)
+    if consumer.daily_order_limit is not None:
+        loads = loads.filter(orders__lte=consumer.daily_order_limit - order_count)
+    if not loads.update(orders=F('orders') + order_count, quantity=F('quantity') + quantity):
+        raise DailyLimitExceeded(
+            f"لقد وصلت للحد الأقصى من الطلبات اليومية ({consumer.daily_order_limit}). حاول مرة أخرى غداً."
+        )
+
+
+def _farm_has_room(farm, quantity, unit):
+    if farm.daily_capacity is None:
+        return Q(farm_id=farm.id)
+    if unit == 'quantity':
+        return Q(farm_id=farm.id, quantity__lte=farm.daily_capacity - quantity)
+    return Q(farm_id=farm.id, orders__lte=farm.daily_capacity - 1)
+
+
+def _reserve_farm_loads(farm_quantities, day):
+    unit = capacity_unit()
+    farms = list(farm_quantities)
+    FarmDailyLoad.objects.bulk_create(
+        [FarmDailyLoad(farm=farm, day=day) for farm in farms],
+        ignore_conflicts=True
+    )
+
+    condition = Q()
+    for farm in farms:
+        condition |= _farm_has_room(farm, farm_quantities[farm], unit)
+
+    sid = transaction.savepoint()
+    updated = FarmDailyLoad.objects.filter(condition, day=day).update(
+        orders=F('orders') + 1,
+        quantity=F('quantity') + Case(
+            *[When(farm_id=farm.id, then=Value(farm_quantities[farm])) for farm in farms],
+            output_field=IntegerField()
+        )
+    )
+    if updated == len(farms):
+        transaction.savepoint_commit(sid)
+        return
+
+    # Undo the farms that did fit, then find one that didn't for the message
+    transaction.savepoint_rollback(sid)
+    loads = dict(
+        FarmDailyLoad.objects.filter(farm__in=farms, day=day)
+        .values_list('farm_id', 'orders' if unit == 'orders' else 'quantity')
+    )
+    for farm in farms:
+        requested = 1 if unit == 'orders' else farm_quantities[farm]
+        if farm.daily_capacity is not None and loads.get(farm.id, 0) + requested > farm.daily_capacity:
+            raise DailyLimitExceeded(
+                f"الحد اليومي للطلبات للمزرعة {farm.name} هو {farm.daily_capacity}. لا يمكن إنشاء طلب جديد اليوم."
+            )
+    raise DailyLimitExceeded("Farm daily capacity exceeded")
+
+
+def reserve_daily_load(consumer, farm_quantities, day=None):
+    """
+    Count one new order per farm against today's limits.
+    `farm_quantities` maps each Farm to the total item quantity of its order.
+    Must run inside the transaction that creates the orders.
+    """
+    day = day or timezone.localdate()
+    with transaction.atomic():
+        _reserve_user_load(consumer, len(farm_quantities), sum(farm_quantities.values()), day)
+        _reserve_farm_loads(farm_quantities, day)
+
+
+def release_order_load(order):
+    """
+    Give back the load of a cancelled order on the day it was placed.
+    The counters never go below zero, however often this runs for an order.
+    """
+    day = timezone.localdate(order.created_at)
+    quantity = sum(order.items.values_list('quantity', flat=True))
+    released = {'orders': F('orders') - 1, 'quantity': Greatest(F('quantity') - quantity, Value(0))}
+    FarmDailyLoad.objects.filter(farm_id=order.farm_id, day=day, orders__gte=1).update(**released)
+    UserDailyLoad.objects.filter(user_id=order.consumer_id, day=day, orders__gte=1).update(**released)
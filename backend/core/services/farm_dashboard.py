@@ -0,0 +1,104 @@
+"""
+Farmer dashboard aggregates.
+
+Per-status counts and today/week/month revenue for a farm come from one
+grouped query over its orders (GROUP BY status with conditional SUMs), and
+today's load is the FarmDailyLoad counter checkout enforces capacity with.
+Results are cached for DASHBOARD_CACHE_TTL seconds and dropped whenever one
+of the farm's orders is saved (see core.signals). The cache is the one named
+by DASHBOARD_CACHE_ALIAS, which must be shared by every worker (the database
+cache by default): a per-process cache would only drop the copy held by the
+worker that saved the order.
+"""
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+from core.models import Order
+from core.services.daily_load import capacity_unit, farm_load
+
+
+def _cache():
+    return caches[settings.DASHBOARD_CACHE_ALIAS]
+
+
+def dashboard_cache_key(farm_id):
+    return f'farm_dashboard_{farm_id}'
+
+
+def invalidate_farm_dashboards(farm_ids):
+    """Drop cached dashboards for the given farms once the current transaction commits."""
+    keys = [dashboard_cache_key(farm_id) for farm_id in set(farm_ids)]
+    transaction.on_commit(lambda: _cache().delete_many(keys))
+
+
+def _start_of(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def compute_dashboard(farm):
+    today = timezone.localdate()
+    since = {
+        'today': _start_of(today),
+        'week': _start_of(today - timedelta(days=today.weekday())),
+        'month': _start_of(today.replace(day=1)),
+    }
+
+    rows = (
+        Order.objects
+        .filter(farm=farm)
+        .order_by()
+        .values('status')
+        .annotate(
+            total=Count('id'),
+            today=Count('id', filter=Q(created_at__gte=since['today'])),
+            **{
+                f'revenue_{period}': Sum('total_amount', filter=Q(created_at__gte=start))
+                for period, start in since.items()
+            }
+        )
+    )
+
+    status_counts = {status: 0 for status, _ in Order.ORDER_STATUS_CHOICES}
+    today_counts = dict(status_counts)
+    revenue = dict.fromkeys(since, Decimal('0'))
+    for row in rows:
+        status_counts[row['status']] = row['total']
+        today_counts[row['status']] = row['today']
+        if row['status'] == 'cancelled':
+            continue
+        for period in since:
+            revenue[period] += row[f'revenue_{period}'] or 0
+
+    unit = capacity_unit()
+    orders, quantity = farm_load(farm, today)
+    used = quantity if unit == 'quantity' else orders
+
+    return {
+        'farm': farm.id,
+        'status_counts': status_counts,
+        'today_status_counts': today_counts,
+        'load': {
+            'unit': unit,
+            'used': used,
+            'capacity': farm.daily_capacity,
+            'remaining': None if farm.daily_capacity is None else max(farm.daily_capacity - used, 0),
+        },
+        'revenue': {period: str(amount.quantize(Decimal('0.01'))) for period, amount in revenue.items()},
+        'generated_at': timezone.now().isoformat(),
+    }
+
+
+def farm_dashboard(farm):
+    """Cached dashboard for a farm."""
+    key = dashboard_cache_key(farm.id)
+    dashboard = _cache().get(key)
+    if dashboard is None:
+        dashboard = compute_dashboard(farm)
+        _cache().set(key, dashboard, getattr(settings, 'DASHBOARD_CACHE_TTL', 30))
+    return dashboard
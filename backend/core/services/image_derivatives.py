@@ -0,0 +1,193 @@
+"""
+Resized WebP and JPEG copies of uploaded farm and product images.
+
+Saving a Farm or Product with a new image queues an ImageDerivativeJob
+once the transaction commits (see core.signals). Image workers
+(`manage.py run_image_workers`) claim jobs with SELECT ... FOR UPDATE
+SKIP LOCKED and write one WebP and one JPEG copy per width in
+IMAGE_DERIVATIVE_WIDTHS up to the original's width, so requests never
+decode or resize a photo. The copies' names are stored on the row:
+
+    image_derivatives = {'source': 'products/3f2a….jpeg',
+                         'webp': {'160': 'derivatives/products/9b07….webp', ...},
+                         'jpeg': {'160': 'derivatives/products/d41c….jpeg', ...}}
+
+and serializers render them as srcset strings (`image_srcset`). Until a
+job has run the map is empty and clients use the original image.
+
+Images are stored by content hash (core.storage), copies included, so
+rows sharing an image share its copies: a job whose image already has
+copies on another row reuses them, and copies are only deleted once no
+row uses their image.
+"""
+import posixpath
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from core.models import Farm, ImageDerivativeJob, Product
+
+MODELS = {'farm': Farm, 'product': Product}
+
+# Format name in the map -> (Pillow format, save options)
+FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+
+def image_storage(model):
+    return model._meta.get_field('image').storage
+
+
+def derivative_name(source, width, extension):
+    directory, filename = posixpath.split(source)
+    stem = posixpath.splitext(filename)[0]
+    return posixpath.join('derivatives', directory, f'{stem}_{width}w.{extension}')
+
+
+def derivative_names(derivatives):
+    return [name for fmt in FORMATS for name in (derivatives or {}).get(fmt, {}).values()]
+
+
+def _widths(original_width):
+    widths = sorted({width for width in settings.IMAGE_DERIVATIVE_WIDTHS if width <= original_width})
+    # Small originals still get one re-encoded copy at their own size
+    return widths or [original_width]
+
+
+def build_derivatives(storage, source):
+    """Write the derivatives of the image `source` in `storage`; return their map."""
+    with storage.open(source, 'rb') as handle:
+        image = Image.open(handle)
+        # JPEGs can be decoded at 1/2, 1/4 or 1/8 scale; stay at least as
+        # big as the widest derivative whichever way EXIF rotates the photo
+        widest = max(settings.IMAGE_DERIVATIVE_WIDTHS)
+        image.draft('RGB', (widest, widest))
+        image.load()
+        image = ImageOps.exif_transpose(image)
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'transparency' in image.info or image.mode in ('LA', 'PA') else 'RGB')
+
+    derivatives = {'source': source, **{fmt: {} for fmt in FORMATS}}
+    # Largest first, each resized from the previous one rather than the full original
+    resized = image
+    for width in sorted(_widths(image.width), reverse=True):
+        height = max(1, round(image.height * width / image.width))
+        resized = resized.resize((width, height), Image.Resampling.LANCZOS, reducing_gap=3.0)
+        for fmt, (pil_format, options) in FORMATS.items():
+            frame = resized.convert('RGB') if pil_format == 'JPEG' and resized.mode != 'RGB' else resized
+            buffer = BytesIO()
+            frame.save(buffer, pil_format, **options)
+            name = derivative_name(source, width, fmt)
+            derivatives[fmt][str(width)] = storage.save(name, ContentFile(buffer.getvalue()))
+    return derivatives
+
+
+def release_derivatives(model, derivatives):
+    """Delete an image's copies, unless a row of `model` still shows that image."""
+    source = (derivatives or {}).get('source')
+    if source and model.objects.filter(image=source).exists():
+        return
+    storage = image_storage(model)
+    for name in derivative_names(derivatives):
+        storage.delete(name)
+
+
+def store_derivatives(model, pk, source, derivatives):
+    """
+    Save a derivatives map on the row, unless its image has changed since
+    (a newer job covers that one). Returns whether the row was updated.
+    """
+    # updated_at moves the row's ETag, and with it the catalog cache key
+    updated = model.objects.filter(pk=pk, image=source).update(
+        image_derivatives=derivatives, updated_at=timezone.now()
+    )
+    if not updated:
+        release_derivatives(model, derivatives)
+    return bool(updated)
+
+
+def queue_image_derivatives(instance):
+    """Queue derivatives for the instance's image once the transaction commits."""
+    job = ImageDerivativeJob(model_name=instance._meta.model_name, object_id=instance.pk, source=instance.image.name)
+    transaction.on_commit(job.save)
+
+
+def process_image_job(job):
+    """
+    Build and store the derivatives for a claimed job and record the outcome.
+    Must be called inside the transaction that claimed the job.
+    """
+    model = MODELS[job.model_name]
+    current = model.objects.filter(pk=job.object_id).values_list('image', flat=True).first()
+    if current == job.source:
+        # The same image on another row already has its copies
+        shared = (
+            model.objects.filter(image=job.source).exclude(image_derivatives={})
+            .values_list('image_derivatives', flat=True).first()
+        )
+        try:
+            derivatives = shared or build_derivatives(image_storage(model), job.source)
+        except (OSError, Image.DecompressionBombError) as exc:
+            job.status = 'failed'
+            job.error = str(exc)
+        else:
+            store_derivatives(model, job.object_id, job.source, derivatives)
+            job.status = 'done'
+    else:
+        # Deleted, or the image was replaced and has a job of its own
+        job.status = 'done'
+
+    job.processed_at = timezone.now()
+    job.save(update_fields=['status', 'error', 'processed_at'])
+    return job
+
+
+def process_next():
+    """
+    Claim and process the oldest queued job no other worker holds.
+    Returns the processed job, or None if there was nothing to claim.
+    """
+    with transaction.atomic():
+        job = (
+            ImageDerivativeJob.objects
+            .select_for_update(skip_locked=True)
+            .filter(status='queued')
+            .order_by('id')
+            .first()
+        )
+        if job is None:
+            return None
+        return process_image_job(job)
+
+
+def drain(limit=None):
+    """Process queued jobs until the queue is empty (or `limit` is reached)."""
+    processed = 0
+    while limit is None or processed < limit:
+        if process_next() is None:
+            break
+        processed += 1
+    return processed
+
+
+def srcset_map(derivatives, storage, request=None):
+    """{'webp': '<url> 160w, <url> 320w', 'jpeg': ...}, or None without derivatives."""
+    if not derivatives:
+        return None
+    srcsets = {}
+    for fmt in FORMATS:
+        candidates = []
+        for width, name in sorted(derivatives.get(fmt, {}).items(), key=lambda item: int(item[0])):
+            url = storage.url(name)
+            if request is not None:
+                url = request.build_absolute_uri(url)
+            candidates.append(f'{url} {width}w')
+        if candidates:
+            srcsets[fmt] = ', '.join(candidates)
+    return srcsets or None
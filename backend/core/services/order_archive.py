@@ -0,0 +1,77 @@
+"""
+Archival of closed orders.
+
+Completed and cancelled orders that haven't changed for
+ORDER_ARCHIVE_AFTER_DAYS are moved, in batches, from the live orders,
+order_items and payments tables into archived_orders, one row per order
+holding its serialized snapshot. Live order queries then only scan orders
+that can still change. Archived orders stay readable through order
+tracking and the order history endpoint. The payment row is kept whole
+(Moyasar's response included) in `payment_record`, since the serialized
+snapshot users see leaves the gateway's response out.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Prefetch
+from django.utils import timezone
+
+from core.models import ArchivedOrder, Order, OrderItem, Payment
+from core.serializers import OrderSerializer
+
+ARCHIVABLE_STATUSES = ('completed', 'cancelled')
+
+
+def archive_cutoff(days=None):
+    if days is None:
+        days = settings.ORDER_ARCHIVE_AFTER_DAYS
+    return timezone.now() - timedelta(days=days)
+
+
+def archivable_orders(cutoff):
+    return Order.objects.filter(status__in=ARCHIVABLE_STATUSES, updated_at__lt=cutoff)
+
+
+def payment_record(order):
+    """Every column of the order's payment, or None if it has none."""
+    try:
+        payment = order.payment
+    except Payment.DoesNotExist:
+        return None
+    return {field.attname: field.value_from_object(payment) for field in Payment._meta.concrete_fields}
+
+
+def archive_batch(cutoff, batch_size=500):
+    """
+    Move up to `batch_size` archivable orders (oldest id first) into the
+    archive in one transaction. Returns the number of orders moved.
+    """
+    with transaction.atomic():
+        orders = list(
+            archivable_orders(cutoff)
+            .select_for_update(of=('self',))
+            .select_related('consumer', 'farm', 'payment')
+            .prefetch_related(Prefetch('items', queryset=OrderItem.objects.select_related('product')))
+            .order_by('id')[:batch_size]
+        )
+        if not orders:
+            return 0
+
+        ArchivedOrder.objects.bulk_create([
+            ArchivedOrder(
+                id=order.id,
+                consumer_id=order.consumer_id,
+                farm_id=order.farm_id,
+                status=order.status,
+                tracking_number=order.tracking_number,
+                data=OrderSerializer(order).data,
+                payment_record=payment_record(order),
+                created_at=order.created_at,
+            )
+            for order in orders
+        ])
+        # Cascades to the orders' items and payments
+        Order.objects.filter(pk__in=[order.id for order in orders]).delete()
+    return len(orders)
+
@@ -0,0 +1,191 @@
+"""
+Streaming order export.
+
+Rows are read with `values_list(...).iterator(chunk_size=...)` over a join
+of order items, orders and products, one row per order line, and written
+out as they arrive, so memory stays flat however many orders a farm has.
+On PostgreSQL the iterator uses a server-side cursor.
+
+XLSX output is written as a zip stream without a spreadsheet library: a
+single worksheet with inline strings, compressed on the fly.
+
+Customers fill in the delivery fields, so text that a spreadsheet would
+read as a formula (starting with =, +, -, @, a tab or a carriage return)
+is prefixed with a single quote in both formats.
+"""
+import csv
+import re
+import zipfile
+from xml.sax.saxutils import escape
+
+from django.utils import timezone
+
+from core.models import OrderItem
+
+CHUNK_SIZE = 2000
+ROWS_PER_WRITE = 500
+
+COLUMNS = (
+    ('Tracking number', 'order__tracking_number'),
+    ('Order date', 'order__created_at'),
+    ('Status', 'order__status'),
+    ('Farm', 'order__farm__name'),
+    ('Customer email', 'order__consumer__email'),
+    ('Delivery name', 'order__delivery_name'),
+    ('Delivery phone', 'order__delivery_phone'),
+    ('City', 'order__delivery_city'),
+    ('Region', 'order__delivery_region'),
+    ('Address', 'order__delivery_address'),
+    ('Product', 'product__name'),
+    ('Quantity', 'quantity'),
+    ('Unit price', 'price'),
+    ('Order total', 'order__total_amount'),
+)
+
+HEADER = [title for title, _ in COLUMNS]
+
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def export_rows(orders):
+    """
+    Yield one tuple per order line for the given Order queryset,
+    oldest order first, without loading the result set into memory.
+    """
+    items = (
+        OrderItem.objects
+        .filter(order__in=orders.order_by().values('pk'))
+        .order_by('order__created_at', 'order_id', 'id')
+        .values_list(*[path for _, path in COLUMNS])
+    )
+    for row in items.iterator(chunk_size=CHUNK_SIZE):
+        yield tuple(_cell(value) for value in row)
+
+
+def _cell(value):
+    if hasattr(value, 'tzinfo'):
+        return timezone.localtime(value).strftime('%Y-%m-%d %H:%M:%S')
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return f"'{value}"
+    return value
+
+
+class _Echo:
+    """File-like object that returns what is written to it (for csv.writer)."""
+    def write(self, value):
+        return value
+
+
+def stream_csv(rows):
+    # The BOM makes Excel open the file as UTF-8, so Arabic text survives
+    yield '\ufeff'
+    writer = csv.writer(_Echo())
+    yield writer.writerow(HEADER)
+    batch = []
+    for row in rows:
+        batch.append(writer.writerow(['' if value is None else value for value in row]))
+        if len(batch) >= ROWS_PER_WRITE:
+            yield ''.join(batch)
+            batch = []
+    if batch:
+        yield ''.join(batch)
+
+
+class _ZipSink:
+    """
+    Write-only, non-seekable file object for zipfile. Whatever zipfile
+    writes is buffered until the generator drains it.
+    """
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+_ILLEGAL_XML = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '</Types>'
+)
+_ROOT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+_WORKBOOK = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets><sheet name="Orders" sheetId="1" r:id="rId1"/></sheets>'
+    '</workbook>'
+)
+_WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+    'Target="worksheets/sheet1.xml"/>'
+    '</Relationships>'
+)
+
+
+def _xlsx_row(values):
+    cells = []
+    for value in values:
+        if value is None:
+            cells.append('<c/>')
+        elif isinstance(value, (int, float)) or hasattr(value, 'as_tuple'):
+            cells.append(f'<c><v>{value}</v></c>')
+        else:
+            text = escape(_ILLEGAL_XML.sub('', str(value)))
+            cells.append(f'<c t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>')
+    return f'<row>{"".join(cells)}</row>'
+
+
+def stream_xlsx(rows):
+    sink = _ZipSink()
+    with zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_DEFLATED) as workbook:
+        workbook.writestr('[Content_Types].xml', _CONTENT_TYPES)
+        workbook.writestr('_rels/.rels', _ROOT_RELS)
+        workbook.writestr('xl/workbook.xml', _WORKBOOK)
+        workbook.writestr('xl/_rels/workbook.xml.rels', _WORKBOOK_RELS)
+
+        # Size isn't known up front, so allow the sheet to grow past 4GB
+        with workbook.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as sheet:
+            sheet.write(
+                b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+            )
+            sheet.write(_xlsx_row(HEADER).encode())
+            batch = []
+            for row in rows:
+                batch.append(_xlsx_row(row))
+                if len(batch) >= ROWS_PER_WRITE:
+                    sheet.write(''.join(batch).encode())
+                    batch = []
+                    yield sink.drain()
+            if batch:
+                sheet.write(''.join(batch).encode())
+            sheet.write(b'</sheetData></worksheet>')
+    yield sink.drain()
@@ -1,7 +1,10 @@
 from decimal import Decimal
-from typing import Iterable
+from typing import Dict, Iterable, Tuple
 from core.models import OrderItem
 
+HALALAS_PER_RIYAL = 100
+
+
 def calculate_total_from_items(items: Iterable[OrderItem]) -> Decimal:
     total = Decimal("0")
     for item in items:
@@ -12,3 +15,36 @@ def calculate_total_from_items(items: Iterable[OrderItem]) -> Decimal:
         total += (item.price * item.quantity)
     return total
 
+
+def to_halalas(amount) -> int:
+    """Exact integer halalas for a riyal amount with at most two decimal places."""
+    halalas = Decimal(amount) * HALALAS_PER_RIYAL
+    if halalas != halalas.to_integral_value():
+        raise ValueError("price cannot have fractions of a halala")
+    return int(halalas)
+
+
+def from_halalas(halalas: int) -> Decimal:
+    return Decimal(int(halalas)).scaleb(-2)
+
+
+def calculate_totals(rows: Iterable[Tuple[int, int, Decimal]]) -> Dict[int, Decimal]:
+    """
+    Totals for many orders at once from raw (order_id, quantity, price) rows,
+    e.g. OrderItem.objects.values_list('order_id', 'quantity', 'price').
+    Sums are done in integer halalas, so there's no rounding drift.
+    Raises the same ValueErrors as calculate_total_from_items.
+    """
+    # A catalogue has few distinct prices, so each is converted only once
+    halalas_by_price = {}
+    totals = {}
+    for order_id, quantity, price in rows:
+        halalas = halalas_by_price.get(price)
+        if halalas is None:
+            halalas = halalas_by_price[price] = to_halalas(price)
+        if quantity <= 0:
+            raise ValueError("quantity must be positive")
+        if halalas < 0:
+            raise ValueError("price cannot be negative")
+        totals[order_id] = totals.get(order_id, 0) + quantity * halalas
+    return {order_id: from_halalas(total) for order_id, total in totals.items()}
@@ -0,0 +1,106 @@
+"""
+Server-side cart pricing.
+
+Prices always come from Product.price: the cart quote endpoint and the
+checkout engine both go through price_lines(), so whatever price a client
+sends is ignored. Shipping is a flat SHIPPING_FEE per order, and checkout
+creates one order per farm, so a cart pays it once per farm.
+"""
+from decimal import Decimal
+
+from django.conf import settings
+
+from core.services.daily_load import capacity_unit, farm_loads
+
+MONEY = Decimal('0.01')
+
+
+def _money(amount):
+    return str(amount.quantize(MONEY))
+
+
+def shipping_fee():
+    return Decimal(str(settings.SHIPPING_FEE)).quantize(MONEY)
+
+
+def price_lines(lines):
+    """Set each resolved line's 'price' to its product's current price."""
+    for line in lines:
+        line['price'] = line['product'].price
+    return lines
+
+
+def _capacity(farm, load, quantity, unit):
+    if farm.daily_capacity is None:
+        return {'daily_capacity': None, 'remaining': None, 'available': True}
+    orders, ordered_quantity = load
+    if unit == 'quantity':
+        remaining, requested = farm.daily_capacity - ordered_quantity, quantity
+    else:
+        remaining, requested = farm.daily_capacity - orders, 1
+    remaining = max(remaining, 0)
+    return {'daily_capacity': farm.daily_capacity, 'remaining': remaining, 'available': requested <= remaining}
+
+
+def quote_cart(lines):
+    """
+    Price resolved cart lines (see checkout.resolve_products) and report
+    stock and today's farm capacity the way checkout would see them.
+    Costs one query, for the farms' daily loads.
+    """
+    price_lines(lines)
+    wanted = {}
+    lines_by_farm = {}
+    for line in lines:
+        product = line['product']
+        wanted[product.pk] = wanted.get(product.pk, 0) + line['quantity']
+        lines_by_farm.setdefault(product.farm_id, []).append(line)
+
+    farms = [farm_lines[0]['product'].farm for farm_lines in lines_by_farm.values()]
+    loads = farm_loads(farms)
+    unit = capacity_unit()
+    fee = shipping_fee()
+
+    groups = []
+    cart_subtotal = Decimal('0')
+    can_checkout = True
+    for farm, farm_lines in zip(farms, lines_by_farm.values()):
+        items = []
+        subtotal = Decimal('0')
+        for line in farm_lines:
+            product = line['product']
+            line_total = line['price'] * line['quantity']
+            in_stock = product.is_available and product.stock_quantity >= wanted[product.pk]
+            subtotal += line_total
+            can_checkout &= in_stock
+            items.append({
+                'product': product.pk,
+                'name': product.name,
+                'unit': product.unit,
+                'quantity': line['quantity'],
+                'price': _money(line['price']),
+                'line_total': _money(line_total),
+                'stock_quantity': product.stock_quantity,
+                'in_stock': in_stock,
+            })
+        capacity = _capacity(farm, loads.get(farm.pk, (0, 0)), sum(line['quantity'] for line in farm_lines), unit)
+        can_checkout &= capacity['available']
+        cart_subtotal += subtotal
+        groups.append({
+            'farm': farm.pk,
+            'farm_name': farm.name,
+            'items': items,
+            'subtotal': _money(subtotal),
+            'shipping': _money(fee),
+            'total': _money(subtotal + fee),
+            'capacity': capacity,
+        })
+
+    shipping = fee * len(groups)
+    return {
+        'farms': groups,
+        'subtotal': _money(cart_subtotal),
+        'shipping': _money(shipping),
+        'total': _money(cart_subtotal + shipping),
+        'can_checkout': can_checkout,
+    }
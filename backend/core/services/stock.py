@@ -0,0 +1,130 @@
+"""
+Stock reservation for order placement.
+
+Stock is taken with conditional UPDATE statements of the form
+`stock_quantity = stock_quantity - n WHERE stock_quantity >= n`, so two
+concurrent checkouts can never both take the last unit: the database
+re-checks the condition against the committed row before writing.
+Lines are batched into one statement per farm. Cancelling an order gives
+its quantities back with the matching `stock_quantity + n` statement.
+"""
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Q, Value, When
+from django.utils import timezone
+
+from core.models import Product
+
+
+class InsufficientStock(Exception):
+    """
+    Raised when one or more products can't cover the requested quantity.
+    `shortages` lists a dict per short product:
+    {'product': id, 'product_name': str, 'requested': int, 'available': int}
+    """
+    def __init__(self, shortages):
+        self.shortages = shortages
+        super().__init__(', '.join(
+            f"{s['product_name']}: requested {s['requested']}, available {s['available']}"
+            for s in shortages
+        ))
+
+    @property
+    def messages(self):
+        """One user-facing message per short product."""
+        return [
+            f"الكمية المتوفرة من {shortage['product_name']} هي {shortage['available']} فقط."
+            for shortage in self.shortages
+        ]
+
+
+def requested_quantities_by_farm(lines):
+    """
+    Sum requested quantities per product, grouped by farm:
+    {farm_id: {product_id: quantity}}
+    """
+    wanted_by_farm = {}
+    for line in lines:
+        product = line['product']
+        wanted = wanted_by_farm.setdefault(product.farm_id, {})
+        wanted[product.pk] = wanted.get(product.pk, 0) + line['quantity']
+    return wanted_by_farm
+
+
+def _reserve_batch(wanted):
+    """
+    Decrement stock for {product_id: quantity} in one statement.
+    Returns the number of products that had enough stock.
+    """
+    condition = Q()
+    for product_id, quantity in wanted.items():
+        condition |= Q(pk=product_id, stock_quantity__gte=quantity)
+
+    return Product.objects.filter(condition, is_available=True).update(
+        stock_quantity=F('stock_quantity') - _quantity_by_product(wanted),
+        updated_at=timezone.now()
+    )
+
+
+def _quantity_by_product(wanted):
+    return Case(
+        *[When(pk=product_id, then=Value(quantity)) for product_id, quantity in wanted.items()],
+        output_field=IntegerField()
+    )
+
+
+def _shortages(wanted):
+    shortages = []
+    products = Product.objects.filter(pk__in=wanted).values_list('pk', 'name', 'stock_quantity', 'is_available')
+    for product_id, name, stock_quantity, is_available in products:
+        available = stock_quantity if is_available else 0
+        if available < wanted[product_id]:
+            shortages.append({
+                'product': product_id,
+                'product_name': name,
+                'requested': wanted[product_id],
+                'available': available,
+            })
+    return shortages
+
+
+def reserve_stock(lines):
+    """
+    Take stock for every cart line, all or nothing.
+
+    Each farm's batch runs in its own savepoint so a short batch can be
+    rolled back and diagnosed while the others are still checked; if any
+    batch is short, InsufficientStock is raised and nothing is reserved.
+    """
+    wanted_by_farm = requested_quantities_by_farm(lines)
+    failed = {}
+
+    with transaction.atomic():
+        # Fixed farm order keeps concurrent checkouts from locking in opposite orders
+        for farm_id in sorted(wanted_by_farm):
+            wanted = wanted_by_farm[farm_id]
+            sid = transaction.savepoint()
+            if _reserve_batch(wanted) == len(wanted):
+                transaction.savepoint_commit(sid)
+            else:
+                transaction.savepoint_rollback(sid)
+                failed.update(wanted)
+
+        if failed:
+            raise InsufficientStock(_shortages(failed))
+
+
+def release_stock(order):
+    """
+    Put a cancelled order's quantities back in stock, in one statement.
+    Must run in the transaction that cancels the order.
+    """
+    returned = {}
+    for product_id, quantity in order.items.values_list('product_id', 'quantity'):
+        returned[product_id] = returned.get(product_id, 0) + quantity
+    if not returned:
+        return
+
+    Product.objects.filter(pk__in=returned).update(
+        stock_quantity=F('stock_quantity') + _quantity_by_product(returned),
+        updated_at=timezone.now()
+    )
@@ -0,0 +1,132 @@
+"""
+Tracking numbers for orders.
+
+A tracking number is `MK-` followed by 8 Crockford base32 characters and one
+check character, e.g. `MK-NDCTRVCQ6`. The 8 characters encode a 40-bit value
+taken from a database sequence, so numbers never collide and never need a
+uniqueness probe. The sequence value is passed through a keyed Feistel
+permutation first, so consecutive orders don't get guessable consecutive
+numbers on the public trace endpoint.
+
+On Postgres the values come from `order_tracking_number_seq`, created with
+CACHE so each connection takes numbers in blocks without touching the
+shared counter. Other databases (SQLite in tests) use a SequenceCounter row.
+
+The check character (Luhn mod 32) lets callers reject mistyped numbers
+without a database lookup. Numbers issued before this scheme (`MK-` plus 8
+random letters/digits) are still accepted as well-formed.
+"""
+import hashlib
+import re
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+
+from core.models import SequenceCounter
+
+PREFIX = 'MK-'
+SEQUENCE_NAME = 'order_tracking_number_seq'
+
+# Crockford base32: no I, L, O or U
+ALPHABET = '0123456789ABCDEFGHJKMNPQRSTVWXYZ'
+BODY_LENGTH = 8
+VALUE_BITS = BODY_LENGTH * 5
+HALF_BITS = VALUE_BITS // 2
+HALF_MASK = (1 << HALF_BITS) - 1
+FEISTEL_ROUNDS = 4
+
+TRACKING_NUMBER_RE = re.compile(rf'^{PREFIX}[{ALPHABET}]{{{BODY_LENGTH + 1}}}$')
+LEGACY_TRACKING_NUMBER_RE = re.compile(rf'^{PREFIX}[A-Z0-9]{{8}}$')
+
+
+def _round_function(half, round_index):
+    key = getattr(settings, 'TRACKING_NUMBER_KEY', '')
+    digest = hashlib.sha256(f'{key}:{round_index}:{half}'.encode()).digest()
+    return int.from_bytes(digest[:4], 'big') & HALF_MASK
+
+
+def scramble(value):
+    """Map a sequence value onto a unique, non-sequential 40-bit value."""
+    left, right = value >> HALF_BITS, value & HALF_MASK
+    for round_index in range(FEISTEL_ROUNDS):
+        left, right = right, left ^ _round_function(right, round_index)
+    return (left << HALF_BITS) | right
+
+
+def unscramble(value):
+    left, right = value >> HALF_BITS, value & HALF_MASK
+    for round_index in reversed(range(FEISTEL_ROUNDS)):
+        left, right = right ^ _round_function(left, round_index), left
+    return (left << HALF_BITS) | right
+
+
+def check_character(body):
+    """Luhn mod 32 check character for a base32 string."""
+    total = 0
+    factor = 2
+    for char in reversed(body):
+        addend = factor * ALPHABET.index(char)
+        total += addend // 32 + addend % 32
+        factor = 1 if factor == 2 else 2
+    return ALPHABET[(32 - total % 32) % 32]
+
+
+def encode(value):
+    """Encode a sequence value as a tracking number."""
+    if not 0 < value < (1 << VALUE_BITS):
+        raise ValueError(f"Tracking sequence value out of range: {value}")
+    scrambled = scramble(value)
+    body = ''.join(
+        ALPHABET[(scrambled >> shift) & 31]
+        for shift in range(VALUE_BITS - 5, -1, -5)
+    )
+    return f'{PREFIX}{body}{check_character(body)}'
+
+
+def decode(tracking_number):
+    """Return the sequence value behind a well-formed tracking number."""
+    if not is_valid(tracking_number):
+        raise ValueError(f"Invalid tracking number: {tracking_number}")
+    scrambled = 0
+    for char in tracking_number[len(PREFIX):-1]:
+        scrambled = (scrambled << 5) | ALPHABET.index(char)
+    return unscramble(scrambled)
+
+
+def is_valid(tracking_number):
+    """True for a current-format tracking number with a correct check character."""
+    if not TRACKING_NUMBER_RE.match(tracking_number):
+        return False
+    body = tracking_number[len(PREFIX):]
+    return check_character(body[:-1]) == body[-1]
+
+
+def is_well_formed(tracking_number):
+    """True if the number could belong to an order (current or legacy format)."""
+    return is_valid(tracking_number) or bool(LEGACY_TRACKING_NUMBER_RE.match(tracking_number))
+
+
+def normalize(tracking_number):
+    return tracking_number.strip().upper()
+
+
+def _next_values(count):
+    if not count:
+        return []
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT nextval(%s) FROM generate_series(1, %s)', [SEQUENCE_NAME, count])
+            return [row[0] for row in cursor.fetchall()]
+
+    with transaction.atomic():
+        counters = SequenceCounter.objects.filter(name=SEQUENCE_NAME)
+        if not counters.update(value=F('value') + count):
+            SequenceCounter.objects.create(name=SEQUENCE_NAME, value=count)
+        last = counters.values_list('value', flat=True).get()
+    return list(range(last - count + 1, last + 1))
+
+
+def allocate_tracking_numbers(count):
+    """Reserve `count` new tracking numbers at once."""
+    return [encode(value) for value in _next_values(count)]
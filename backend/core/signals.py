@@ -1,33 +1,123 @@
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch import receiver
-from django.contrib.auth import get_user_model
-from .models.order import Order
-from .models.order_tracking import OrderStatusHistory
-
-User = get_user_model()
-
-@receiver(post_save, sender=Order)
-def track_order_status_change(sender, instance, created, **kwargs):
-    """
-    تلقائياً تسجيل تغيير حالة الطلب
-    """
-    if created:
-        # عند إنشاء طلب جديد
-        OrderStatusHistory.objects.create(
-            order=instance,
-            new_status=instance.status,
-            notes="تم إنشاء الطلب"
-        )
-    else:
-        # عند تحديث الطلب
-        try:
-            old_order = Order.objects.get(pk=instance.pk)
-            if old_order.status != instance.status:
-                OrderStatusHistory.objects.create(
-                    order=instance,
-                    old_status=old_status,
-                    new_status=instance.status,
-                    notes=f"تم تغيير الحالة من {old_status} إلى {instance.status}"
-                )
-        except Order.DoesNotExist:
-            pass
+
+from .geo import parse_location
+from .models import Farm, Order, Product
+from .prices import parse_price
+from .search import farm_search_document, product_search_document, sync_search_index
+from .services.catalog_cache import bump_catalog_version
+from .services.farm_dashboard import invalidate_farm_dashboards
+from .services.image_derivatives import queue_image_derivatives, release_derivatives
+
+
+@receiver([post_save, post_delete], sender=Order)
+def invalidate_dashboard_on_order_change(sender, instance, **kwargs):
+    """
+    تحديث لوحة المزرعة عند تغيير أي طلب
+    """
+    invalidate_farm_dashboards([instance.farm_id])
+
+
+@receiver(pre_save, sender=Product)
+def update_product_search_document(sender, instance, **kwargs):
+    instance.search_document = product_search_document(instance)
+
+
+@receiver(pre_save, sender=Farm)
+def update_farm_search_document(sender, instance, **kwargs):
+    document = farm_search_document(instance)
+    # Product documents include the farm's name and location
+    instance._farm_text_changed = instance.pk is not None and document != instance.search_document
+    instance.search_document = document
+
+
+@receiver(pre_save, sender=Farm)
+def update_farm_coordinates(sender, instance, **kwargs):
+    instance.latitude, instance.longitude = parse_location(instance.location) or (None, None)
+
+
+@receiver(pre_save, sender=Farm)
+def update_farm_price(sender, instance, **kwargs):
+    instance.price, instance.price_unit = parse_price(instance.price_per_kg)
+
+
+@receiver(pre_save, sender=Product)
+@receiver(pre_save, sender=Farm)
+def reset_image_derivatives(sender, instance, raw=False, update_fields=None, **kwargs):
+    """
+    A new image drops the old image's resized copies; post_save queues new ones
+    """
+    instance._image_changed = False
+    if raw or (update_fields is not None and 'image' not in update_fields):
+        return
+    previous = None
+    if instance.pk is not None:
+        previous = sender.objects.filter(pk=instance.pk).values('image', 'image_derivatives').first()
+    # An upload isn't committed (nor its final name known) until the field's own pre_save
+    uploaded = instance.image and not instance.image._committed
+    instance._image_changed = bool(uploaded) or (instance.image.name or '') != ((previous or {}).get('image') or '')
+    if not instance._image_changed:
+        if previous:
+            # Keep copies a worker wrote after this instance was loaded
+            instance.image_derivatives = previous['image_derivatives']
+        return
+    instance.image_derivatives = {}
+    if previous and previous['image_derivatives']:
+        stale = previous['image_derivatives']
+        transaction.on_commit(lambda: release_derivatives(sender, stale))
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_save, sender=Farm)
+def queue_image_derivatives_on_change(sender, instance, update_fields=None, **kwargs):
+    if not getattr(instance, '_image_changed', False):
+        return
+    if update_fields is not None and 'image_derivatives' not in update_fields:
+        sender.objects.filter(pk=instance.pk).update(image_derivatives={})
+    if instance.image:
+        queue_image_derivatives(instance)
+
+
+@receiver(post_delete, sender=Product)
+@receiver(post_delete, sender=Farm)
+def delete_image_derivatives(sender, instance, **kwargs):
+    if instance.image_derivatives:
+        derivatives = instance.image_derivatives
+        transaction.on_commit(lambda: release_derivatives(sender, derivatives))
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_save, sender=Farm)
+def index_search_document(sender, instance, **kwargs):
+    sync_search_index(instance)
+
+
+@receiver(post_delete, sender=Product)
+@receiver(post_delete, sender=Farm)
+def unindex_search_document(sender, instance, **kwargs):
+    sync_search_index(instance, deleted=True)
+
+
+@receiver([post_save, post_delete], sender=Product)
+@receiver([post_save, post_delete], sender=Farm)
+def invalidate_catalog_cache(sender, instance, **kwargs):
+    """
+    تحديث نسخة كتالوج المنتجات عند تغيير أي منتج أو مزرعة
+    """
+    bump_catalog_version()
+
+
+@receiver(post_save, sender=Farm)
+def refresh_farm_product_documents(sender, instance, created, **kwargs):
+    """
+    تحديث بيانات البحث لمنتجات المزرعة عند تغيير اسمها أو موقعها
+    """
+    if created or not getattr(instance, '_farm_text_changed', False):
+        return
+    products = list(instance.products.all())
+    for product in products:
+        product.farm = instance
+        product.search_document = product_search_document(product)
+        sync_search_index(product)
+    Product.objects.bulk_update(products, ['search_document'], batch_size=500)
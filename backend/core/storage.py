@@ -0,0 +1,62 @@
+"""
+Content-addressed storage for farm and product images.
+
+Files are named by the SHA-256 of their bytes, in the directory they were
+uploaded to: `products/potato.jpeg` is stored as
+`products/3f2a…9c1e.jpeg`. Saving bytes that are already stored writes
+nothing and returns the existing name, so an image uploaded twice (or by
+two farmers) is kept once, and since a name's content can never change
+its URL can be cached forever (see IMMUTABLE_CACHE_CONTROL).
+
+Existing media is moved to content-addressed names by
+`manage.py dedupe_media`.
+"""
+import hashlib
+import posixpath
+import re
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.core.files.utils import validate_file_name
+from django.utils.deconstruct import deconstructible
+
+HASH_LENGTH = 32  # Hex digits of the SHA-256 kept in names (128 bits)
+
+_HASHED_NAME = re.compile(rf'[0-9a-f]{{{HASH_LENGTH}}}(\.[a-z0-9]+)?')
+
+
+def is_content_addressed(name):
+    return bool(name) and _HASHED_NAME.fullmatch(posixpath.basename(name)) is not None
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """FileSystemStorage that names files by their content hash."""
+
+    def content_hash(self, content):
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        content.seek(0)
+        return digest.hexdigest()[:HASH_LENGTH]
+
+    def hashed_name(self, name, content):
+        directory, filename = posixpath.split(name)
+        extension = posixpath.splitext(filename)[1].lower()
+        return posixpath.join(directory, f'{self.content_hash(content)}{extension}')
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = self.hashed_name(name, content)
+        validate_file_name(name, allow_relative_path=True)
+        # Same name, same bytes: nothing to write
+        if not self.exists(name):
+            name = self._save(name, content)
+        validate_file_name(name, allow_relative_path=True)
+        return name
+
+
+content_addressed_storage = ContentAddressedStorage()
@@ -0,0 +1,103 @@
+"""
+Rate limiting for write-heavy endpoints.
+
+SlidingWindowRateThrottle approximates a sliding window with two fixed
+window counters: the request count of the current window plus the previous
+window's count weighted by how much of it still overlaps the sliding
+window. That's two small integers per client instead of DRF's list of
+timestamps.
+
+Counters are RateLimitCounter rows, so every gunicorn worker shares them.
+A request is counted before it is allowed: one conditional
+`UPDATE ... SET count = count + 1 WHERE count < allowance` both checks
+and claims a slot, so concurrent requests can't all read the same count
+and slip past the limit together (as a cache get + incr could).
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from rest_framework.throttling import SimpleRateThrottle
+
+from core.idempotency import has_stored_response
+from core.models import RateLimitCounter
+
+
+class SlidingWindowRateThrottle(SimpleRateThrottle):
+    """
+    Sliding-window counter throttle keyed by user id (or IP for anonymous
+    requests). Subclasses set `scope` to pick a rate from DEFAULT_THROTTLE_RATES.
+    """
+    cache_format = 'ratelimit_%(scope)s_%(ident)s'
+
+    def get_cache_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            ident = request.user.pk
+        else:
+            ident = self.get_ident(request)
+        return self.cache_format % {'scope': self.scope, 'ident': ident}
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        now = self.timer()
+        window = int(now // self.duration)
+        elapsed = now - window * self.duration
+        counters = RateLimitCounter.objects.filter(key=self.key)
+
+        # The previous window is closed, so reading it first can't race
+        previous = counters.filter(window=window - 1).values_list('count', flat=True).first() or 0
+        overlap = (self.duration - elapsed) / self.duration
+        allowance = self.num_requests - previous * overlap
+
+        if self._take_slot(counters, window, allowance):
+            return True
+
+        current = counters.filter(window=window).values_list('count', flat=True).first() or 0
+        self.wait_seconds = self._seconds_until_allowed(previous, current, elapsed)
+        return False
+
+    def _take_slot(self, counters, window, allowance):
+        """Count one request in `window` if it stays under `allowance`."""
+        slot = counters.filter(window=window, count__lt=allowance)
+        if slot.update(count=F('count') + 1):
+            return True
+        if allowance <= 0 or counters.filter(window=window).exists():
+            return False
+
+        try:
+            with transaction.atomic():
+                RateLimitCounter.objects.create(key=self.key, window=window, count=1)
+        except IntegrityError:
+            # Another request opened the window first
+            return bool(slot.update(count=F('count') + 1))
+        # Only the current and previous windows are ever read
+        counters.filter(window__lt=window - 1).delete()
+        return True
+
+    def _seconds_until_allowed(self, previous, current, elapsed):
+        if not self.num_requests:
+            return None
+        remaining = self.duration - elapsed
+        if current < self.num_requests:
+            # The previous window's weight decays until the estimate drops under the limit
+            return max(0.0, remaining - (self.num_requests - current) * self.duration / previous)
+        # Wait for the next window, then for this window's weight to decay
+        return remaining + self.duration * (1 - self.num_requests / current)
+
+    def wait(self):
+        return getattr(self, 'wait_seconds', None)
+
+
+class OrderCreateRateThrottle(SlidingWindowRateThrottle):
+    """Limits how often a consumer can place orders."""
+    scope = 'orders'
+
+    def allow_request(self, request, view):
+        # A retry answered from its stored response places no order, so it's never refused
+        if has_stored_response(request):
+            return True
+        return super().allow_request(request, view)
@@ -16,6 +16,7 @@ from .views import (
     OrderViewSet,
     PaymentViewSet,
     ContactMessageViewSet,
+    CartQuoteView,
     payment_webhook,
     payment_success,
     payment_failure,
@@ -40,6 +41,9 @@ urlpatterns = [
     path('auth/token/refresh/', TokenRefreshView.as_view(), name='token-refresh'),
     path('auth/token/verify/', TokenVerifyView.as_view(), name='token-verify'),
     
+    # Server-side cart pricing
+    path('cart/quote/', CartQuoteView.as_view(), name='cart-quote'),
+    
     # Payment webhook and callbacks
     path('payments/webhook/', payment_webhook, name='payment-webhook'),
     path('payments/success/', payment_success, name='payment-success'),
@@ -1,21 +1,27 @@
 from rest_framework import viewsets, status, permissions
 from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.exceptions import PermissionDenied, ValidationError
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth import authenticate
 from django.shortcuts import render
+from django.urls import reverse
 from django.utils import timezone
-from django.http import HttpResponseRedirect
-from django.db.models import Q
+from django.http import HttpResponseRedirect, StreamingHttpResponse
+from django.utils.dateparse import parse_date
+from django.db import transaction
+from django.db.models import Prefetch, Q, prefetch_related_objects
 from django.conf import settings
 from django.views.decorators.csrf import csrf_exempt
+from django.views.static import serve
 from django.utils.decorators import method_decorator
 import requests
 import json
 import base64
+from datetime import datetime, time, timedelta
 
-from .models import User, Farm, Product, Order, OrderItem, Payment, ContactMessage
+from .models import User, Farm, Product, Order, OrderItem, Payment, ContactMessage, CheckoutRequest, ArchivedOrder
 from .serializers import (
     UserSerializer, 
     UserRegistrationSerializer, 
@@ -23,9 +29,30 @@ from .serializers import (
     FarmSerializer,
     ProductSerializer,
     OrderSerializer,
+    OrderItemSerializer,
+    CartQuoteSerializer,
+    QueuedCheckoutSerializer,
     PaymentSerializer,
     ContactMessageSerializer
 )
+from .conditional import IMMUTABLE_CACHE_CONTROL, PRIVATE_CACHE_CONTROL, ConditionalGetMixin, etag_matches, make_etag, not_modified, with_validators
+from .facets import BooleanFacet, ChoiceFacet, FacetedListMixin, RangeFacet
+from .fieldsets import SparseQuerysetMixin
+from .geo import near_params, nearby
+from .idempotency import idempotent
+from .pagination import KeysetPagination
+from .services import tracking_numbers
+from .services.catalog_cache import cached_catalog_response
+from .services.checkout import UnknownProducts, resolve_products
+from .services.checkout_queue import enqueue_checkout
+from .services.daily_load import release_order_load
+from .services.farm_dashboard import farm_dashboard
+from .services.order_export import export_rows, stream_csv, stream_xlsx
+from .services.order_totals import to_halalas
+from .services.pricing import quote_cart, shipping_fee
+from .services.stock import release_stock
+from .storage import is_content_addressed
+from .throttling import OrderCreateRateThrottle
 
 
 class HomeView(APIView):
@@ -153,8 +180,11 @@ class UserProfileView(APIView):
     permission_classes = [permissions.IsAuthenticated]
     
     def get(self, request):
+        etag = make_etag(request, request.user.pk, request.user.updated_at)
+        if etag_matches(request, etag):
+            return not_modified(etag, PRIVATE_CACHE_CONTROL)
         serializer = UserSerializer(request.user)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        return with_validators(Response(serializer.data, status=status.HTTP_200_OK), etag, PRIVATE_CACHE_CONTROL)
     
     def put(self, request):
         serializer = UserSerializer(request.user, data=request.data, partial=True)
@@ -178,7 +208,7 @@ class VerifyTokenView(APIView):
 
 
 # Farm Views
-class FarmViewSet(viewsets.ModelViewSet):
+class FarmViewSet(FacetedListMixin, ConditionalGetMixin, SparseQuerysetMixin, viewsets.ModelViewSet):
     """
     ViewSet for Farm operations
     Only farmers can create/update their own farms
@@ -187,6 +217,23 @@ class FarmViewSet(viewsets.ModelViewSet):
     queryset = Farm.objects.all()
     serializer_class = FarmSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    pagination_class = KeysetPagination
+    # Farms have no created_at; ids are handed out in creation order
+    keyset_ordering = ('-id',)
+    # Distance ranking can't be keyed on, so near searches page by number
+    keyset_conflicting_params = ('near',)
+    # ?ordering= choices that cursor pages can follow; farms without a price come last
+    keyset_orderings = {'price': ('price', 'id'), '-price': ('-price', '-id')}
+    # Read by ConditionalGetMixin for ETags
+    sparse_required_fields = ('updated_at',)
+    # owner_email and owner_name come from the owner's row
+    etag_related = ('owner',)
+    facets = (
+        ChoiceFacet('type'),
+        ChoiceFacet('administrative_region'),
+        ChoiceFacet('governorate'),
+        RangeFacet('price', bounds=('10', '25', '50', '100')),
+    )
     
     def get_queryset(self):
         queryset = Farm.objects.all()
@@ -194,6 +241,10 @@ class FarmViewSet(viewsets.ModelViewSet):
         owner_id = self.request.query_params.get('owner', None)
         if owner_id:
             queryset = queryset.filter(owner_id=owner_id)
+        # ?near=lat,lng&radius=km: farms within the radius, closest first
+        near = near_params(self.request)
+        if near:
+            queryset = nearby(queryset, *near)
         return queryset
     
     def perform_create(self, serializer):
@@ -220,10 +271,23 @@ class FarmViewSet(viewsets.ModelViewSet):
                 "You can only delete your own farm"
             )
         instance.delete()
+    
+    @action(detail=True, methods=['get'], permission_classes=[permissions.IsAuthenticated])
+    def dashboard(self, request, pk=None):
+        """
+        Order counts per status, today's load against daily capacity and
+        revenue for today, this week and this month. Farm owner only.
+        """
+        farm = self.get_object()
+        if farm.owner_id != request.user.id:
+            raise PermissionDenied(
+                "You can only view the dashboard of your own farm"
+            )
+        return Response(farm_dashboard(farm))
 
 
 # Product Views
-class ProductViewSet(viewsets.ModelViewSet):
+class ProductViewSet(FacetedListMixin, ConditionalGetMixin, SparseQuerysetMixin, viewsets.ModelViewSet):
     """
     ViewSet for Product operations
     Only farm owners can create/update products
@@ -232,6 +296,20 @@ class ProductViewSet(viewsets.ModelViewSet):
     queryset = Product.objects.filter(is_available=True)
     serializer_class = ProductSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    pagination_class = KeysetPagination
+    # ?ordering= choices that cursor pages can follow
+    keyset_orderings = {'price': ('price', 'id'), '-price': ('-price', '-id')}
+    # Read by ConditionalGetMixin for ETags
+    sparse_required_fields = ('updated_at',)
+    # farm_name comes from the farm's row
+    etag_related = ('farm',)
+    facets = (
+        ChoiceFacet('type', 'farm__type'),
+        ChoiceFacet('administrative_region', 'farm__administrative_region'),
+        ChoiceFacet('governorate', 'farm__governorate'),
+        RangeFacet('price', bounds=('10', '25', '50', '100')),
+        BooleanFacet('in_stock', Q(stock_quantity__gt=0)),
+    )
     
     def get_queryset(self):
         queryset = Product.objects.filter(is_available=True)
@@ -241,6 +319,22 @@ class ProductViewSet(viewsets.ModelViewSet):
             queryset = queryset.filter(farm_id=farm_id)
         return queryset
     
+    def list_response(self, request, etag, *args, **kwargs):
+        # The catalog is the same for everyone, so whole pages are cached.
+        # The ETag is part of the key, so stock changes made with UPDATE show up too.
+        response = None
+        
+        def build():
+            nonlocal response
+            response = super(ProductViewSet, self).list_response(request, etag, *args, **kwargs)
+            return response.data if response.status_code == 200 else None
+        
+        data, hit = cached_catalog_response(request, build, variant=etag)
+        if response is None:
+            response = Response(data)
+        response['X-Cache'] = 'HIT' if hit else 'MISS'
+        return response
+    
     def perform_create(self, serializer):
         # Only farmers can create products
         if not self.request.user.is_farmer:
@@ -274,7 +368,7 @@ class ProductViewSet(viewsets.ModelViewSet):
 
 
 # Order Views
-class OrderViewSet(viewsets.ModelViewSet):
+class OrderViewSet(SparseQuerysetMixin, viewsets.ModelViewSet):
     """
     ViewSet for Order operations
     All authenticated users (including farmers) can create orders
@@ -283,29 +377,154 @@ class OrderViewSet(viewsets.ModelViewSet):
     """
     serializer_class = OrderSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = KeysetPagination
     
     def get_queryset(self):
         user = self.request.user
         # Users see their own orders
         # Farmers also see orders for their farms
-        if user.is_farmer and user.farms.exists():
-            return Order.objects.filter(
-                Q(consumer=user) | Q(farm__in=user.farms.all())
-            )
-        return Order.objects.filter(consumer=user)
+        if user.is_farmer:
+            queryset = Order.objects.filter(Q(consumer=user) | Q(farm__owner=user))
+        else:
+            queryset = Order.objects.filter(consumer=user)
+        # Everything OrderSerializer reads: one join plus one prefetch for the items
+        return queryset.select_related('consumer', 'farm', 'payment').prefetch_related(
+            Prefetch('items', queryset=OrderItem.objects.select_related('product'))
+        )
     
+    def get_throttles(self):
+        # Rate limit checkout before any cart validation runs
+        if self.action == 'create':
+            return [OrderCreateRateThrottle()]
+        return super().get_throttles()
+
+    def wants_async_checkout(self, request):
+        # Async checkout is on for everyone, or per request with "Prefer: respond-async"
+        if getattr(settings, 'CHECKOUT_MODE', 'sync') == 'async':
+            return True
+        return 'respond-async' in request.headers.get('Prefer', '')
+
+    @idempotent
+    def create(self, request, *args, **kwargs):
+        if self.wants_async_checkout(request):
+            return self.enqueue_checkout(request)
+
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        self.perform_create(serializer)
+
+        # A multi-farm cart creates one order per farm: the first order stays
+        # at the top level for existing clients, all of them under 'orders'
+        orders = serializer.created_orders
+        prefetch_related_objects(
+            orders,
+            'payment',
+            Prefetch('items', queryset=OrderItem.objects.select_related('product'))
+        )
+        orders_data = self.get_serializer(orders, many=True).data
+        response_data = {**orders_data[0], 'orders': orders_data}
+        headers = self.get_success_headers(response_data)
+        return Response(response_data, status=status.HTTP_201_CREATED, headers=headers)
+
+    def enqueue_checkout(self, request):
+        serializer = QueuedCheckoutSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        checkout_request = enqueue_checkout(request.user, serializer.validated_data)
+        trace_url = request.build_absolute_uri(
+            f"{reverse('order-trace')}?tracking_number={checkout_request.tracking_number}"
+        )
+        return Response({
+            'tracking_number': checkout_request.tracking_number,
+            'status': checkout_request.status,
+            'trace_url': trace_url,
+        }, status=status.HTTP_202_ACCEPTED, headers={'Location': trace_url})
+
     def perform_create(self, serializer):
         # All authenticated users can create orders (including farmers)
         serializer.save(consumer=self.request.user)
 
+    def perform_update(self, serializer):
+        with transaction.atomic():
+            # Lock the order so two cancellations can't both give its stock back
+            previous_status = Order.objects.select_for_update().values_list(
+                'status', flat=True
+            ).get(pk=serializer.instance.pk)
+            # Its stock and load were given back, so a cancelled order stays cancelled
+            new_status = serializer.validated_data.get('status', previous_status)
+            if previous_status == 'cancelled' and new_status != 'cancelled':
+                raise ValidationError({'status': ["A cancelled order can't be reopened."]})
+            order = serializer.save()
+            # A cancelled order no longer counts against today's limits or holds stock
+            if order.status == 'cancelled' and previous_status != 'cancelled':
+                release_order_load(order)
+                release_stock(order)
+
+    @action(detail=False, methods=['get'])
+    def history(self, request):
+        """
+        Archived (long-closed) orders, newest first, in the same shape as the order list
+        """
+        user = request.user
+        queryset = ArchivedOrder.objects.filter(consumer=user)
+        if user.is_farmer:
+            queryset = ArchivedOrder.objects.filter(Q(consumer=user) | Q(farm__owner=user))
+        page = self.paginate_queryset(queryset.only('id', 'data', 'created_at'))
+        return self.get_paginated_response([archived.data for archived in page])
+
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """
+        Stream the orders of the user's farms as CSV (default) or XLSX.
+        Filters: from / to (YYYY-MM-DD, inclusive), status (comma-separated),
+        farm (id), file_format (csv or xlsx).
+        """
+        orders = Order.objects.filter(farm__owner=request.user)
+
+        params = request.query_params
+        file_format = params.get('file_format', 'csv')
+        if file_format not in ('csv', 'xlsx'):
+            return Response({'error': 'file_format must be csv or xlsx'}, status=status.HTTP_400_BAD_REQUEST)
+
+        for param, lookup, days in (('from', 'created_at__gte', 0), ('to', 'created_at__lt', 1)):
+            if params.get(param):
+                day = parse_date(params[param])
+                if day is None:
+                    return Response({'error': f'Invalid {param} date'}, status=status.HTTP_400_BAD_REQUEST)
+                start = timezone.make_aware(datetime.combine(day + timedelta(days=days), time.min))
+                orders = orders.filter(**{lookup: start})
+
+        if params.get('status'):
+            orders = orders.filter(status__in=params['status'].split(','))
+        if params.get('farm'):
+            if not params['farm'].isdigit():
+                return Response({'error': 'Invalid farm'}, status=status.HTTP_400_BAD_REQUEST)
+            orders = orders.filter(farm_id=params['farm'])
+
+        rows = export_rows(orders)
+        filename = f"orders-{timezone.localdate():%Y%m%d}.{file_format}"
+        if file_format == 'xlsx':
+            response = StreamingHttpResponse(
+                stream_xlsx(rows),
+                content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+            )
+        else:
+            response = StreamingHttpResponse(stream_csv(rows), content_type='text/csv; charset=utf-8')
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
     @action(detail=False, methods=['get'], permission_classes=[permissions.AllowAny])
     def trace(self, request):
         tracking_number = request.query_params.get('tracking_number')
         if not tracking_number:
             return Response({'error': 'Tracking number is required'}, status=status.HTTP_400_BAD_REQUEST)
         
+        # Reject typos and garbage without touching the database
+        tracking_number = tracking_numbers.normalize(tracking_number)
+        if not tracking_numbers.is_well_formed(tracking_number):
+            return Response({'error': 'Invalid tracking number'}, status=status.HTTP_400_BAD_REQUEST)
+        
         try:
-            order = Order.objects.get(tracking_number=tracking_number)
+            order = Order.objects.select_related('farm').get(tracking_number=tracking_number)
             # Return limited data for privacy
             return Response({
                 'tracking_number': order.tracking_number,
@@ -314,10 +533,48 @@ class OrderViewSet(viewsets.ModelViewSet):
                 'created_at': order.created_at,
                 'delivery_city': order.delivery_city,
                 'delivery_name': order.delivery_name, # Added for better UX on tracking page
-                'items': OrderItemSerializer(order.items.all(), many=True).data
+                'items': OrderItemSerializer(order.items.select_related('product'), many=True).data
             })
         except Order.DoesNotExist:
+            pass
+        
+        # Closed orders are moved to the archive after a while
+        archived = ArchivedOrder.objects.filter(tracking_number=tracking_number).values_list('data', flat=True).first()
+        if archived is not None:
+            return Response({
+                key: archived.get(key)
+                for key in ('tracking_number', 'status', 'farm_name', 'created_at',
+                            'delivery_city', 'delivery_name', 'items')
+            })
+        
+        # Not an order (yet) - it may still be waiting in the checkout queue
+        checkout_request = CheckoutRequest.objects.filter(tracking_number=tracking_number).first()
+        if checkout_request is None or checkout_request.status == 'done':
             return Response({'error': 'Order not found'}, status=status.HTTP_404_NOT_FOUND)
+        return Response({
+            'tracking_number': checkout_request.tracking_number,
+            'status': checkout_request.status,
+            'created_at': checkout_request.created_at,
+            'errors': checkout_request.errors,
+        })
+
+
+# Cart Views
+class CartQuoteView(APIView):
+    """
+    Price a cart with current product prices, stock, farm capacity and shipping.
+    Checkout uses the same prices, so the quote is what the consumer will pay.
+    """
+    permission_classes = [permissions.AllowAny]
+    
+    def post(self, request):
+        serializer = CartQuoteSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            lines = resolve_products(serializer.validated_data['items'])
+        except UnknownProducts as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(quote_cart(lines))
 
 
 # Payment Views
@@ -376,6 +633,7 @@ class PaymentViewSet(viewsets.ModelViewSet):
             )
     
     @action(detail=False, methods=['post'], url_path='create')
+    @idempotent
     def create_payment(self, request):
         """
         Create a payment for an order using Moyasar
@@ -423,8 +681,7 @@ class PaymentViewSet(viewsets.ModelViewSet):
             )
         
         # Calculate total amount (order total + shipping)
-        shipping = 15  # Fixed shipping cost
-        total_amount = float(order.total_amount) + shipping
+        total_amount = order.total_amount + shipping_fee()
         
         # Prepare Moyasar payment request - Using Invoices API for Hosted Payment Page
         moyasar_url = 'https://api.moyasar.com/v1/invoices'
@@ -438,7 +695,7 @@ class PaymentViewSet(viewsets.ModelViewSet):
         delivery_info = f" - {order.delivery_city}" if order.delivery_city else ""
         
         payment_data = {
-            'amount': int(total_amount * 100),  # Convert to halalas (cents)
+            'amount': to_halalas(total_amount),  # Convert to halalas (cents)
             'currency': 'SAR',
             'description': f'Order #{order.id} - {order.farm.name}{delivery_info}',
             'metadata': {
@@ -644,3 +901,14 @@ class ContactMessageViewSet(viewsets.ModelViewSet):
         if self.action == 'create':
             return [permissions.AllowAny()]
         return [permissions.IsAdminUser()]
+
+
+def serve_media(request, path, document_root=None):
+    """
+    Development media server; content-addressed files get far-future
+    caching, since their URL changes whenever their content does
+    """
+    response = serve(request, path, document_root=document_root)
+    if response.status_code == 200 and is_content_addressed(path):
+        response['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+    return response
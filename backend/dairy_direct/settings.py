@@ -5,6 +5,7 @@ Django settings for dairy_direct project.
 import os
 from pathlib import Path
 from dotenv import load_dotenv
+from corsheaders.defaults import default_headers
 
 # Load environment variables from .env file
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -43,6 +44,7 @@ MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',  # Moved to top
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    'core.compression.CompressionMiddleware',  # API responses; WhiteNoise compresses static files itself
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -119,6 +121,12 @@ STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Widths (px) of the WebP/JPEG copies image workers make of farm and
+# product images (core.services.image_derivatives)
+IMAGE_DERIVATIVE_WIDTHS = [
+    int(width) for width in os.getenv('IMAGE_DERIVATIVE_WIDTHS', '160,320,640,1280').split(',')
+]
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -137,11 +145,36 @@ REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 10,
     'DEFAULT_FILTER_BACKENDS': [
-        'rest_framework.filters.SearchFilter',
+        'core.search.SearchDocumentFilter',
         'rest_framework.filters.OrderingFilter',
     ],
+    'DEFAULT_THROTTLE_RATES': {
+        'orders': os.getenv('ORDER_RATE_LIMIT', '20/hour'),
+    },
 }
 
+# Caches
+# The catalog cache version (and the farm dashboards cached alongside it)
+# must be shared by every gunicorn worker, so it uses the database cache by
+# default (run `python manage.py createcachetable`).
+# Set CATALOG_CACHE_BACKEND / CATALOG_CACHE_LOCATION to use the file cache
+# (a directory path) or local memory (single process only) instead.
+# Rate limit counters live in their own table (core.throttling).
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'catalog': {
+        'BACKEND': os.getenv('CATALOG_CACHE_BACKEND', 'django.core.cache.backends.db.DatabaseCache'),
+        'LOCATION': os.getenv('CATALOG_CACHE_LOCATION', 'catalog_cache'),
+    },
+}
+
+# Product list responses, keyed by URL and catalog version (core.services.catalog_cache)
+CATALOG_CACHE_ALIAS = 'catalog'
+CATALOG_CACHE_TTL = int(os.getenv('CATALOG_CACHE_TTL', 60))  # seconds
+CATALOG_CACHE_LOCK_TIMEOUT = 5  # seconds other requests wait for the one rebuilding a page
+
 # JWT Settings (like YouTube-style authentication)
 from datetime import timedelta
 
@@ -166,9 +199,49 @@ CORS_ALLOW_ALL_ORIGINS = True
 
 CORS_ALLOW_CREDENTIALS = True
 
+CORS_ALLOW_HEADERS = (*default_headers, 'idempotency-key', 'prefer')
+
+# Idempotency-Key support for order and payment creation
+IDEMPOTENCY_KEY_TTL = 24 * 60 * 60  # seconds a stored response can be replayed
+IDEMPOTENCY_WAIT_TIMEOUT = 10  # seconds a retry waits for the original request
+IDEMPOTENCY_LEASE_TIMEOUT = 6 * IDEMPOTENCY_WAIT_TIMEOUT  # seconds before an unfinished key can be taken over
+
+# Farmer dashboard aggregates are cached per farm and dropped on order changes;
+# the cache is shared by every worker so the drop reaches all of them
+DASHBOARD_CACHE_ALIAS = 'catalog'
+DASHBOARD_CACHE_TTL = int(os.getenv('DASHBOARD_CACHE_TTL', 30))  # seconds
+
 # Moyasar Payment Gateway Configuration
 MOYASAR_SECRET_KEY = os.getenv('MOYASAR_SECRET_KEY', '')
 MOYASAR_PUBLISHABLE_KEY = os.getenv('MOYASAR_PUBLISHABLE_KEY', '')
 
+# 'async' queues every checkout for `manage.py run_checkout_workers` and answers
+# 202 with a tracking number; in 'sync' mode clients can still opt in per
+# request with "Prefer: respond-async"
+CHECKOUT_MODE = os.getenv('CHECKOUT_MODE', 'sync')
+
+# A claimed checkout request whose worker hasn't finished it within this many
+# seconds (it crashed or was killed) is claimed again, at most
+# CHECKOUT_MAX_ATTEMPTS times in all before it is marked failed
+CHECKOUT_CLAIM_TIMEOUT = int(os.getenv('CHECKOUT_CLAIM_TIMEOUT', 120))
+CHECKOUT_MAX_ATTEMPTS = int(os.getenv('CHECKOUT_MAX_ATTEMPTS', 3))
+
+# Completed and cancelled orders untouched for this many days are moved to
+# the archive table by `manage.py archive_orders`
+ORDER_ARCHIVE_AFTER_DAYS = int(os.getenv('ORDER_ARCHIVE_AFTER_DAYS', 180))
+
+# Flat shipping charged on each order, in SAR (core.services.pricing)
+SHIPPING_FEE = os.getenv('SHIPPING_FEE', '15.00')
+
+# Farm daily capacity is counted in 'orders' or total item 'quantity'
+DAILY_CAPACITY_UNIT = os.getenv('DAILY_CAPACITY_UNIT', 'orders')
+
+# Key for scrambling order tracking numbers. Changing it once orders exist
+# can make new tracking numbers collide with old ones.
+TRACKING_NUMBER_KEY = os.getenv('TRACKING_NUMBER_KEY', 'dairy-direct-tracking')
+
+# Responses smaller than this many bytes are sent uncompressed (core.compression)
+COMPRESSION_MIN_SIZE = int(os.getenv('COMPRESSION_MIN_SIZE', 1024))
+
 # Frontend URL for redirects
 FRONTEND_URL = os.getenv('FRONTEND_URL', 'http://localhost:3001')
@@ -0,0 +1,130 @@
+import pytest
+from datetime import timedelta
+from decimal import Decimal
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+from model_bakery import baker
+
+from core.models import CheckoutRequest, Farm, Order, Product
+from core.services.checkout_queue import drain
+
+
+@pytest.fixture
+def product(db):
+    owner = baker.make("core.User")
+    farm = Farm.objects.create(owner=owner, name="Farm", location="https://example.com")
+    return Product.objects.create(farm=farm, name="Milk", price=Decimal("10.00"), stock_quantity=3)
+
+
+def _cart(product, quantity=1):
+    return {"items": [{"product": product.id, "quantity": quantity, "price": "10.00"}], "delivery_city": "Riyadh"}
+
+
+def _trace(client, tracking_number):
+    return client.get(reverse("order-trace"), {"tracking_number": tracking_number}).json()
+
+
+@pytest.mark.django_db
+def test_async_checkout_is_queued_then_processed(auth_client, product):
+    res = auth_client.post(reverse("order-list"), _cart(product), format="json", HTTP_PREFER="respond-async")
+
+    assert res.status_code == 202
+    tracking_number = res.json()["tracking_number"]
+    assert res["Location"].endswith(f"tracking_number={tracking_number}")
+    assert not Order.objects.exists()
+    assert _trace(auth_client, tracking_number)["status"] == "queued"
+
+    assert drain() == 1
+
+    order = Order.objects.get()
+    assert order.tracking_number == tracking_number
+    assert order.delivery_city == "Riyadh"
+    assert _trace(auth_client, tracking_number)["status"] == "pending"
+
+
+@pytest.mark.django_db
+def test_async_checkout_rejection_is_traceable(auth_client, product):
+    res = auth_client.post(reverse("order-list"), _cart(product, quantity=5), format="json", HTTP_PREFER="respond-async")
+
+    call_command("run_checkout_workers", "--once")
+
+    trace = _trace(auth_client, res.json()["tracking_number"])
+    assert trace["status"] == "rejected"
+    assert trace["errors"]
+    assert not Order.objects.exists()
+
+
+@pytest.mark.django_db
+def test_async_mode_setting_queues_every_checkout(auth_client, product, settings):
+    settings.CHECKOUT_MODE = "async"
+
+    res = auth_client.post(reverse("order-list"), _cart(product), format="json")
+
+    assert res.status_code == 202
+    assert CheckoutRequest.objects.filter(status="queued").count() == 1
+
+
+@pytest.mark.django_db
+def test_async_checkout_validates_cart_shape(auth_client):
+    res = auth_client.post(
+        reverse("order-list"),
+        {"items": [{"product": "milk", "quantity": 0}]},
+        format="json",
+        HTTP_PREFER="respond-async",
+    )
+
+    assert res.status_code == 400
+    assert not CheckoutRequest.objects.exists()
+
+
+@pytest.mark.django_db
+def test_async_checkout_rejects_absurd_quantities(auth_client, product):
+    res = auth_client.post(reverse("order-list"), _cart(product, quantity=10 ** 20), format="json", HTTP_PREFER="respond-async")
+
+    assert res.status_code == 400
+    assert not CheckoutRequest.objects.exists()
+
+
+@pytest.mark.django_db
+def test_unexpected_checkout_error_fails_the_request(auth_client, product, monkeypatch):
+    res = auth_client.post(reverse("order-list"), _cart(product), format="json", HTTP_PREFER="respond-async")
+
+    def explode(*args, **kwargs):
+        raise OverflowError("Python int too large to convert to SQLite INTEGER")
+
+    monkeypatch.setattr("core.services.checkout_queue.place_orders", explode)
+    assert drain() == 1
+    # Not picked up again
+    assert drain() == 0
+
+    checkout_request = CheckoutRequest.objects.get()
+    assert (checkout_request.status, checkout_request.attempts) == ("failed", 1)
+    assert checkout_request.errors == ["Checkout failed: OverflowError"]
+    assert _trace(auth_client, res.json()["tracking_number"])["status"] == "failed"
+    product.refresh_from_db()
+    assert product.stock_quantity == 3
+
+
+@pytest.mark.django_db
+def test_requests_that_keep_killing_workers_are_given_up(product, settings):
+    settings.CHECKOUT_MAX_ATTEMPTS = 3
+    # Claimed three times already, by workers that died before finishing
+    checkout_request = CheckoutRequest.objects.create(
+        consumer=product.farm.owner, tracking_number="T-1", payload=_cart(product),
+        attempts=3, claimed_at=timezone.now() - timedelta(seconds=settings.CHECKOUT_CLAIM_TIMEOUT + 1)
+    )
+    recent = CheckoutRequest.objects.create(
+        consumer=product.farm.owner, tracking_number="T-2", payload=_cart(product),
+        attempts=1, claimed_at=timezone.now()
+    )
+
+    assert drain() == 1
+
+    checkout_request.refresh_from_db()
+    assert checkout_request.status == "failed"
+    assert checkout_request.errors == ["Checkout failed after 3 attempts"]
+    # A worker may still be running this one
+    recent.refresh_from_db()
+    assert (recent.status, recent.attempts) == ("queued", 1)
+    assert not Order.objects.exists()
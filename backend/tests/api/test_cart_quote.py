@@ -0,0 +1,82 @@
+import pytest
+from decimal import Decimal
+from django.urls import reverse
+from django.utils import timezone
+from model_bakery import baker
+
+from core.models import Farm, FarmDailyLoad, Order, Product
+
+
+@pytest.fixture
+def products(db):
+    owner = baker.make("core.User")
+    dairy = Farm.objects.create(owner=owner, name="Dairy", location="https://example.com", daily_capacity=2)
+    dates = Farm.objects.create(owner=owner, name="Dates", location="https://example.com", daily_capacity=None)
+    return [
+        Product.objects.create(farm=dairy, name="Milk", price=Decimal("12.50"), stock_quantity=3),
+        Product.objects.create(farm=dairy, name="Laban", price=Decimal("8.00"), stock_quantity=10),
+        Product.objects.create(farm=dates, name="Sukkari", price=Decimal("30.00"), stock_quantity=1),
+    ]
+
+
+@pytest.mark.django_db
+def test_quote_prices_cart_per_farm(api_client, products, settings, django_assert_num_queries):
+    settings.SHIPPING_FEE = "15.00"
+    milk, laban, sukkari = products
+    cart = {"items": [
+        {"product": milk.id, "quantity": 2, "price": "0.01"},
+        {"product": laban.id, "quantity": 1},
+        {"product": sukkari.id, "quantity": 1},
+    ]}
+
+    # One query for the products and their farms, one for the farms' daily loads
+    with django_assert_num_queries(2):
+        res = api_client.post(reverse("cart-quote"), cart, format="json")
+
+    assert res.status_code == 200
+    data = res.json()
+    dairy, dates = data["farms"]
+    assert [item["price"] for item in dairy["items"]] == ["12.50", "8.00"]
+    assert dairy["subtotal"] == "33.00"
+    assert dairy["total"] == "48.00"
+    assert dairy["capacity"] == {"daily_capacity": 2, "remaining": 2, "available": True}
+    assert dates["capacity"]["daily_capacity"] is None
+    assert data["subtotal"] == "63.00"
+    assert data["shipping"] == "30.00"
+    assert data["total"] == "93.00"
+    assert data["can_checkout"] is True
+
+
+@pytest.mark.django_db
+def test_quote_reports_stock_and_capacity_problems(api_client, products):
+    milk, _, sukkari = products
+    FarmDailyLoad.objects.create(farm=milk.farm, day=timezone.localdate(), orders=2)
+    cart = {"items": [{"product": milk.id, "quantity": 1}, {"product": sukkari.id, "quantity": 2}]}
+
+    data = api_client.post(reverse("cart-quote"), cart, format="json").json()
+
+    dairy, dates = data["farms"]
+    assert dairy["capacity"]["available"] is False
+    assert dates["items"][0]["in_stock"] is False
+    assert data["can_checkout"] is False
+
+
+@pytest.mark.django_db
+def test_quote_rejects_unknown_products(api_client, products):
+    res = api_client.post(reverse("cart-quote"), {"items": [{"product": 999999, "quantity": 1}]}, format="json")
+
+    assert res.status_code == 400
+    assert "999999" in res.json()["error"]
+
+
+@pytest.mark.django_db
+def test_checkout_ignores_client_price(auth_client, products):
+    milk = products[0]
+    cart = {"items": [{"product": milk.id, "quantity": 2, "price": "0.01"}]}
+
+    res = auth_client.post(reverse("order-list"), cart, format="json")
+
+    assert res.status_code == 201
+    order = Order.objects.get()
+    assert order.total_amount == Decimal("25.00")
+    assert order.items.get().price == Decimal("12.50")
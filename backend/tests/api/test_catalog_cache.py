@@ -0,0 +1,71 @@
+import threading
+import time
+
+import pytest
+from decimal import Decimal
+from django.core.cache import caches
+from django.urls import reverse
+from model_bakery import baker
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from core.models import Farm, Product
+from core.services.catalog_cache import cached_catalog_response
+
+
+@pytest.fixture
+def product(db):
+    farm = Farm.objects.create(owner=baker.make("core.User"), name="Farm", location="https://example.com")
+    return Product.objects.create(farm=farm, name="Milk", price=Decimal("10.00"))
+
+
+@pytest.mark.django_db
+def test_catalog_pages_are_served_from_cache(api_client, product):
+    url = reverse("product-list")
+
+    first = api_client.get(url)
+    second = api_client.get(url)
+
+    assert first["X-Cache"] == "MISS"
+    assert second["X-Cache"] == "HIT"
+    assert second.json() == first.json()
+    assert api_client.get(url, {"page": 1})["X-Cache"] == "MISS"
+
+
+@pytest.mark.django_db
+def test_product_change_bumps_catalog_version(api_client, product, django_capture_on_commit_callbacks):
+    url = reverse("product-list")
+    api_client.get(url)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        product.name = "Fresh milk"
+        product.save()
+
+    res = api_client.get(url)
+    assert res["X-Cache"] == "MISS"
+    assert res.json()["results"][0]["name"] == "Fresh milk"
+
+
+def test_concurrent_misses_build_once(settings):
+    settings.CATALOG_CACHE_ALIAS = "default"
+    caches["default"].clear()
+    request = Request(APIRequestFactory().get("/api/products/", {"page": "2"}))
+    builds = []
+
+    def build():
+        builds.append(1)
+        time.sleep(0.2)
+        return {"results": []}
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(cached_catalog_response(request, build)))
+        for _ in range(5)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(builds) == 1
+    assert sorted(hit for _, hit in results) == [False, True, True, True, True]
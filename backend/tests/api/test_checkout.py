@@ -0,0 +1,84 @@
+import pytest
+from decimal import Decimal
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from model_bakery import baker
+
+from core.models import Farm, Product, Order, OrderItem
+from core.throttling import OrderCreateRateThrottle
+
+
+def _make_products(farm_count, products_per_farm):
+    owner = baker.make("core.User")
+    products = []
+    for f in range(farm_count):
+        farm = Farm.objects.create(owner=owner, name=f"Farm {f}", location="https://example.com")
+        for p in range(products_per_farm):
+            products.append(
+                Product.objects.create(farm=farm, name=f"P{f}-{p}", price=Decimal("10.00"), stock_quantity=100)
+            )
+    return products
+
+
+def _cart(products):
+    return {"items": [{"product": p.id, "quantity": 2, "price": "10.00"} for p in products]}
+
+
+@pytest.mark.django_db
+def test_multi_farm_cart_returns_every_order(auth_client):
+    products = _make_products(farm_count=3, products_per_farm=2)
+
+    res = auth_client.post(reverse("order-list"), _cart(products), format="json")
+
+    assert res.status_code == 201
+    data = res.json()
+    assert len(data["orders"]) == 3
+    assert data["id"] == data["orders"][0]["id"]
+    assert Order.objects.count() == 3
+    assert OrderItem.objects.count() == 6
+    for order in Order.objects.all():
+        assert order.total_amount == Decimal("40.00")
+        assert order.tracking_number.startswith("MK-")
+
+
+@pytest.mark.django_db
+def test_checkout_query_count_does_not_grow_with_cart_size(auth_client, monkeypatch):
+    # Keep rate limiter bookkeeping out of this count
+    monkeypatch.setattr(OrderCreateRateThrottle, "THROTTLE_RATES", {"orders": None})
+    small = _make_products(farm_count=2, products_per_farm=1)
+    large = _make_products(farm_count=2, products_per_farm=20)
+
+    with CaptureQueriesContext(connection) as small_ctx:
+        assert auth_client.post(reverse("order-list"), _cart(small), format="json").status_code == 201
+    with CaptureQueriesContext(connection) as large_ctx:
+        assert auth_client.post(reverse("order-list"), _cart(large), format="json").status_code == 201
+
+    assert len(large_ctx.captured_queries) == len(small_ctx.captured_queries)
+
+
+@pytest.mark.django_db
+def test_unknown_product_is_rejected_without_creating_orders(auth_client):
+    products = _make_products(farm_count=1, products_per_farm=1)
+    cart = _cart(products)
+    cart["items"].append({"product": 999999, "quantity": 1, "price": "1.00"})
+
+    res = auth_client.post(reverse("order-list"), cart, format="json")
+
+    assert res.status_code == 400
+    assert "items" in res.json()
+    assert Order.objects.count() == 0
+
+
+@pytest.mark.django_db
+def test_full_farm_rolls_back_whole_cart(auth_client):
+    products = _make_products(farm_count=2, products_per_farm=1)
+    full_farm = products[1].farm
+    full_farm.daily_capacity = 0
+    full_farm.save()
+
+    res = auth_client.post(reverse("order-list"), _cart(products), format="json")
+
+    assert res.status_code == 400
+    assert Order.objects.count() == 0
+    assert OrderItem.objects.count() == 0
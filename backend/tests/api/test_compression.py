@@ -0,0 +1,92 @@
+import gzip
+from decimal import Decimal
+
+import pytest
+from django.urls import reverse
+from model_bakery import baker
+
+from core import compression
+from core.models import Farm, Order, OrderItem, Product
+
+
+@pytest.fixture
+def catalog(db):
+    farm = baker.make(Farm, name="مزرعة الخير")
+    for i in range(10):
+        Product.objects.create(
+            farm=farm, name=f"حليب طازج {i}", description="حليب بقري كامل الدسم " * 5,
+            price=Decimal("12.50"), stock_quantity=20
+        )
+
+
+@pytest.mark.django_db
+def test_catalog_page_is_gzipped_when_accepted(api_client, catalog):
+    plain = api_client.get(reverse("product-list"))
+    res = api_client.get(reverse("product-list"), HTTP_ACCEPT_ENCODING="gzip, deflate")
+
+    assert "Content-Encoding" not in plain
+    assert res["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in res["Vary"]
+    assert int(res["Content-Length"]) == len(res.content) < len(plain.content) / 3
+    assert gzip.decompress(res.content) == plain.content
+
+
+@pytest.mark.django_db
+def test_compressed_etag_is_weak_and_still_revalidates(api_client, catalog):
+    res = api_client.get(reverse("product-list"), HTTP_ACCEPT_ENCODING="gzip")
+    assert res["ETag"].startswith('W/"')
+
+    again = api_client.get(
+        reverse("product-list"), HTTP_ACCEPT_ENCODING="gzip", HTTP_IF_NONE_MATCH=res["ETag"]
+    )
+    assert again.status_code == 304
+    assert "Content-Encoding" not in again
+
+
+@pytest.mark.django_db
+def test_small_and_refused_responses_are_sent_as_is(api_client, catalog, settings):
+    farm_url = reverse("farm-list")
+    assert "Content-Encoding" not in api_client.get(farm_url, {"name": "none"}, HTTP_ACCEPT_ENCODING="gzip")
+    assert "Content-Encoding" not in api_client.get(reverse("product-list"), HTTP_ACCEPT_ENCODING="gzip;q=0, br;q=0")
+
+    settings.COMPRESSION_MIN_SIZE = 10 ** 6
+    assert "Content-Encoding" not in api_client.get(reverse("product-list"), HTTP_ACCEPT_ENCODING="gzip")
+
+
+@pytest.mark.django_db
+def test_streamed_export_is_compressed_chunk_by_chunk(auth_client, user):
+    farm = Farm.objects.create(owner=user, name="مزرعة", location="https://example.com")
+    product = Product.objects.create(farm=farm, name="حليب", price=Decimal("10.00"), stock_quantity=10)
+    for _ in range(30):
+        order = Order.objects.create(consumer=baker.make("core.User"), farm=farm, total_amount=Decimal("20.00"))
+        OrderItem.objects.create(order=order, product=product, quantity=2, price=Decimal("10.00"))
+
+    res = auth_client.get(reverse("order-export"), HTTP_ACCEPT_ENCODING="gzip")
+
+    assert res.streaming
+    assert res["Content-Encoding"] == "gzip"
+    assert not res.has_header("Content-Length")
+    body = gzip.decompress(b"".join(res.streaming_content)).decode("utf-8-sig")
+    assert body.count("حليب") == 30
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("gzip, deflate, br", "br"),
+    ("br;q=0.5, gzip", "gzip"),
+    ("*", "br"),
+    ("br;q=0, *;q=0.1", "gzip"),
+    ("identity", None),
+    ("", None),
+])
+def test_negotiation_prefers_brotli_unless_rated_lower(monkeypatch, header, expected):
+    monkeypatch.setattr(compression, "available_encodings", lambda: ("br", "gzip"))
+
+    assert compression.negotiate_encoding(header) == expected
+
+
+def test_brotli_round_trip():
+    brotli = pytest.importorskip("brotli")
+    data = b'{"results": [' + b'{"name": "milk"},' * 200 + b"]}"
+
+    assert brotli.decompress(compression.compress(data, "br")) == data
+    assert brotli.decompress(b"".join(compression.compress_stream([data[:100], data[100:]], "br"))) == data
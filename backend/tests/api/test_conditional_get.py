@@ -0,0 +1,97 @@
+import pytest
+from decimal import Decimal
+from django.urls import reverse
+from model_bakery import baker
+
+from core.models import Farm, Product
+
+
+@pytest.fixture
+def product(db):
+    farm = Farm.objects.create(owner=baker.make("core.User"), name="Farm", location="https://example.com")
+    return Product.objects.create(farm=farm, name="Milk", price=Decimal("10.00"), stock_quantity=5)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("name", ["product-list", "farm-list"])
+def test_list_returns_304_for_matching_etag(api_client, product, name):
+    url = reverse(name)
+    first = api_client.get(url)
+
+    assert first.status_code == 200
+    assert first["Cache-Control"].startswith("public")
+
+    second = api_client.get(url, HTTP_IF_NONE_MATCH=first["ETag"])
+    assert second.status_code == 304
+    assert second["ETag"] == first["ETag"]
+    assert not second.content
+
+
+@pytest.mark.django_db
+def test_stock_update_changes_list_etag(api_client, product):
+    url = reverse("product-list")
+    etag = api_client.get(url)["ETag"]
+
+    # Checkout writes stock with UPDATE, which doesn't bump the catalog version
+    Product.objects.filter(pk=product.pk).update(stock_quantity=4, updated_at=product.updated_at.replace(year=2100))
+
+    res = api_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert res.status_code == 200
+    assert res["ETag"] != etag
+    assert res["X-Cache"] == "MISS"
+    assert res.json()["results"][0]["stock_quantity"] == 4
+
+
+@pytest.mark.django_db
+def test_farm_rename_changes_product_etags(api_client, product):
+    list_url, detail_url = reverse("product-list"), reverse("product-detail", args=[product.pk])
+    list_etag, detail_etag = api_client.get(list_url)["ETag"], api_client.get(detail_url)["ETag"]
+
+    product.farm.name = "Renamed farm"
+    product.farm.save()
+
+    res = api_client.get(list_url, HTTP_IF_NONE_MATCH=list_etag)
+    assert res.status_code == 200
+    assert res.json()["results"][0]["farm_name"] == "Renamed farm"
+    assert api_client.get(detail_url, HTTP_IF_NONE_MATCH=detail_etag).status_code == 200
+
+
+@pytest.mark.django_db
+def test_owner_change_changes_farm_list_etag(api_client, product):
+    url = reverse("farm-list")
+    etag = api_client.get(url)["ETag"]
+
+    owner = product.farm.owner
+    owner.first_name = "Noura"
+    owner.save()
+
+    res = api_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert res.status_code == 200
+    assert res.json()["results"][0]["owner_name"].startswith("Noura")
+
+
+@pytest.mark.django_db
+def test_detail_skips_serializer_when_not_modified(api_client, product, monkeypatch):
+    url = reverse("product-detail", args=[product.pk])
+    etag = api_client.get(url)["ETag"]
+
+    def fail(*args, **kwargs):
+        raise AssertionError("serializer should not run")
+
+    monkeypatch.setattr("core.views.ProductViewSet.get_serializer", fail)
+    res = api_client.get(url, HTTP_IF_NONE_MATCH=f'W/{etag}, "other"')
+
+    assert res.status_code == 304
+
+
+@pytest.mark.django_db
+def test_profile_etag_is_private(api_client, user):
+    api_client.force_authenticate(user)
+    url = reverse("profile")
+    first = api_client.get(url)
+
+    assert first["Cache-Control"] == "private, no-cache"
+    assert api_client.get(url, HTTP_IF_NONE_MATCH=first["ETag"]).status_code == 304
+
+    api_client.put(url, {"first_name": "Sara"}, format="json")
+    assert api_client.get(url, HTTP_IF_NONE_MATCH=first["ETag"]).status_code == 200
@@ -0,0 +1,87 @@
+import hashlib
+from io import BytesIO
+
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import RequestFactory
+from model_bakery import baker
+from PIL import Image
+
+from core.models import Farm, Product
+from core.views import serve_media
+
+
+@pytest.fixture(autouse=True)
+def media(settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path
+    return tmp_path
+
+
+def _jpeg(color=(180, 120, 40)):
+    buffer = BytesIO()
+    Image.new("RGB", (40, 30), color).save(buffer, "JPEG")
+    return buffer.getvalue()
+
+
+@pytest.mark.django_db
+def test_identical_uploads_are_stored_once(media):
+    data = _jpeg()
+    first = baker.make(Product, image=SimpleUploadedFile("potato.jpeg", data))
+    second = baker.make(Product, image=SimpleUploadedFile("Potato.JPEG", data))
+    other = baker.make(Product, image=SimpleUploadedFile("potato.jpeg", _jpeg((10, 10, 10))))
+
+    digest = hashlib.sha256(data).hexdigest()[:32]
+    assert first.image.name == second.image.name == f"products/{digest}.jpeg"
+    assert other.image.name != first.image.name
+    assert sorted(path.name for path in (media / "products").iterdir()) == sorted(
+        {first.image.name[9:], other.image.name[9:]}
+    )
+
+
+@pytest.mark.django_db
+def test_content_addressed_media_is_cached_forever(media):
+    product = baker.make(Product, image=SimpleUploadedFile("potato.jpeg", _jpeg()))
+    (media / "products" / "legacy.jpeg").write_bytes(_jpeg())
+
+    request = RequestFactory().get("/")
+    hashed = serve_media(request, product.image.name, document_root=media)
+    legacy = serve_media(request, "products/legacy.jpeg", document_root=media)
+
+    assert hashed["Cache-Control"] == "public, max-age=31536000, immutable"
+    assert "Cache-Control" not in legacy
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("dry_run", [False, True])
+def test_dedupe_media_command(media, dry_run):
+    data = _jpeg()
+    (media / "products").mkdir()
+    for name in ("potato.jpeg", "potato_3y96g4N.jpeg", "potato_auW2gn8.jpeg"):
+        (media / "products" / name).write_bytes(data)
+    (media / "products" / "dates.jpeg").write_bytes(_jpeg((90, 40, 10)))
+    first = baker.make(Product, image="products/potato.jpeg")
+    second = baker.make(Product, image="products/potato_3y96g4N.jpeg")
+    dates = baker.make(Product, image="products/dates.jpeg")
+    farm = baker.make(Farm, image="")
+    Product.objects.filter(pk=first.pk).update(image_derivatives={"source": "products/potato.jpeg"})
+
+    args = ["--dry-run"] if dry_run else []
+    call_command("dedupe_media", *args)
+
+    for row in (first, second, dates, farm):
+        row.refresh_from_db()
+    if dry_run:
+        assert first.image.name == "products/potato.jpeg"
+        assert len(list((media / "products").iterdir())) == 4
+        return
+
+    hashed = f"products/{hashlib.sha256(data).hexdigest()[:32]}.jpeg"
+    assert first.image.name == second.image.name == hashed
+    assert first.image_derivatives == {"source": hashed}
+    assert dates.image.name.startswith("products/") and dates.image.name != hashed
+    assert farm.image.name == ""
+    # One file per distinct image; the unreferenced duplicate went too
+    assert sorted(path.name for path in (media / "products").iterdir()) == sorted(
+        [hashed[9:], dates.image.name[9:]]
+    )
@@ -0,0 +1,75 @@
+import pytest
+from decimal import Decimal
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from model_bakery import baker
+
+from core.models import Farm, Product
+
+
+@pytest.fixture
+def catalog(db):
+    owner = baker.make("core.User")
+    hail = Farm.objects.create(owner=owner, name="Hail dates", location="https://example.com",
+                               type="تمور", administrative_region="حائل", governorate="حائل")
+    qassim = Farm.objects.create(owner=owner, name="Qassim dates", location="https://example.com",
+                                 type="تمور", administrative_region="القصيم", governorate="بريدة")
+    dairy = Farm.objects.create(owner=owner, name="Dairy", location="https://example.com",
+                                type="ألبان", administrative_region="القصيم", governorate="عنيزة")
+    Product.objects.create(farm=hail, name="Sukkari", price=Decimal("30.00"), stock_quantity=5)
+    Product.objects.create(farm=qassim, name="Khlas", price=Decimal("20.00"), stock_quantity=0)
+    Product.objects.create(farm=dairy, name="Milk", price=Decimal("8.00"), stock_quantity=10)
+    Product.objects.create(farm=dairy, name="Cheese", price=Decimal("120.00"), stock_quantity=1)
+    return hail, qassim, dairy
+
+
+def _counts(facet):
+    return {entry["value"]: entry["count"] for entry in facet}
+
+
+@pytest.mark.django_db
+def test_farm_facets_filter_and_count(api_client, catalog):
+    res = api_client.get(reverse("farm-list"), {"administrative_region": "القصيم"})
+
+    data = res.json()
+    assert {farm["name"] for farm in data["results"]} == {"Qassim dates", "Dairy"}
+    # A facet's counts ignore its own filter but respect the others
+    assert _counts(data["facets"]["administrative_region"]) == {"القصيم": 2, "حائل": 1}
+    assert _counts(data["facets"]["type"]) == {"تمور": 1, "ألبان": 1}
+    assert _counts(data["facets"]["governorate"]) == {"بريدة": 1, "عنيزة": 1}
+
+
+@pytest.mark.django_db
+def test_product_facets_price_and_stock(api_client, catalog):
+    url = reverse("product-list")
+    data = api_client.get(url, {"type": "تمور", "in_stock": "true"}).json()
+
+    assert [product["name"] for product in data["results"]] == ["Sukkari"]
+    assert _counts(data["facets"]["in_stock"]) == {True: 1, False: 1}
+    assert _counts(data["facets"]["type"]) == {"تمور": 1, "ألبان": 2}
+    assert [bucket["count"] for bucket in data["facets"]["price"]] == [0, 0, 1, 0, 0]
+
+    data = api_client.get(url, {"min_price": "10", "max_price": "100"}).json()
+    assert {product["name"] for product in data["results"]} == {"Sukkari", "Khlas"}
+    assert data["facets"]["price"][0] == {"min": None, "max": "10", "count": 1}
+    assert data["facets"]["price"][-1] == {"min": "100", "max": None, "count": 1}
+    assert _counts(data["facets"]["type"]) == {"تمور": 2}
+
+
+@pytest.mark.django_db
+def test_facet_counts_take_one_query(api_client, catalog):
+    with CaptureQueriesContext(connection) as ctx:
+        res = api_client.get(reverse("farm-list"), {"type": "تمور", "governorate": "حائل"})
+
+    assert res.status_code == 200
+    group_queries = [q["sql"] for q in ctx.captured_queries if "GROUP BY" in q["sql"]]
+    assert len(group_queries) == 1
+
+
+@pytest.mark.django_db
+def test_bad_price_is_rejected(api_client, catalog):
+    res = api_client.get(reverse("product-list"), {"min_price": "cheap"})
+
+    assert res.status_code == 400
+    assert "min_price" in res.json()
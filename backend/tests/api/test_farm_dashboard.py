@@ -0,0 +1,86 @@
+import pytest
+from datetime import timedelta
+from decimal import Decimal
+from django.core.cache import caches
+from django.urls import reverse
+from django.utils import timezone
+from model_bakery import baker
+
+from core.models import Farm, Order, Product
+
+
+@pytest.fixture
+def farm(user, settings):
+    caches[settings.DASHBOARD_CACHE_ALIAS].clear()
+    return Farm.objects.create(owner=user, name="Farm", location="https://example.com", daily_capacity=5)
+
+
+def _order(farm, status="pending", total="10.00", days_ago=0):
+    order = Order.objects.create(
+        consumer=baker.make("core.User"), farm=farm, status=status, total_amount=Decimal(total)
+    )
+    if days_ago:
+        Order.objects.filter(pk=order.pk).update(created_at=timezone.now() - timedelta(days=days_ago))
+    return order
+
+
+def _dashboard(client, farm):
+    return client.get(reverse("farm-dashboard", args=[farm.id]))
+
+
+@pytest.mark.django_db
+def test_dashboard_aggregates_orders(auth_client, farm):
+    _order(farm, "pending", "10.00")
+    _order(farm, "ready", "20.00")
+    _order(farm, "cancelled", "99.00")
+    _order(farm, "completed", "5.00", days_ago=40)
+
+    data = _dashboard(auth_client, farm).json()
+
+    assert data["status_counts"]["pending"] == 1
+    assert data["status_counts"]["completed"] == 1
+    assert data["today_status_counts"]["completed"] == 0
+    assert data["revenue"]["today"] == "30.00"
+    assert Decimal(data["revenue"]["month"]) == Decimal("30.00")
+    assert data["load"]["capacity"] == 5
+
+
+@pytest.mark.django_db
+def test_dashboard_counts_checkout_load(auth_client, farm):
+    product = Product.objects.create(farm=farm, name="Milk", price=Decimal("10.00"), stock_quantity=10)
+    auth_client.post(
+        reverse("order-list"),
+        {"items": [{"product": product.id, "quantity": 2, "price": "10.00"}]},
+        format="json",
+    )
+
+    load = _dashboard(auth_client, farm).json()["load"]
+
+    assert load == {"unit": "orders", "used": 1, "capacity": 5, "remaining": 4}
+
+
+@pytest.mark.django_db
+def test_dashboard_is_cached_until_an_order_changes(
+    auth_client, farm, django_assert_num_queries, django_capture_on_commit_callbacks
+):
+    order = _order(farm)
+    _dashboard(auth_client, farm)
+
+    # Only the farm lookup, authentication and the cache read remain on a cache hit
+    with django_assert_num_queries(3):
+        assert _dashboard(auth_client, farm).json()["status_counts"]["pending"] == 1
+
+    with django_capture_on_commit_callbacks(execute=True):
+        order.status = "confirmed"
+        order.save()
+
+    data = _dashboard(auth_client, farm).json()
+    assert data["status_counts"]["pending"] == 0
+    assert data["status_counts"]["confirmed"] == 1
+
+
+@pytest.mark.django_db
+def test_dashboard_is_owner_only(auth_client):
+    other_farm = Farm.objects.create(owner=baker.make("core.User"), name="Other", location="https://example.com")
+
+    assert _dashboard(auth_client, other_farm).status_code == 403
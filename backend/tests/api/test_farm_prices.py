@@ -0,0 +1,33 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from model_bakery import baker
+
+from core.models import Farm
+
+
+@pytest.fixture
+def farms(db):
+    owner = baker.make("core.User")
+    for name, price in [("Dates", "٧٨ ريال/كجم"), ("Milk", "٩ ريال/كجم"), ("Honey", "١٠٠ ريال/كجم"), ("Ask", "حسب الطلب")]:
+        Farm.objects.create(owner=owner, name=name, location="https://example.com", price_per_kg=price)
+
+
+@pytest.mark.django_db
+def test_farms_order_by_numeric_price(api_client, farms):
+    res = api_client.get(reverse("farm-list"), {"ordering": "-price", "min_price": "1"})
+
+    assert [farm["name"] for farm in res.json()["results"]] == ["Honey", "Dates", "Milk"]
+    assert res.json()["results"][0]["price"] == "100.00"
+
+
+@pytest.mark.django_db
+def test_price_range_runs_in_sql(api_client, farms):
+    with CaptureQueriesContext(connection) as ctx:
+        res = api_client.get(reverse("farm-list"), {"min_price": "10", "max_price": "80"})
+
+    assert [farm["name"] for farm in res.json()["results"]] == ["Dates"]
+    page_query = next(q["sql"] for q in ctx.captured_queries if "LIMIT" in q["sql"])
+    assert '"farms"."price" >=' in page_query
+    assert [bucket["count"] for bucket in res.json()["facets"]["price"]] == [1, 0, 0, 1, 1]
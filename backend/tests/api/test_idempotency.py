@@ -0,0 +1,138 @@
+import pytest
+from datetime import timedelta
+from decimal import Decimal
+from django.urls import reverse
+from django.utils import timezone
+from model_bakery import baker
+
+from core import views
+from core.idempotency import idempotent
+from core.models import Farm, IdempotencyKey, Order, Product
+from core.throttling import OrderCreateRateThrottle
+
+
+@pytest.fixture
+def cart(db):
+    owner = baker.make("core.User")
+    farm = Farm.objects.create(owner=owner, name="Farm", location="https://example.com")
+    product = Product.objects.create(farm=farm, name="Milk", price=Decimal("10.00"), stock_quantity=10)
+    return {"items": [{"product": product.id, "quantity": 1, "price": "10.00"}]}
+
+
+@pytest.mark.django_db
+def test_retried_order_is_replayed_not_recreated(auth_client, cart):
+    url = reverse("order-list")
+
+    first = auth_client.post(url, cart, format="json", HTTP_IDEMPOTENCY_KEY="checkout-1")
+    retry = auth_client.post(url, cart, format="json", HTTP_IDEMPOTENCY_KEY="checkout-1")
+
+    assert first.status_code == retry.status_code == 201
+    assert retry.json() == first.json()
+    assert retry["Idempotent-Replayed"] == "true"
+    assert Order.objects.count() == 1
+
+
+@pytest.mark.django_db
+def test_key_reused_with_different_payload_is_rejected(auth_client, cart):
+    url = reverse("order-list")
+    auth_client.post(url, cart, format="json", HTTP_IDEMPOTENCY_KEY="checkout-1")
+    cart["items"][0]["quantity"] = 2
+
+    res = auth_client.post(url, cart, format="json", HTTP_IDEMPOTENCY_KEY="checkout-1")
+
+    assert res.status_code == 422
+    assert Order.objects.count() == 1
+
+
+@pytest.mark.django_db
+def test_failed_request_releases_key(auth_client, cart):
+    url = reverse("order-list")
+    bad_cart = {"items": [{"product": 999999, "quantity": 1, "price": "10.00"}]}
+
+    assert auth_client.post(url, bad_cart, format="json", HTTP_IDEMPOTENCY_KEY="checkout-1").status_code == 400
+    assert not IdempotencyKey.objects.exists()
+    assert auth_client.post(url, cart, format="json", HTTP_IDEMPOTENCY_KEY="checkout-1").status_code == 201
+
+
+@pytest.mark.django_db
+def test_duplicate_of_running_request_gets_conflict(auth_client, cart, user, settings):
+    settings.IDEMPOTENCY_WAIT_TIMEOUT = 0
+    url = reverse("order-list")
+    first = auth_client.post(url, cart, format="json", HTTP_IDEMPOTENCY_KEY="checkout-1")
+    IdempotencyKey.objects.update(status="in_progress")
+
+    res = auth_client.post(url, cart, format="json", HTTP_IDEMPOTENCY_KEY="checkout-1")
+
+    assert first.status_code == 201
+    assert res.status_code == 409
+    assert Order.objects.count() == 1
+
+
+@pytest.mark.django_db
+def test_expired_key_runs_again(auth_client, cart):
+    url = reverse("order-list")
+    auth_client.post(url, cart, format="json", HTTP_IDEMPOTENCY_KEY="checkout-1")
+    IdempotencyKey.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+
+    res = auth_client.post(url, cart, format="json", HTTP_IDEMPOTENCY_KEY="checkout-1")
+
+    assert res.status_code == 201
+    assert "Idempotent-Replayed" not in res
+    assert Order.objects.count() == 2
+
+
+@pytest.mark.django_db
+def test_abandoned_key_is_taken_over_after_its_lease(auth_client, cart, settings):
+    settings.IDEMPOTENCY_WAIT_TIMEOUT = 0
+    url = reverse("order-list")
+    auth_client.post(url, cart, format="json", HTTP_IDEMPOTENCY_KEY="checkout-1")
+    # As left by a worker killed mid-request
+    IdempotencyKey.objects.update(status="in_progress", response_status=None, response_body=None)
+
+    lease = timedelta(seconds=settings.IDEMPOTENCY_LEASE_TIMEOUT)
+
+    IdempotencyKey.objects.update(locked_at=timezone.now() - lease + timedelta(seconds=5))
+    assert auth_client.post(url, cart, format="json", HTTP_IDEMPOTENCY_KEY="checkout-1").status_code == 409
+
+    IdempotencyKey.objects.update(locked_at=timezone.now() - lease - timedelta(seconds=5))
+    res = auth_client.post(url, cart, format="json", HTTP_IDEMPOTENCY_KEY="checkout-1")
+
+    assert res.status_code == 201
+    assert "Idempotent-Replayed" not in res
+    assert Order.objects.count() == 2
+    record = IdempotencyKey.objects.get()
+    assert (record.status, record.response_status) == ("completed", 201)
+
+
+@pytest.mark.django_db
+def test_request_that_lost_its_lease_does_not_overwrite_the_key(auth_client, cart, monkeypatch):
+    url = reverse("order-list")
+    create = views.OrderViewSet.create.__wrapped__
+
+    def create_then_lose_the_lease(self, request, *args, **kwargs):
+        response = create(self, request, *args, **kwargs)
+        IdempotencyKey.objects.update(locked_at=timezone.now() + timedelta(seconds=1))
+        return response
+
+    monkeypatch.setattr(views.OrderViewSet, "create", idempotent(create_then_lose_the_lease))
+
+    assert auth_client.post(url, cart, format="json", HTTP_IDEMPOTENCY_KEY="checkout-1").status_code == 201
+    assert IdempotencyKey.objects.get().status == "in_progress"
+
+
+@pytest.mark.django_db
+def test_rate_limit_does_not_refuse_a_replayable_retry(auth_client, cart, monkeypatch):
+    monkeypatch.setattr(OrderCreateRateThrottle, "rate", "2/min", raising=False)
+    url = reverse("order-list")
+    first = auth_client.post(url, cart, format="json", HTTP_IDEMPOTENCY_KEY="checkout-1")
+    assert auth_client.post(url, cart, format="json").status_code == 201
+    assert auth_client.post(url, cart, format="json").status_code == 429
+
+    retry = auth_client.post(url, cart, format="json", HTTP_IDEMPOTENCY_KEY="checkout-1")
+
+    assert retry.status_code == 201
+    assert retry.json() == first.json()
+    assert retry["Idempotent-Replayed"] == "true"
+    # A new key is still limited
+    assert auth_client.post(url, cart, format="json", HTTP_IDEMPOTENCY_KEY="checkout-2").status_code == 429
+    assert Order.objects.count() == 2
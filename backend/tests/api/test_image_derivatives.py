@@ -0,0 +1,129 @@
+import re
+from io import BytesIO
+
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.urls import reverse
+from model_bakery import baker
+from PIL import Image
+
+from core.models import ImageDerivativeJob, Product
+from core.services.image_derivatives import drain
+
+
+@pytest.fixture(autouse=True)
+def media(settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path
+    settings.IMAGE_DERIVATIVE_WIDTHS = [160, 320, 640]
+    return tmp_path
+
+
+def _photo(name="potato.jpeg", size=(500, 300), color=(180, 120, 40)):
+    buffer = BytesIO()
+    Image.new("RGB", size, color).save(buffer, "JPEG")
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type="image/jpeg")
+
+
+@pytest.fixture
+def product(db, django_capture_on_commit_callbacks):
+    with django_capture_on_commit_callbacks(execute=True):
+        return baker.make(Product, name="Potato", image=_photo())
+
+
+@pytest.mark.django_db
+def test_upload_queues_a_job_and_workers_write_the_copies(api_client, product, media):
+    job = ImageDerivativeJob.objects.get()
+    assert (job.model_name, job.object_id, job.source) == ("product", product.id, product.image.name)
+    # Nothing is resized on the request path
+    assert api_client.get(reverse("product-detail", args=[product.id])).json()["image_srcset"] is None
+
+    assert drain() == 1
+
+    product.refresh_from_db()
+    assert sorted(product.image_derivatives["webp"]) == ["160", "320"]  # Never wider than the original
+    with Image.open(media / product.image_derivatives["webp"]["320"]) as copy:
+        assert (copy.format, copy.size) == ("WEBP", (320, 192))
+    srcset = api_client.get(reverse("product-detail", args=[product.id])).json()["image_srcset"]
+    assert re.fullmatch(
+        r"http://testserver/media/derivatives/products/[0-9a-f]{32}\.webp 160w, "
+        r"http://testserver/media/derivatives/products/[0-9a-f]{32}\.webp 320w",
+        srcset["webp"]
+    )
+    assert srcset["jpeg"].endswith(f"{product.image_derivatives['jpeg']['320']} 320w")
+    assert ImageDerivativeJob.objects.get().status == "done"
+
+
+@pytest.mark.django_db
+def test_new_image_drops_the_old_copies(product, media, django_capture_on_commit_callbacks):
+    drain()
+    product.refresh_from_db()
+    old_copy = media / product.image_derivatives["jpeg"]["160"]
+
+    with django_capture_on_commit_callbacks(execute=True):
+        product.image = _photo("carrot.jpeg", color=(230, 100, 20))
+        product.save()
+
+    product.refresh_from_db()
+    assert product.image_derivatives == {}
+    assert not old_copy.exists()
+    assert ImageDerivativeJob.objects.filter(status="queued", source=product.image.name).exists()
+
+
+@pytest.mark.django_db
+def test_saves_that_keep_the_image_queue_nothing(product, django_capture_on_commit_callbacks):
+    drain()
+    with django_capture_on_commit_callbacks(execute=True):
+        product.name = "Sweet potato"
+        product.save()
+
+    product.refresh_from_db()
+    assert product.image_derivatives["source"] == product.image.name
+    assert ImageDerivativeJob.objects.count() == 1
+
+
+@pytest.mark.django_db
+def test_stale_and_unreadable_jobs(product, media):
+    ImageDerivativeJob.objects.create(model_name="product", object_id=product.id, source="products/old.jpeg")
+    (media / "products" / "broken.jpeg").write_bytes(b"not an image")
+    Product.objects.filter(pk=product.pk).update(image="products/broken.jpeg")
+    ImageDerivativeJob.objects.create(model_name="product", object_id=product.id, source="products/broken.jpeg")
+
+    drain()
+
+    statuses = dict(ImageDerivativeJob.objects.values_list("source", "status"))
+    assert statuses["products/old.jpeg"] == "done"
+    assert statuses["products/broken.jpeg"] == "failed"
+    product.refresh_from_db()
+    assert product.image_derivatives == {}
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("workers", [1, 2])
+def test_backfill_command(product, workers):
+    ImageDerivativeJob.objects.all().delete()
+    baker.make(Product, image="")
+
+    call_command("backfill_image_derivatives", "--workers", str(workers), "--model", "product")
+
+    product.refresh_from_db()
+    assert product.image_derivatives["source"] == product.image.name
+    assert sorted(product.image_derivatives["jpeg"]) == ["160", "320"]
+
+
+@pytest.mark.django_db
+def test_rows_sharing_an_image_share_its_copies(product, media, django_capture_on_commit_callbacks):
+    drain()
+    product.refresh_from_db()
+    with django_capture_on_commit_callbacks(execute=True):
+        twin = baker.make(Product, name="Potato again", image=_photo("potato.jpeg"))
+
+    assert twin.image.name == product.image.name
+    drain()
+    twin.refresh_from_db()
+    assert twin.image_derivatives == product.image_derivatives
+
+    # Still in use by the twin, so the copies stay
+    with django_capture_on_commit_callbacks(execute=True):
+        product.delete()
+    assert (media / twin.image_derivatives["webp"]["160"]).exists()
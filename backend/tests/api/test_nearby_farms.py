@@ -0,0 +1,72 @@
+import pytest
+from django.urls import reverse
+from model_bakery import baker
+
+from core.models import Farm
+
+# Al-Ahsa, Hofuf, Riyadh and Jeddah
+PLACES = {
+    "Ahsa": "25.3718,49.54812",
+    "Hofuf": "25.40212,49.53653",
+    "Riyadh": "24.73519,46.69847",
+    "Jeddah": "21.5128,39.15877",
+}
+
+
+@pytest.fixture
+def farms(db):
+    owner = baker.make("core.User")
+    for name, point in PLACES.items():
+        Farm.objects.create(owner=owner, name=name, location=f"https://www.google.com/maps?q={point}")
+    Farm.objects.create(owner=owner, name="Unknown", location="https://example.com")
+
+
+@pytest.mark.django_db
+def test_near_returns_closest_farms_first(api_client, farms):
+    res = api_client.get(reverse("farm-list"), {"near": "25.38,49.55", "radius": "10"})
+
+    assert res.status_code == 200
+    results = res.json()["results"]
+    assert [farm["name"] for farm in results] == ["Ahsa", "Hofuf"]
+    assert results[0]["distance"] < results[1]["distance"] < 10
+
+
+@pytest.mark.django_db
+def test_wide_radius_ranks_by_distance(api_client, farms):
+    res = api_client.get(reverse("farm-list"), {"near": "24.7,46.7", "radius": "1000", "fields": "id,name,distance"})
+
+    names = [farm["name"] for farm in res.json()["results"]]
+    assert names == ["Riyadh", "Hofuf", "Ahsa", "Jeddah"]
+
+
+@pytest.mark.django_db
+def test_distance_only_on_near_searches(api_client, farms):
+    farm = api_client.get(reverse("farm-list")).json()["results"][0]
+
+    assert "distance" not in farm
+    assert "latitude" in farm
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("params, field", [
+    ({"near": "north"}, "near"),
+    ({"near": "25,49", "radius": "0"}, "radius"),
+    ({"near": "25,49", "radius": "far"}, "radius"),
+])
+def test_bad_near_params_are_rejected(api_client, farms, params, field):
+    res = api_client.get(reverse("farm-list"), params)
+
+    assert res.status_code == 400
+    assert field in res.json()
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("params", [{"pagination": "cursor"}, {"cursor": "eyJwIjogWzFdfQ=="}])
+def test_near_refuses_cursor_pagination(api_client, farms, params):
+    res = api_client.get(reverse("farm-list"), {"near": "25.38,49.55", **params})
+
+    assert res.status_code == 400
+    assert "near" in res.json()["pagination"]
+    # Page numbers keep the distance ranking
+    paged = api_client.get(reverse("farm-list"), {"near": "25.38,49.55", "radius": "10", "page": "1"})
+    assert [farm["name"] for farm in paged.json()["results"]] == ["Ahsa", "Hofuf"]
@@ -0,0 +1,77 @@
+import pytest
+from datetime import timedelta
+from decimal import Decimal
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+from model_bakery import baker
+
+from core.models import ArchivedOrder, Farm, Order, OrderItem, Payment, Product
+
+
+@pytest.fixture
+def orders(user):
+    farm = Farm.objects.create(owner=baker.make("core.User"), name="Farm", location="https://example.com")
+    product = Product.objects.create(farm=farm, name="Milk", price=Decimal("10.00"), stock_quantity=10)
+    created = {}
+    for name, status, age, tracking_number in (
+        ("old", "completed", 400, "MK-OLD00001"),
+        ("old_open", "pending", 400, "MK-OPEN0001"),
+        ("recent", "completed", 1, "MK-RECENT01"),
+    ):
+        order = Order.objects.create(
+            consumer=user, farm=farm, status=status, total_amount=Decimal("20.00"), tracking_number=tracking_number
+        )
+        OrderItem.objects.create(order=order, product=product, quantity=2, price=Decimal("10.00"))
+        Order.objects.filter(pk=order.pk).update(updated_at=timezone.now() - timedelta(days=age))
+        created[name] = order
+    Payment.objects.create(
+        order=created["old"], amount=Decimal("20.00"), status="paid", moyasar_payment_id="pay_123",
+        moyasar_response={"id": "pay_123", "source": {"type": "mada", "company": "mada"}}
+    )
+    return created
+
+
+@pytest.mark.django_db
+def test_only_long_closed_orders_are_archived(orders):
+    call_command("archive_orders", "--batch-size", "1")
+
+    archived = ArchivedOrder.objects.get()
+    assert archived.id == orders["old"].id
+    assert archived.data["items"][0]["product_name"] == "Milk"
+    assert archived.data["payment"]["status"] == "paid"
+    assert "moyasar_response" not in archived.data["payment"]
+    assert archived.payment_record["moyasar_payment_id"] == "pay_123"
+    assert archived.payment_record["moyasar_response"]["source"]["type"] == "mada"
+    assert archived.payment_record["amount"] == "20.00"
+    assert not Order.objects.filter(pk=orders["old"].pk).exists()
+    assert not Payment.objects.exists()
+    assert Order.objects.count() == 2
+
+
+@pytest.mark.django_db
+def test_dry_run_moves_nothing(orders):
+    call_command("archive_orders", "--dry-run")
+
+    assert not ArchivedOrder.objects.exists()
+
+
+@pytest.mark.django_db
+def test_archived_order_is_still_traceable(api_client, orders):
+    call_command("archive_orders")
+
+    res = api_client.get(reverse("order-trace"), {"tracking_number": orders["old"].tracking_number})
+
+    assert res.status_code == 200
+    assert res.json()["status"] == "completed"
+    assert res.json()["items"][0]["quantity"] == 2
+
+
+@pytest.mark.django_db
+def test_history_lists_archived_orders(auth_client, orders):
+    call_command("archive_orders")
+
+    res = auth_client.get(reverse("order-history"))
+
+    assert [order["id"] for order in res.json()["results"]] == [orders["old"].id]
+    assert orders["old"].id not in [order["id"] for order in auth_client.get(reverse("order-list")).json()["results"]]
@@ -0,0 +1,95 @@
+import csv
+import io
+import zipfile
+from datetime import timedelta
+from decimal import Decimal
+
+import pytest
+from django.urls import reverse
+from django.utils import timezone
+from model_bakery import baker
+
+from core.models import Farm, Order, OrderItem, Product
+
+
+@pytest.fixture
+def farm_orders(user):
+    farm = Farm.objects.create(owner=user, name="مزرعة", location="https://example.com")
+    product = Product.objects.create(farm=farm, name="حليب", price=Decimal("10.00"), stock_quantity=10)
+    consumer = baker.make("core.User")
+    orders = []
+    for days_ago, status in ((0, "pending"), (3, "completed"), (40, "completed")):
+        order = Order.objects.create(consumer=consumer, farm=farm, status=status, total_amount=Decimal("20.00"))
+        OrderItem.objects.create(order=order, product=product, quantity=2, price=Decimal("10.00"))
+        Order.objects.filter(pk=order.pk).update(created_at=timezone.now() - timedelta(days=days_ago))
+        orders.append(order)
+
+    other_farm = Farm.objects.create(owner=consumer, name="Other", location="https://example.com")
+    Order.objects.create(consumer=user, farm=other_farm, total_amount=Decimal("5.00"))
+    return orders
+
+
+def _csv_rows(response):
+    body = b"".join(response.streaming_content).decode("utf-8-sig")
+    return list(csv.reader(io.StringIO(body)))
+
+
+@pytest.mark.django_db
+def test_csv_export_streams_farm_order_lines(auth_client, farm_orders):
+    res = auth_client.get(reverse("order-export"))
+
+    assert res.status_code == 200
+    assert res.streaming
+    rows = _csv_rows(res)
+    assert rows[0][0] == "Tracking number"
+    assert len(rows) == 4
+    assert rows[1][2] == "completed"
+    assert rows[-1][10] == "حليب"
+
+
+@pytest.mark.django_db
+def test_export_filters_by_date_range_and_status(auth_client, farm_orders):
+    since = (timezone.localdate() - timedelta(days=7)).isoformat()
+
+    rows = _csv_rows(auth_client.get(reverse("order-export"), {"from": since, "status": "completed"}))
+
+    assert len(rows) == 2
+    assert rows[1][2] == "completed"
+
+
+@pytest.mark.django_db
+def test_xlsx_export_is_a_readable_workbook(auth_client, farm_orders):
+    res = auth_client.get(reverse("order-export"), {"file_format": "xlsx"})
+
+    workbook = zipfile.ZipFile(io.BytesIO(b"".join(res.streaming_content)))
+    sheet = workbook.read("xl/worksheets/sheet1.xml").decode()
+    assert "xl/workbook.xml" in workbook.namelist()
+    assert sheet.count("<row>") == 4
+    assert "حليب" in sheet
+
+
+@pytest.mark.django_db
+def test_export_rejects_invalid_dates(auth_client, farm_orders):
+    res = auth_client.get(reverse("order-export"), {"from": "yesterday"})
+
+    assert res.status_code == 400
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("file_format", ["csv", "xlsx"])
+def test_export_defuses_formula_cells(auth_client, farm_orders, file_format):
+    Order.objects.filter(pk=farm_orders[0].pk).update(
+        delivery_name='=HYPERLINK("http://evil.example","x")', delivery_phone="+966500000000",
+        delivery_address="\tcmd", delivery_city="-2+3"
+    )
+
+    res = auth_client.get(reverse("order-export"), {"file_format": file_format})
+
+    if file_format == "csv":
+        row = _csv_rows(res)[-1]
+        assert row[5:10] == ['\'=HYPERLINK("http://evil.example","x")', "'+966500000000", "'-2+3", "", "'\tcmd"]
+        assert row[11:] == ["2", "10.00", "20.00"]
+    else:
+        sheet = zipfile.ZipFile(io.BytesIO(b"".join(res.streaming_content))).read("xl/worksheets/sheet1.xml").decode()
+        assert "'=HYPERLINK(" in sheet and "'+966500000000" in sheet
+        assert ">=HYPERLINK(" not in sheet
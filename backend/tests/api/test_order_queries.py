@@ -0,0 +1,56 @@
+import pytest
+from decimal import Decimal
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from model_bakery import baker
+
+from core.models import Farm, Order, OrderItem, Payment, Product
+
+
+def _make_orders(consumer, farm, count):
+    product = Product.objects.create(farm=farm, name="Milk", price=Decimal("10.00"))
+    for _ in range(count):
+        order = Order.objects.create(consumer=consumer, farm=farm, total_amount=Decimal("20.00"))
+        OrderItem.objects.create(order=order, product=product, quantity=2, price=Decimal("10.00"))
+        OrderItem.objects.create(order=order, product=product, quantity=1, price=Decimal("10.00"))
+        Payment.objects.create(order=order, amount=Decimal("35.00"))
+
+
+def _list_queries(client):
+    with CaptureQueriesContext(connection) as ctx:
+        res = client.get(reverse("order-list"))
+    assert res.status_code == 200
+    return len(ctx.captured_queries), res.json()
+
+
+@pytest.mark.django_db
+def test_order_list_query_count_is_constant(auth_client, user):
+    farm = Farm.objects.create(owner=baker.make("core.User"), name="Farm", location="https://example.com")
+
+    _make_orders(user, farm, 1)
+    one_order_queries, _ = _list_queries(auth_client)
+
+    _make_orders(user, farm, 9)
+    ten_order_queries, data = _list_queries(auth_client)
+
+    assert data["count"] == 10
+    assert data["results"][0]["payment"]["order_id"] == data["results"][0]["id"]
+    assert data["results"][0]["items"][0]["product_name"] == "Milk"
+    assert ten_order_queries == one_order_queries
+
+
+@pytest.mark.django_db
+def test_farmer_sees_orders_for_own_farms(auth_client, user):
+    user.is_farmer = True
+    user.save()
+    own_farm = Farm.objects.create(owner=user, name="Own", location="https://example.com")
+    other_farm = Farm.objects.create(owner=baker.make("core.User"), name="Other", location="https://example.com")
+    stranger = baker.make("core.User")
+    _make_orders(stranger, own_farm, 2)
+    _make_orders(stranger, other_farm, 3)
+    _make_orders(user, other_farm, 1)
+
+    _, data = _list_queries(auth_client)
+
+    assert data["count"] == 3
@@ -0,0 +1,110 @@
+import threading
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.models import RateLimitCounter
+from core.throttling import OrderCreateRateThrottle, SlidingWindowRateThrottle
+
+
+class FakeClock:
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def two_per_minute(monkeypatch):
+    monkeypatch.setattr(OrderCreateRateThrottle, "rate", "2/min", raising=False)
+
+
+@pytest.mark.django_db
+def test_order_create_is_rate_limited_before_validation(auth_client, two_per_minute):
+    url = reverse("order-list")
+    for _ in range(2):
+        assert auth_client.post(url, {"items": []}, format="json").status_code == 400
+
+    with CaptureQueriesContext(connection) as ctx:
+        res = auth_client.post(url, {"items": [{"product": 1, "quantity": 1, "price": "1.00"}]}, format="json")
+
+    assert res.status_code == 429
+    assert int(res["Retry-After"]) > 0
+    assert not any("products" in q["sql"] for q in ctx.captured_queries)
+
+
+@pytest.mark.django_db
+def test_order_list_is_not_rate_limited(auth_client, two_per_minute):
+    url = reverse("order-list")
+    for _ in range(5):
+        assert auth_client.get(url).status_code == 200
+
+
+@pytest.mark.django_db
+def test_sliding_window_weights_previous_window(user, monkeypatch):
+    monkeypatch.setattr(SlidingWindowRateThrottle, "scope", "test")
+    monkeypatch.setattr(SlidingWindowRateThrottle, "rate", "4/min", raising=False)
+    clock = FakeClock(600.0)
+    monkeypatch.setattr(SlidingWindowRateThrottle, "timer", clock)
+
+    class Request:
+        pass
+
+    request = Request()
+    request.user = user
+
+    throttle = SlidingWindowRateThrottle()
+    assert all(throttle.allow_request(request, None) for _ in range(4))
+    assert not throttle.allow_request(request, None)
+    assert throttle.wait() == pytest.approx(60.0)
+
+    # Half way into the next window the previous 4 requests weigh as 2
+    clock.now = 690.0
+    assert throttle.allow_request(request, None)
+    assert throttle.allow_request(request, None)
+    assert not throttle.allow_request(request, None)
+
+
+@pytest.mark.django_db(transaction=True)
+def test_concurrent_requests_cannot_overshoot_the_limit(user, monkeypatch):
+    monkeypatch.setattr(SlidingWindowRateThrottle, "scope", "test")
+    monkeypatch.setattr(SlidingWindowRateThrottle, "rate", "5/min", raising=False)
+    monkeypatch.setattr(SlidingWindowRateThrottle, "timer", FakeClock(600.0))
+
+    class Request:
+        pass
+
+    request = Request()
+    request.user = user
+    # Every request has read the counters before any of them counts itself;
+    # SQLite locks whole tables, so from there on they take turns (as row
+    # locks would make them on Postgres)
+    ready, writing = threading.Barrier(12), threading.Lock()
+    take_slot = SlidingWindowRateThrottle._take_slot
+
+    def take_slot_together(self, *args):
+        ready.wait(timeout=5)
+        writing.acquire()
+        return take_slot(self, *args)
+
+    monkeypatch.setattr(SlidingWindowRateThrottle, "_take_slot", take_slot_together)
+    results = []
+
+    def call():
+        try:
+            results.append(SlidingWindowRateThrottle().allow_request(request, None))
+        finally:
+            writing.release()
+            connection.close()
+
+    threads = [threading.Thread(target=call) for _ in range(12)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(results) == [False] * 7 + [True] * 5
+    assert RateLimitCounter.objects.get().count == 5
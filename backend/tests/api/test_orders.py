@@ -1,5 +1,10 @@
 import pytest
+from decimal import Decimal
 from django.urls import reverse
+from model_bakery import baker
+
+from core.models import Farm, Product
+from core.services.daily_load import farm_load, user_load
 
 
 @pytest.mark.django_db
@@ -15,3 +20,44 @@ def test_orders_list_success(auth_client):
     res = auth_client.get(url)
     assert res.status_code == 200
 
+
+def _place_order(client, quantity=4, stock=10):
+    farm = Farm.objects.create(owner=baker.make("core.User"), name="Farm", location="https://example.com")
+    product = Product.objects.create(farm=farm, name="Milk", price=Decimal("10.00"), stock_quantity=stock)
+    res = client.post(
+        reverse("order-list"), {"items": [{"product": product.id, "quantity": quantity, "price": "10.00"}]},
+        format="json"
+    )
+    assert res.status_code == 201
+    return product, reverse("order-detail", args=[res.json()["id"]])
+
+
+@pytest.mark.django_db
+def test_cancelling_an_order_returns_its_stock_once(auth_client):
+    product, url = _place_order(auth_client)
+    product.refresh_from_db()
+    assert product.stock_quantity == 6
+
+    for _ in range(2):
+        assert auth_client.patch(url, {"status": "cancelled"}, format="json").status_code == 200
+
+    product.refresh_from_db()
+    assert product.stock_quantity == 10
+
+
+@pytest.mark.django_db
+def test_cancelled_order_cannot_be_reopened(auth_client, user):
+    product, url = _place_order(auth_client)
+
+    assert auth_client.patch(url, {"status": "cancelled"}, format="json").status_code == 200
+    res = auth_client.patch(url, {"status": "pending"}, format="json")
+    assert res.status_code == 400
+    assert "status" in res.json()
+    assert auth_client.patch(url, {"status": "cancelled"}, format="json").status_code == 200
+
+    product.refresh_from_db()
+    assert product.stock_quantity == 10
+    assert auth_client.get(url).json()["status"] == "cancelled"
+    # Nor can the cycle drive today's load counters negative
+    assert farm_load(product.farm) == (0, 0)
+    assert user_load(user) == (0, 0)
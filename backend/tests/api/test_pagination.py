@@ -0,0 +1,126 @@
+import pytest
+from datetime import timedelta
+from decimal import Decimal
+from django.urls import reverse
+from django.utils import timezone
+from model_bakery import baker
+
+from core.models import Farm, Product
+
+
+@pytest.fixture
+def products(db):
+    owner = baker.make("core.User")
+    farm = Farm.objects.create(owner=owner, name="Farm", location="https://example.com")
+    created = [
+        Product.objects.create(farm=farm, name=f"Product {i}", price=Decimal("10.00"), stock_quantity=1)
+        for i in range(25)
+    ]
+    # Several products share a timestamp so the id tie-breaker is exercised
+    same_time = timezone.now() - timedelta(days=1)
+    Product.objects.filter(pk__in=[p.pk for p in created[5:15]]).update(created_at=same_time)
+    return Product.objects.order_by("-created_at", "-id")
+
+
+def _walk(client, url, params, direction="next"):
+    ids, pages = [], 0
+    data = client.get(url, params).json()
+    while True:
+        ids += [row["id"] for row in data["results"]]
+        pages += 1
+        if not data[direction]:
+            return ids, pages, data
+        data = client.get(data[direction]).json()
+
+
+@pytest.mark.django_db
+def test_page_number_pagination_is_still_the_default(api_client, products):
+    res = api_client.get(reverse("product-list")).json()
+
+    assert res["count"] == 25
+    assert len(res["results"]) == 10
+
+
+@pytest.mark.django_db
+def test_cursor_pages_cover_every_product_once(api_client, products):
+    ids, pages, last = _walk(api_client, reverse("product-list"), {"pagination": "cursor"})
+
+    assert ids == [p.id for p in products]
+    assert pages == 3
+    assert "count" not in last
+
+
+@pytest.mark.django_db
+def test_cursor_previous_links_walk_back(api_client, products):
+    _, _, last = _walk(api_client, reverse("product-list"), {"pagination": "cursor"})
+
+    back = api_client.get(last["previous"]).json()
+    first = api_client.get(back["previous"]).json()
+
+    assert [row["id"] for row in back["results"]] == [p.id for p in products[10:20]]
+    assert [row["id"] for row in first["results"]] == [p.id for p in products[:10]]
+    assert first["previous"] is None
+
+
+@pytest.mark.django_db
+def test_farms_are_paged_by_id(api_client):
+    owner = baker.make("core.User")
+    farms = [Farm.objects.create(owner=owner, name=f"Farm {i}", location="https://example.com") for i in range(12)]
+
+    ids, pages, _ = _walk(api_client, reverse("farm-list"), {"pagination": "cursor"})
+
+    assert ids == [farm.id for farm in reversed(farms)]
+    assert pages == 2
+
+
+@pytest.mark.django_db
+def test_invalid_cursor_is_rejected(api_client, products):
+    res = api_client.get(reverse("product-list"), {"cursor": "not-a-cursor"})
+
+    assert res.status_code == 404
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("ordering", ["price", "-price"])
+def test_cursor_pages_follow_price_ordering(api_client, products, ordering):
+    prices = [Decimal("5.00"), Decimal("12.50"), Decimal("7.25")]
+    for i, product in enumerate(Product.objects.order_by("id")):
+        Product.objects.filter(pk=product.pk).update(price=prices[i % 3])
+    expected = list(Product.objects.order_by(ordering, f"{ordering[:-5]}id").values_list("id", flat=True))
+
+    ids, pages, last = _walk(api_client, reverse("product-list"), {"pagination": "cursor", "ordering": ordering})
+    assert ids == expected
+    assert pages == 3
+
+    back = api_client.get(last["previous"]).json()
+    first = api_client.get(back["previous"]).json()
+    assert [row["id"] for row in back["results"]] == expected[10:20]
+    assert [row["id"] for row in first["results"]] == expected[:10]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("descending", [False, True])
+def test_cursor_pages_put_farms_without_a_price_last(api_client, descending):
+    owner = baker.make("core.User")
+    farms = [Farm.objects.create(owner=owner, name=f"Farm {i}", location="https://example.com") for i in range(14)]
+    for i, farm in enumerate(farms[:9]):
+        Farm.objects.filter(pk=farm.pk).update(price=Decimal(10 + i % 4))
+    priced = sorted(farms[:9], key=lambda farm: (10 + farms.index(farm) % 4, farm.id), reverse=descending)
+    unpriced = sorted(farms[9:], key=lambda farm: farm.id, reverse=descending)
+    expected = [farm.id for farm in priced + unpriced]
+
+    ordering = "-price" if descending else "price"
+    ids, pages, last = _walk(api_client, reverse("farm-list"), {"pagination": "cursor", "ordering": ordering})
+    assert ids == expected
+    assert pages == 2
+
+    back = api_client.get(last["previous"]).json()
+    assert [row["id"] for row in back["results"]] == expected[:10]
+
+
+@pytest.mark.django_db
+def test_cursor_refuses_orderings_it_cannot_follow(api_client, products):
+    res = api_client.get(reverse("product-list"), {"pagination": "cursor", "ordering": "name"})
+
+    assert res.status_code == 400
+    assert "price" in res.json()["ordering"]
@@ -0,0 +1,68 @@
+import pytest
+from decimal import Decimal
+from django.urls import reverse
+from model_bakery import baker
+
+from core.models import Farm, Product
+from core.search import build_search_document, normalize_arabic
+
+
+@pytest.fixture
+def catalog(db):
+    owner = baker.make("core.User")
+    hail = Farm.objects.create(
+        owner=owner, name="مزرعة الواحة", location="https://example.com",
+        governorate="حائل", administrative_region="منطقة حائل"
+    )
+    qassim = Farm.objects.create(
+        owner=owner, name="مزرعة النخيل", location="https://example.com",
+        governorate="بريدة", administrative_region="القصيم", type="تمور"
+    )
+    return {
+        "milk": Product.objects.create(farm=hail, name="الحَليب الطازج", price=Decimal("10.00")),
+        "cheese": Product.objects.create(farm=hail, name="جبنة بيضاء", price=Decimal("20.00")),
+        "dates": Product.objects.create(farm=qassim, name="تمر سكري", description="تمور القصيم", price=Decimal("30.00")),
+        "hail": hail,
+        "qassim": qassim,
+    }
+
+
+def _search(client, name, query):
+    return [row["id"] for row in client.get(reverse(f"{name}-list"), {"search": query}).json()["results"]]
+
+
+def test_normalization_folds_arabic_variants():
+    assert normalize_arabic("إِبِلٌ أحمد آمنة مستشفى ـــ") == "ابل احمد امنه مستشفي"
+    assert normalize_arabic("Milk ١٢٣") == "milk 123"
+    assert build_search_document("الحليب") == "الحليب حليب"
+
+
+@pytest.mark.django_db
+def test_product_search_ignores_diacritics_articles_and_ta_marbuta(api_client, catalog):
+    assert _search(api_client, "product", "حليب") == [catalog["milk"].id]
+    assert _search(api_client, "product", "جبنه") == [catalog["cheese"].id]
+    assert _search(api_client, "product", "طاز") == [catalog["milk"].id]
+
+
+@pytest.mark.django_db
+def test_product_search_covers_farm_location(api_client, catalog):
+    assert sorted(_search(api_client, "product", "حائل")) == sorted([catalog["milk"].id, catalog["cheese"].id])
+    assert _search(api_client, "product", "القصيم") == [catalog["dates"].id]
+
+
+@pytest.mark.django_db
+def test_farm_search_and_document_refresh(api_client, catalog):
+    assert _search(api_client, "farm", "بريده") == [catalog["qassim"].id]
+
+    catalog["qassim"].governorate = "عنيزة"
+    catalog["qassim"].save()
+
+    assert _search(api_client, "farm", "بريدة") == []
+    assert _search(api_client, "product", "عنيزه") == [catalog["dates"].id]
+
+
+@pytest.mark.django_db
+def test_deleted_products_leave_the_index(api_client, catalog):
+    catalog["cheese"].delete()
+
+    assert _search(api_client, "product", "جبنة") == []
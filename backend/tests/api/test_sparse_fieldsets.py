@@ -0,0 +1,81 @@
+import pytest
+from decimal import Decimal
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from model_bakery import baker
+
+from core.models import Farm, Order, OrderItem, Product
+
+
+@pytest.fixture
+def farms(db):
+    owner = baker.make("core.User", first_name="Sara")
+    farms = [Farm.objects.create(owner=owner, name=f"Farm {i}", location="https://example.com") for i in range(3)]
+    for farm in farms:
+        Product.objects.create(farm=farm, name="Milk", description="Fresh", price=Decimal("10.00"))
+    return farms
+
+
+def _get(client, url, params=None):
+    with CaptureQueriesContext(connection) as ctx:
+        res = client.get(url, params or {})
+    queries = [q["sql"] for q in ctx.captured_queries if 'FROM "products"' in q["sql"] or 'FROM "farms"' in q["sql"]]
+    return res, queries
+
+
+def _page_query(queries):
+    return next(query for query in queries if "LIMIT" in query)
+
+
+@pytest.mark.django_db
+def test_fields_limit_response_and_columns(api_client, farms):
+    res, queries = _get(api_client, reverse("product-list"), {"fields": "id,name,price"})
+
+    assert res.status_code == 200
+    assert set(res.json()["results"][0]) == {"id", "name", "price"}
+    page_query = _page_query(queries)
+    assert "JOIN" not in page_query
+    assert '"description"' not in page_query
+
+
+@pytest.mark.django_db
+def test_related_fields_are_joined_not_queried_per_row(api_client, farms):
+    res, queries = _get(api_client, reverse("product-list"))
+
+    assert res.json()["results"][0]["farm_name"].startswith("Farm")
+    # Farm names come from the join, not one query per product
+    assert 'JOIN "farms"' in _page_query(queries)
+    assert not any('WHERE "farms"."id" =' in query for query in queries)
+
+
+@pytest.mark.django_db
+def test_omit_drops_owner_join(api_client, farms):
+    res, queries = _get(api_client, reverse("farm-list"))
+    assert res.json()["results"][0]["owner_name"] == "Sara"
+    assert 'JOIN "users"' in _page_query(queries)
+
+    res, queries = _get(api_client, reverse("farm-list"), {"omit": "owner_email,owner_name"})
+    assert "owner_name" not in res.json()["results"][0]
+    assert "JOIN" not in _page_query(queries)
+
+
+@pytest.mark.django_db
+def test_unknown_field_is_rejected(api_client, farms):
+    res = api_client.get(reverse("product-list"), {"fields": "id,secret"})
+
+    assert res.status_code == 400
+    assert "secret" in res.json()["fields"]
+
+
+@pytest.mark.django_db
+def test_order_fields_skip_item_prefetch(auth_client, user, farms):
+    product = Product.objects.first()
+    order = Order.objects.create(consumer=user, farm=product.farm, total_amount=Decimal("10.00"))
+    OrderItem.objects.create(order=order, product=product, quantity=1, price=Decimal("10.00"))
+
+    with CaptureQueriesContext(connection) as ctx:
+        res = auth_client.get(reverse("order-list"), {"fields": "id,status,total_amount"})
+
+    assert res.json()["results"] == [{"id": order.id, "status": "pending", "total_amount": "10.00"}]
+    assert not any('FROM "order_items"' in q["sql"] for q in ctx.captured_queries)
@@ -0,0 +1,112 @@
+import pytest
+from decimal import Decimal
+from django.core.management import call_command
+from model_bakery import baker
+
+from core.models import Farm, Product, Order, OrderItem, FarmDailyLoad, UserDailyLoad
+from core.services.checkout import place_orders
+from core.services.daily_load import DailyLimitExceeded, farm_load, release_order_load, user_load
+
+
+@pytest.fixture
+def product(db):
+    owner = baker.make("core.User")
+    farm = Farm.objects.create(owner=owner, name="Farm", location="https://example.com", daily_capacity=2)
+    return Product.objects.create(farm=farm, name="Milk", price=Decimal("10.00"), stock_quantity=100)
+
+
+@pytest.fixture
+def consumer(db):
+    return baker.make("core.User", daily_order_limit=10)
+
+
+def _line(product, quantity=1):
+    return {"product": product, "quantity": quantity, "price": product.price}
+
+
+@pytest.mark.django_db
+def test_checkout_counts_orders_and_quantity(product, consumer):
+    place_orders(consumer, [_line(product, 3)])
+    place_orders(consumer, [_line(product, 2)])
+
+    assert farm_load(product.farm) == (2, 5)
+    assert user_load(consumer) == (2, 5)
+
+
+@pytest.mark.django_db
+def test_farm_capacity_in_orders(product, consumer):
+    place_orders(consumer, [_line(product)])
+    place_orders(consumer, [_line(product)])
+
+    with pytest.raises(DailyLimitExceeded):
+        place_orders(consumer, [_line(product)])
+    assert Order.objects.count() == 2
+    assert farm_load(product.farm) == (2, 2)
+    assert user_load(consumer) == (2, 2)
+
+
+@pytest.mark.django_db
+def test_farm_capacity_in_quantity(product, consumer, settings):
+    settings.DAILY_CAPACITY_UNIT = "quantity"
+    product.farm.daily_capacity = 10
+    product.farm.save()
+
+    place_orders(consumer, [_line(product, 5)])
+    place_orders(consumer, [_line(product, 4)])
+
+    with pytest.raises(DailyLimitExceeded):
+        place_orders(consumer, [_line(product, 2)])
+    place_orders(consumer, [_line(product, 1)])
+    assert farm_load(product.farm) == (3, 10)
+
+
+@pytest.mark.django_db
+def test_consumer_daily_order_limit(product, consumer):
+    consumer.daily_order_limit = 1
+    consumer.save()
+    place_orders(consumer, [_line(product)])
+
+    with pytest.raises(DailyLimitExceeded):
+        place_orders(consumer, [_line(product)])
+    assert farm_load(product.farm) == (1, 1)
+
+
+@pytest.mark.django_db
+def test_release_order_load_frees_capacity(product, consumer):
+    orders = place_orders(consumer, [_line(product, 2)])
+    place_orders(consumer, [_line(product)])
+
+    release_order_load(orders[0])
+
+    assert farm_load(product.farm) == (1, 1)
+    assert user_load(consumer) == (1, 1)
+    place_orders(consumer, [_line(product)])
+
+
+@pytest.mark.django_db
+def test_released_load_never_goes_below_zero(product, consumer):
+    order = place_orders(consumer, [_line(product, 4)])[0]
+
+    for _ in range(3):
+        release_order_load(order)
+
+    assert farm_load(product.farm) == (0, 0)
+    assert user_load(consumer) == (0, 0)
+    UserDailyLoad.objects.update(orders=1, quantity=2)
+    release_order_load(order)
+    assert user_load(consumer) == (0, 0)
+
+
+@pytest.mark.django_db
+def test_rebuild_daily_loads_from_history(product, consumer):
+    for status, quantity in (("pending", 5), ("confirmed", 4), ("cancelled", 7)):
+        order = Order.objects.create(consumer=consumer, farm=product.farm, status=status)
+        OrderItem.objects.create(order=order, product=product, quantity=quantity, price=Decimal("10.00"))
+    FarmDailyLoad.objects.create(farm=product.farm, day="2020-01-01", orders=99)
+
+    call_command("rebuild_daily_loads")
+
+    assert farm_load(product.farm) == (2, 9)
+    assert user_load(consumer) == (2, 9)
+    assert FarmDailyLoad.objects.count() == 1
+    assert UserDailyLoad.objects.count() == 1
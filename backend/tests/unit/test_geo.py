@@ -0,0 +1,44 @@
+import pytest
+from django.core.management import call_command
+from model_bakery import baker
+
+from core.geo import bounding_box, haversine_km, parse_location
+from core.models import Farm
+
+
+@pytest.mark.parametrize("location, expected", [
+    ("https://www.google.com/maps?q=25.3718,49.54812", (25.3718, 49.54812)),
+    ("https://maps.google.com/?ll=24.7136,46.6753&z=12", (24.7136, 46.6753)),
+    ("https://www.google.com/maps/place/Farm/@24.1,47.2,15z/data=!3m1!4b1!3d24.13836!4d47.33071", (24.13836, 47.33071)),
+    ("https://www.google.com/maps/@21.5128,39.15877,14z", (21.5128, 39.15877)),
+    ("https://www.google.com/maps/search/?api=1&query=18.2703%2C42.73184", (18.2703, 42.73184)),
+    ("26.35004, 44.01134", (26.35004, 44.01134)),
+    ("https://example.com", None),
+    ("https://www.google.com/maps?q=مزرعة", None),
+    ("https://www.google.com/maps?q=125.0,49.0", None),
+    ("", None),
+])
+def test_parse_location(location, expected):
+    assert parse_location(location) == expected
+
+
+def test_bounding_box_contains_radius():
+    (min_lat, max_lat), (min_lng, max_lng) = bounding_box(25.0, 45.0, 50)
+    assert haversine_km(25.0, 45.0, max_lat, 45.0) == pytest.approx(50, rel=1e-6)
+    # The farthest east a 50 km circle reaches lies on the box's edge
+    assert max(haversine_km(25.0, 45.0, lat / 100, max_lng) for lat in range(2450, 2560)) >= 50
+    assert bounding_box(89.9, 0, 50)[1] is None
+
+
+@pytest.mark.django_db
+def test_coordinates_are_kept_on_save_and_backfilled():
+    farm = Farm.objects.create(
+        owner=baker.make("core.User"), name="Farm", location="https://www.google.com/maps?q=25.3718,49.54812"
+    )
+    assert (farm.latitude, farm.longitude) == (25.3718, 49.54812)
+
+    Farm.objects.filter(pk=farm.pk).update(latitude=None, longitude=None)
+    call_command("backfill_farm_coordinates", batch_size=1)
+
+    farm.refresh_from_db()
+    assert (farm.latitude, farm.longitude) == (25.3718, 49.54812)
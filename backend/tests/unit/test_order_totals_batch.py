@@ -0,0 +1,43 @@
+import pytest
+from decimal import Decimal
+from django.core.management import call_command
+from model_bakery import baker
+
+from core.models import Farm, Order, OrderItem, Product
+from core.services.order_totals import calculate_totals
+
+ROWS = [
+    (1, 2, Decimal("10.00")),
+    (2, 3, Decimal("0.10")),
+    (1, 1, Decimal("5.50")),
+    (2, 7, Decimal("0.20")),
+]
+
+
+def test_calculate_totals_groups_by_order():
+    assert calculate_totals(ROWS) == {1: Decimal("25.50"), 2: Decimal("1.70")}
+
+
+@pytest.mark.parametrize("row, message", [
+    ((1, 0, Decimal("10.00")), "quantity must be positive"),
+    ((1, 1, Decimal("-1.00")), "price cannot be negative"),
+])
+def test_calculate_totals_validates_rows(row, message):
+    with pytest.raises(ValueError, match=message):
+        calculate_totals([row])
+
+
+@pytest.mark.django_db
+def test_recalculate_order_totals_fixes_drifted_orders():
+    farm = Farm.objects.create(owner=baker.make("core.User"), name="Farm", location="https://example.com")
+    product = Product.objects.create(farm=farm, name="Milk", price=Decimal("12.00"))
+    consumer = baker.make("core.User")
+    drifted = Order.objects.create(consumer=consumer, farm=farm, total_amount=Decimal("1.00"))
+    correct = Order.objects.create(consumer=consumer, farm=farm, total_amount=Decimal("24.00"))
+    for order in (drifted, correct):
+        OrderItem.objects.create(order=order, product=product, quantity=2, price=Decimal("12.00"))
+
+    call_command("recalculate_order_totals", "--chunk-size", "1")
+
+    drifted.refresh_from_db()
+    assert drifted.total_amount == Decimal("24.00")
@@ -0,0 +1,38 @@
+import pytest
+from decimal import Decimal
+from django.core.management import call_command
+from model_bakery import baker
+
+from core.models import Farm
+from core.prices import parse_price
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("٧٨ ريال/كجم", (Decimal("78.00"), "kg")),
+    ("78 SAR", (Decimal("78.00"), "kg")),
+    ("١٢٫٥ ريال للتر", (Decimal("12.50"), "liter")),
+    ("12,5 ريال", (Decimal("12.50"), "kg")),
+    ("1,200 ريال / كرتون", (Decimal("1200.00"), "carton")),
+    ("١٬٢٠٠ ريال للكرتون", (Decimal("1200.00"), "carton")),
+    ("۳۵ ریال للحبة", (Decimal("35.00"), "piece")),
+    ("70-80 ريال للكيلو", (Decimal("70.00"), "kg")),
+    ("حسب الطلب", (None, None)),
+    ("", (None, None)),
+    (None, (None, None)),
+])
+def test_parse_price(text, expected):
+    assert parse_price(text) == expected
+
+
+@pytest.mark.django_db
+def test_price_is_kept_on_save_and_backfilled():
+    farm = Farm.objects.create(
+        owner=baker.make("core.User"), name="Farm", location="https://example.com", price_per_kg="٧٨ ريال/كجم"
+    )
+    assert (farm.price, farm.price_unit) == (Decimal("78.00"), "kg")
+
+    Farm.objects.filter(pk=farm.pk).update(price=None, price_unit=None)
+    call_command("backfill_farm_prices", batch_size=1)
+
+    farm.refresh_from_db()
+    assert (farm.price, farm.price_unit) == (Decimal("78.00"), "kg")
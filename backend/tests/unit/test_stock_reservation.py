@@ -0,0 +1,85 @@
+import pytest
+from decimal import Decimal
+from model_bakery import baker
+
+from core.models import Farm, Product
+from core.services.stock import InsufficientStock, release_stock, reserve_stock
+
+
+def _product(farm, name, stock, is_available=True):
+    return Product.objects.create(
+        farm=farm, name=name, price=Decimal("10.00"), stock_quantity=stock, is_available=is_available
+    )
+
+
+@pytest.fixture
+def farms(db):
+    owner = baker.make("core.User")
+    return [
+        Farm.objects.create(owner=owner, name=f"Farm {i}", location="https://example.com")
+        for i in range(2)
+    ]
+
+
+@pytest.mark.django_db
+def test_reserve_stock_decrements_all_lines(farms):
+    milk = _product(farms[0], "Milk", 10)
+    dates = _product(farms[1], "Dates", 5)
+
+    reserve_stock([
+        {"product": milk, "quantity": 3},
+        {"product": dates, "quantity": 5},
+        {"product": milk, "quantity": 2},
+    ])
+
+    milk.refresh_from_db()
+    dates.refresh_from_db()
+    assert milk.stock_quantity == 5
+    assert dates.stock_quantity == 0
+
+
+@pytest.mark.django_db
+def test_reserve_stock_is_all_or_nothing(farms):
+    milk = _product(farms[0], "Milk", 10)
+    cheese = _product(farms[0], "Cheese", 1)
+    dates = _product(farms[1], "Dates", 5)
+
+    with pytest.raises(InsufficientStock) as exc_info:
+        reserve_stock([
+            {"product": milk, "quantity": 3},
+            {"product": cheese, "quantity": 2},
+            {"product": dates, "quantity": 1},
+        ])
+
+    assert exc_info.value.shortages == [
+        {"product": cheese.id, "product_name": "Cheese", "requested": 2, "available": 1},
+    ]
+    for product, stock in ((milk, 10), (cheese, 1), (dates, 5)):
+        product.refresh_from_db()
+        assert product.stock_quantity == stock
+
+
+@pytest.mark.django_db
+def test_reserve_stock_rejects_unavailable_products(farms):
+    hidden = _product(farms[0], "Hidden", 10, is_available=False)
+
+    with pytest.raises(InsufficientStock) as exc_info:
+        reserve_stock([{"product": hidden, "quantity": 1}])
+
+    assert exc_info.value.shortages[0]["available"] == 0
+
+
+@pytest.mark.django_db
+def test_release_stock_returns_an_orders_quantities(farms):
+    milk = _product(farms[0], "Milk", 4)
+    cheese = _product(farms[0], "Cheese", 0)
+    order = baker.make("core.Order", farm=farms[0])
+    baker.make("core.OrderItem", order=order, product=milk, quantity=3)
+    baker.make("core.OrderItem", order=order, product=milk, quantity=2)
+    baker.make("core.OrderItem", order=order, product=cheese, quantity=1)
+
+    release_stock(order)
+
+    for product, stock in ((milk, 9), (cheese, 1)):
+        product.refresh_from_db()
+        assert product.stock_quantity == stock
@@ -0,0 +1,71 @@
+import pytest
+from decimal import Decimal
+from django.urls import reverse
+from model_bakery import baker
+
+from core.models import Farm, Order, OrderItem, Product
+from core.services import tracking_numbers
+
+
+def test_encode_decode_round_trip():
+    for value in (1, 2, 31, 32, 12345, (1 << 40) - 1):
+        number = tracking_numbers.encode(value)
+        assert number.startswith("MK-")
+        assert len(number) == 12
+        assert tracking_numbers.is_valid(number)
+        assert tracking_numbers.decode(number) == value
+
+
+def test_consecutive_values_are_not_consecutive_numbers():
+    first, second = tracking_numbers.encode(1000), tracking_numbers.encode(1001)
+    assert sum(a != b for a, b in zip(first, second)) > 2
+
+
+def test_check_character_catches_single_typos():
+    number = tracking_numbers.encode(4242)
+    for position in range(3, len(number)):
+        for char in tracking_numbers.ALPHABET:
+            if char == number[position]:
+                continue
+            typo = number[:position] + char + number[position + 1:]
+            assert not tracking_numbers.is_valid(typo)
+
+
+def test_legacy_numbers_are_well_formed():
+    assert tracking_numbers.is_well_formed("MK-AB12CD34")
+    assert not tracking_numbers.is_well_formed("MK-AB12")
+    assert not tracking_numbers.is_well_formed("XX-AB12CD34")
+
+
+@pytest.mark.django_db
+def test_allocated_numbers_are_unique():
+    numbers = tracking_numbers.allocate_tracking_numbers(50) + tracking_numbers.allocate_tracking_numbers(50)
+    assert len(set(numbers)) == 100
+    assert all(tracking_numbers.is_valid(n) for n in numbers)
+
+
+@pytest.mark.django_db
+def test_trace_rejects_malformed_numbers_without_queries(api_client, django_assert_num_queries):
+    number = tracking_numbers.encode(77)
+    typo = number[:-1] + ("0" if number[-1] != "0" else "1")
+
+    with django_assert_num_queries(0):
+        res = api_client.get(reverse("order-trace"), {"tracking_number": typo})
+
+    assert res.status_code == 400
+
+
+@pytest.mark.django_db
+def test_trace_finds_order(api_client):
+    consumer = baker.make("core.User")
+    farm = Farm.objects.create(owner=consumer, name="Farm", location="https://example.com")
+    product = Product.objects.create(farm=farm, name="Milk", price=Decimal("10.00"))
+    number = tracking_numbers.allocate_tracking_numbers(1)[0]
+    order = Order.objects.create(consumer=consumer, farm=farm, tracking_number=number)
+    OrderItem.objects.create(order=order, product=product, quantity=2, price=Decimal("10.00"))
+
+    res = api_client.get(reverse("order-trace"), {"tracking_number": number.lower()})
+
+    assert res.status_code == 200
+    assert res.json()["tracking_number"] == number
+    assert res.json()["items"][0]["product_name"] == "Milk"
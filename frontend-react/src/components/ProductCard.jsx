@@ -2,6 +2,9 @@ import { useState, useEffect } from 'react'
 import { useNotification } from '../context/NotificationContext'
 import { getImageUrl } from '../utils/imageUtils'
 
+// Cards are full width on phones and a few per row otherwise
+const CARD_IMAGE_SIZES = '(max-width: 600px) 100vw, 300px'
+
 function ProductCard({ product }) {
     const [inCart, setInCart] = useState(false)
     const { showNotification } = useNotification()
@@ -49,10 +52,25 @@ function ProductCard({ product }) {
 
     return (
         <div className="product-card" style={{ position: 'relative' }}>
-            <div
-                className="product-image"
-                style={{ backgroundImage: `url('${getImageUrl(product.image, product.image_url)}')` }}
-            ></div>
+            {product.image_srcset ? (
+                // Resized copies made by the backend's image workers
+                <picture>
+                    <source type="image/webp" srcSet={product.image_srcset.webp} sizes={CARD_IMAGE_SIZES} />
+                    <img
+                        className="product-image"
+                        src={getImageUrl(product.image, product.image_url)}
+                        srcSet={product.image_srcset.jpeg}
+                        sizes={CARD_IMAGE_SIZES}
+                        alt={product.name}
+                        loading="lazy"
+                    />
+                </picture>
+            ) : (
+                <div
+                    className="product-image"
+                    style={{ backgroundImage: `url('${getImageUrl(product.image, product.image_url)}')` }}
+                ></div>
+            )}
             <div className="product-info">
                 <h3>{product.name}</h3>
                 <div className="product-price">{product.price} ريال</div>
@@ -1,4 +1,4 @@
-import { useState, useEffect } from 'react'
+import { useState, useEffect, useRef } from 'react'
 import { useNavigate } from 'react-router-dom'
 import Header from '../components/Header'
 import Footer from '../components/Footer'
@@ -8,7 +8,11 @@ import API_BASE_URL from '../apiConfig'
 
 function CartPage() {
   const [cart, setCart] = useState([])
+  // Flat shipping per farm order; the real value comes from the cart quote
+  const [shippingFee, setShippingFee] = useState(15)
   const [isSubmitting, setIsSubmitting] = useState(false)
+  // Reused across retries of the same checkout so the backend never creates duplicate orders
+  const checkoutKey = useRef(null)
 
   const [notification, setNotification] = useState({ isVisible: false, message: '', type: 'info', persist: false })
   const navigate = useNavigate()
@@ -22,47 +26,51 @@ function CartPage() {
     const savedCart = JSON.parse(localStorage.getItem('cart')) || []
     setCart(savedCart)
 
-    // Optional: Reconcile IDs or update prices in background without deleting items
-    const reconcileCart = async () => {
-      if (savedCart.length === 0) return
+    // Re-price the cart with the server's current prices and shipping
+    const quoteCart = async () => {
+      const lines = savedCart.filter(item => item.product_id)
+      if (lines.length === 0) return
 
       try {
-        const response = await fetch(`${API_BASE_URL}/api/products/`)
+        const response = await fetch(`${API_BASE_URL}/api/cart/quote/`, {
+          method: 'POST',
+          headers: { 'Content-Type': 'application/json' },
+          body: JSON.stringify({
+            items: lines.map(item => ({ product: item.product_id, quantity: item.quantity }))
+          })
+        })
         if (response.ok) {
           const data = await response.json()
-          const products = data.results || data
 
-          const productInfoMap = {}
-          products.forEach(p => {
-            productInfoMap[p.name] = {
-              id: p.id,
-              farm_name: p.farm_name || p.farm
-            }
+          const quotedItems = {}
+          data.farms.forEach(farm => {
+            farm.items.forEach(line => {
+              quotedItems[line.product] = { price: parseFloat(line.price), farm_name: farm.farm_name }
+            })
           })
+          if (data.farms.length > 0) setShippingFee(parseFloat(data.farms[0].shipping))
 
           const updatedCart = savedCart.map(item => {
-            const newItem = { ...item }
-            const info = productInfoMap[item.product]
-
-            if (info) {
-              if (!newItem.product_id) newItem.product_id = info.id
-              // Ensure farm_name is up to date
-              newItem.farm_name = info.farm_name
-            }
-            return newItem
+            const quoted = quotedItems[item.product_id]
+            return quoted ? { ...item, ...quoted } : item
           })
 
           setCart(updatedCart)
           localStorage.setItem('cart', JSON.stringify(updatedCart))
         }
       } catch (e) {
-        console.error("Cart reconciliation failed", e)
+        console.error("Cart quote failed", e)
       }
     }
 
-    reconcileCart()
+    quoteCart()
   }, [])
 
+  // A changed cart is a new checkout
+  useEffect(() => {
+    checkoutKey.current = null
+  }, [cart])
+
   // Combined effect to handle persistent warnings based on cart state
   useEffect(() => {
     const totalQuantity = cart.reduce((total, item) => total + item.quantity, 0)
@@ -96,7 +104,8 @@ function CartPage() {
 
   const itemsCount = cart.reduce((total, item) => total + item.quantity, 0)
   const subtotal = cart.reduce((total, item) => total + (item.price * item.quantity), 0)
-  const shipping = 15
+  // Checkout creates one order per farm, and each order pays shipping
+  const shipping = shippingFee * new Set(cart.map(item => item.farm_name)).size
   const total = subtotal + shipping
 
   return (
@@ -248,6 +257,7 @@ function CartPage() {
                     }
 
                     setIsSubmitting(true)
+                    if (!checkoutKey.current) checkoutKey.current = crypto.randomUUID()
 
                     try {
                       // First, create the order
@@ -255,13 +265,13 @@ function CartPage() {
                         method: 'POST',
                         headers: {
                           'Content-Type': 'application/json',
-                          'Authorization': `Bearer ${token}`
+                          'Authorization': `Bearer ${token}`,
+                          'Idempotency-Key': checkoutKey.current
                         },
                         body: JSON.stringify({
                           items: cart.map(item => ({
                             product: item.product_id,
-                            quantity: item.quantity,
-                            price: item.price
+                            quantity: item.quantity
                           }))
                         })
                       })
@@ -269,6 +279,7 @@ function CartPage() {
                       if (orderResponse.ok) {
                         const orderData = await orderResponse.json()
                         const orderId = orderData.id
+                        checkoutKey.current = null
 
                         // Redirect to payment page
                         navigate('/payment', { state: { orderId } })
@@ -14,14 +14,18 @@ function FarmersPage() {
     const [searchQuery, setSearchQuery] = useState('')
     const [regionFilter, setRegionFilter] = useState('all')
     const [sortBy, setSortBy] = useState('newest')
+    // Farm counts per region, from the API's facets
+    const [regionCounts, setRegionCounts] = useState([])
 
     useEffect(() => {
-        fetchFarms()
-    }, [])
+        fetchFarms(regionFilter)
+    }, [regionFilter])
 
-    const fetchFarms = async () => {
+    const fetchFarms = async (region) => {
         try {
-            const response = await fetch(`${API_BASE_URL}/api/farms/`)
+            const params = new URLSearchParams()
+            if (region !== 'all') params.append('administrative_region', region)
+            const response = await fetch(`${API_BASE_URL}/api/farms/?${params}`)
             if (!response.ok) {
                 throw new Error('Failed to fetch farms')
             }
@@ -32,6 +36,7 @@ function FarmersPage() {
             } else {
                 setFarms(data)
             }
+            if (data.facets) setRegionCounts(data.facets.administrative_region)
         } catch (err) {
             console.error(err)
             setError('حدث خطأ في تحميل بيانات المزارعين')
@@ -40,8 +45,9 @@ function FarmersPage() {
         }
     }
 
-    // Extract unique regions for filter
-    const regions = ['all', ...new Set(farms.map(farm => farm.administrative_region).filter(Boolean))]
+    // Regions for the filter, with their farm counts
+    const regions = ['all', ...regionCounts.map(facet => facet.value)]
+    const regionCount = Object.fromEntries(regionCounts.map(facet => [facet.value, facet.count]))
 
     const filteredFarms = farms.filter(farm => {
         // Search Filter
@@ -49,11 +55,6 @@ function FarmersPage() {
             return false
         }
 
-        // Region Filter
-        if (regionFilter !== 'all' && farm.administrative_region !== regionFilter) {
-            return false
-        }
-
         return true
     }).sort((a, b) => {
         if (sortBy === 'name-asc') {
@@ -164,7 +165,7 @@ function FarmersPage() {
                                             boxShadow: regionFilter === region ? '0 4px 6px rgba(45, 90, 39, 0.2)' : 'none'
                                         }}
                                     >
-                                        {region === 'all' ? 'الكل' : region}
+                                        {region === 'all' ? 'الكل' : `${region} (${regionCount[region]})`}
                                     </button>
                                 ))}
                             </div>
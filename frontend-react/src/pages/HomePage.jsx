@@ -55,7 +55,9 @@ function HomePage() {
 
   const fetchFeaturedProducts = async () => {
     try {
-      const response = await fetch(`${API_BASE_URL}/api/products/`)
+      // Only the columns ProductCard renders
+      const fields = 'id,name,price,unit,image,image_url,image_srcset,farm_name'
+      const response = await fetch(`${API_BASE_URL}/api/products/?fields=${fields}`)
       if (response.ok) {
         const data = await response.json()
         const products = data.results || data
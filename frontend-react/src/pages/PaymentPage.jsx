@@ -1,4 +1,4 @@
-import { useState, useEffect } from 'react'
+import { useState, useEffect, useRef } from 'react'
 import { useNavigate, useLocation } from 'react-router-dom'
 import Header from '../components/Header'
 import Footer from '../components/Footer'
@@ -14,6 +14,8 @@ function PaymentPage() {
   const [showMethodSelection, setShowMethodSelection] = useState(true)
   const navigate = useNavigate()
   const location = useLocation()
+  // One Idempotency-Key per order and method, reused when the request is retried
+  const paymentKeys = useRef({})
 
   useEffect(() => {
     // Get order_id from location state or query params
@@ -36,6 +38,8 @@ function PaymentPage() {
   const createPayment = async (orderId, method = 'creditcard') => {
     setLoading(true)
     setError(null)
+    const paymentKey = `${orderId}:${method}`
+    if (!paymentKeys.current[paymentKey]) paymentKeys.current[paymentKey] = crypto.randomUUID()
 
     try {
       const token = localStorage.getItem('access_token')
@@ -49,7 +53,8 @@ function PaymentPage() {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
-          'Authorization': `Bearer ${token}`
+          'Authorization': `Bearer ${token}`,
+          'Idempotency-Key': paymentKeys.current[paymentKey]
         },
         body: JSON.stringify({
           order_id: orderId,